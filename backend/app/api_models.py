@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -14,6 +14,14 @@ class QueryRequest(BaseModel):
         default=None, description="Optional provider override: 'openai' or 'anthropic'"
     )
     history: list[HistoryItem] = Field(default_factory=list)
+    session_id: str | None = Field(
+        default=None,
+        description="Session from a previous response; history may then carry only the new answers",
+    )
+    snapshot: Literal["full", "delta"] | None = Field(
+        default=None,
+        description="before_snapshot detail: whole form structures, or only the rows the change-set touches",
+    )
 
 
 class ClarificationResponse(BaseModel):
@@ -23,6 +31,30 @@ class ClarificationResponse(BaseModel):
     reason: str | None = None
     form_candidates: list[dict[str, Any]] | None = None
     field_candidates: list[dict[str, Any]] | None = None
+    planner: str | None = Field(
+        default=None,
+        description="Which planner served the request: 'fast_path', 'llm', 'llm_incremental' or 'session'",
+    )
+    session_id: str | None = Field(
+        default=None, description="Send back with clarification answers to continue this request"
+    )
+
+
+class ValueChange(BaseModel):
+    before: Any = None
+    after: Any = None
+
+
+class EntityDiff(BaseModel):
+    entity: Literal["form", "page", "field", "option", "rule", "condition", "action"]
+    id: str | None = None
+    status: Literal["added", "removed", "modified"]
+    form_id: str | None = None
+    parent_id: str | None = Field(
+        default=None, description="Page of a field, field of an option, rule of a condition or action"
+    )
+    label: str | None = None
+    changes: dict[str, ValueChange] = Field(default_factory=dict)
 
 
 class ChangeSetResponse(BaseModel):
@@ -30,6 +62,19 @@ class ChangeSetResponse(BaseModel):
     plan: dict[str, Any]
     change_set: dict[str, Any]
     before_snapshot: dict[str, Any] | None = None
+    diff: list[EntityDiff] | None = Field(
+        default=None, description="Per-entity before/after changes, computed against before_snapshot"
+    )
+    warnings: list[str] = Field(
+        default_factory=list, description="Logic that would be left referencing a field that does not exist"
+    )
+    planner: str | None = Field(
+        default=None,
+        description="Which planner served the request: 'fast_path', 'llm', 'llm_incremental' or 'session'",
+    )
+    session_id: str | None = Field(
+        default=None, description="Send back with clarification answers to continue this request"
+    )
 
 
 class ExplainRequest(BaseModel):
@@ -40,6 +85,12 @@ class ExplainRequest(BaseModel):
     change_set: dict[str, Any] = Field(
         ..., description="Final JSON change-set to be explained"
     )
+    before_snapshot: dict[str, Any] | None = Field(
+        default=None, description="Snapshot of the affected forms, used to name changed rows"
+    )
+    narrative: bool = Field(
+        default=False, description="Ask the LLM for a polished narrative instead of the built-in summary"
+    )
     provider: str | None = Field(
         default=None, description="Optional provider override: 'openai' or 'anthropic'"
     )
@@ -49,6 +100,65 @@ class ExplainResponse(BaseModel):
     explanation: str
 
 
+class DiffRequest(BaseModel):
+    change_set: dict[str, Any] = Field(..., description="Change-set to diff, possibly edited by the user")
+    before_snapshot: dict[str, Any] | None = Field(
+        default=None, description="Snapshot of the affected forms from the query response"
+    )
+
+
+class DiffResponse(BaseModel):
+    diff: list[EntityDiff]
+
+
+class LogicEvaluationRequest(BaseModel):
+    submissions: list[dict[str, Any]] = Field(
+        ..., description="Field values keyed by field code, one dict per submission"
+    )
+    trigger: Literal["on_load", "on_change", "on_submit"] | None = Field(
+        default=None, description="Only apply rules with this trigger; all rules when omitted"
+    )
+
+
+class FormLogicState(BaseModel):
+    values: dict[str, Any]
+    visible: dict[str, bool]
+    required: dict[str, bool]
+    enabled: dict[str, bool]
+    errors: list[str] = Field(default_factory=list)
+    notices: list[str] = Field(default_factory=list)
+    page_id: str | None = None
+
+
+class LogicEvaluationResponse(BaseModel):
+    states: list[FormLogicState]
+
+
+class SubmissionValidationRequest(BaseModel):
+    submissions: list[dict[str, Any]] | None = Field(
+        default=None, description="Field values keyed by field code, one dict per submission"
+    )
+    columns: dict[str, list[Any]] | None = Field(
+        default=None, description="The same batch as columns: field code to one value per submission"
+    )
+    apply_logic: bool = Field(
+        default=True, description="Skip fields the form's logic hides and follow its required flags"
+    )
+
+
+class SubmissionErrorModel(BaseModel):
+    row: int
+    field: str
+    code: str
+    message: str
+
+
+class SubmissionValidationResponse(BaseModel):
+    rows: int
+    valid_rows: int
+    errors: list[SubmissionErrorModel]
+
+
 class ApplyChangeSetRequest(BaseModel):
     change_set: dict[str, Any] = Field(..., description="Change-set to apply to the database")
 
@@ -0,0 +1,178 @@
+"""
+Lexical retrieval of the forms relevant to a request, used to keep the
+planner prompt from carrying the whole catalog.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from .db import Database, _fts_tokens
+from .form_cache import get_form_cache
+
+
+# Words that show up in most requests but say nothing about which form is meant.
+_STOPWORDS = frozenset(
+    {
+        "a", "add", "an", "and", "are", "as", "be", "by", "can", "change", "create",
+        "field", "fields", "for", "form", "forms", "from", "i", "in", "is", "it",
+        "make", "new", "of", "on", "option", "options", "or", "please", "should",
+        "that", "the", "this", "to", "update", "want", "when", "with", "would",
+    }
+)
+
+# How many field hits to pull per requested form before aggregating by form.
+_FIELD_HITS_PER_FORM = 25
+
+
+@dataclass
+class CatalogSlice:
+    forms: list[dict[str, Any]]
+    total_forms: int
+
+    @property
+    def truncated(self) -> bool:
+        return len(self.forms) < self.total_forms
+
+
+def retrieval_text(query: str, history: list[dict[str, str]] | None = None) -> str:
+    """
+    The text forms are scored against: the request plus recent clarification
+    turns, which often carry the form or field name the user settled on.
+    """
+    parts = [query]
+    for item in (history or [])[-5:]:
+        parts.append(str(item.get("question", "")))
+        parts.append(str(item.get("answer", "")))
+    return "\n".join(part for part in parts if part)
+
+
+def _match_any(tokens: Iterable[str]) -> str:
+    return " OR ".join(f'"{token}"' for token in tokens)
+
+
+async def rank_forms(db: Database, text: str, limit: int) -> list[str]:
+    """
+    Form ids ranked by BM25 relevance of their title/slug and of their fields'
+    labels/codes to `text`. Each form scores its own BM25 plus the BM25 of
+    every matching field, so a request naming several fields of one form
+    favours that form.
+    """
+    tokens = list(dict.fromkeys(t for t in _fts_tokens(text) if t not in _STOPWORDS))
+    if not tokens or limit <= 0:
+        return []
+    match = _match_any(tokens)
+    scores: dict[str, float] = {}
+    # bm25() is lower-is-better, so negate it into a relevance score.
+    form_hits = await db.fetch_all(
+        "SELECT f.id, hits.score FROM ("
+        "  SELECT rowid, -bm25(fts_forms, 2.0, 1.0) AS score FROM fts_forms "
+        "  WHERE fts_forms MATCH ? ORDER BY bm25(fts_forms, 2.0, 1.0) LIMIT ?"
+        ") AS hits JOIN forms f ON f.rowid = hits.rowid",
+        [match, limit * 4],
+    )
+    for row in form_hits:
+        scores[str(row["id"])] = float(row["score"])
+    field_hits = await db.fetch_all(
+        "SELECT form_key AS form_id, -bm25(fts_fields, 0.0, 1.0, 1.0) AS score "
+        "FROM fts_fields WHERE fts_fields MATCH ? "
+        "ORDER BY bm25(fts_fields, 0.0, 1.0, 1.0) LIMIT ?",
+        [f"{{code label}} : ({match})", limit * _FIELD_HITS_PER_FORM],
+    )
+    for row in field_hits:
+        form_id = str(row["form_id"])
+        scores[form_id] = scores.get(form_id, 0.0) + float(row["score"])
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [form_id for form_id, _ in ranked[:limit]]
+
+
+class CatalogCache:
+    """
+    Form titles and the catalog size for one database, shared by every
+    planning stage. Entries are dropped wholesale whenever the
+    trigger-maintained `catalog_changes` log advances. Per-form field
+    listings are read from the form structure cache.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self._seq: int | None = None
+        self._form_count: int | None = None
+        self._forms: dict[str, dict[str, Any]] = {}
+
+    async def _sync(self) -> None:
+        row = await self.db.fetch_one("SELECT COALESCE(MAX(seq), 0) AS seq FROM catalog_changes")
+        seq = int(row["seq"]) if row else 0
+        if seq != self._seq:
+            self._seq = seq
+            self._form_count = None
+            self._forms.clear()
+
+    async def form_count(self) -> int:
+        await self._sync()
+        if self._form_count is None:
+            row = await self.db.fetch_one("SELECT COUNT(*) AS n FROM forms")
+            self._form_count = int(row["n"]) if row else 0
+        return self._form_count
+
+    async def forms(self, form_ids: list[str]) -> list[dict[str, Any]]:
+        """
+        {id, slug, title} rows for `form_ids`, in the given order.
+        """
+        await self._sync()
+        missing = [form_id for form_id in form_ids if form_id not in self._forms]
+        if missing:
+            placeholders = ",".join("?" for _ in missing)
+            rows = await self.db.fetch_all(
+                f"SELECT id, slug, title FROM forms WHERE id IN ({placeholders})", missing
+            )
+            self._forms.update({str(row["id"]): row for row in rows})
+        return [self._forms[form_id] for form_id in form_ids if form_id in self._forms]
+
+    async def fields(self, form_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        """
+        {code, label, field_type} rows per form id, in page position order,
+        taken from the shared form structure cache.
+        """
+        structures = await get_form_cache(self.db).get_many(form_ids)
+        fields: dict[str, list[dict[str, Any]]] = {}
+        for form_id in form_ids:
+            rows = (structures.get(form_id) or {}).get("fields") or []
+            fields[form_id] = [
+                {"code": row["code"], "label": row["label"], "field_type": row["field_type_key"]}
+                for row in sorted(rows, key=lambda row: row["position"])
+            ]
+        return fields
+
+
+_caches: dict[str, CatalogCache] = {}
+
+
+def get_catalog_cache(db: Database) -> CatalogCache:
+    key = str(db.path)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = CatalogCache(db)
+        _caches[key] = cache
+    return cache
+
+
+async def select_catalog(db: Database, text: str, limit: int) -> CatalogSlice:
+    """
+    Pick the forms to show the planner. Small catalogs are shown whole; larger
+    ones are cut to the `limit` most relevant forms, falling back to the first
+    forms by title when nothing in the request matches the catalog.
+    """
+    cache = get_catalog_cache(db)
+    total = await cache.form_count()
+    if total <= limit:
+        forms = await db.fetch_all("SELECT id, slug, title FROM forms ORDER BY title")
+        return CatalogSlice(forms=forms, total_forms=total)
+
+    form_ids = await rank_forms(db, text, limit)
+    if not form_ids:
+        forms = await db.fetch_all(
+            "SELECT id, slug, title FROM forms ORDER BY title LIMIT ?", [limit]
+        )
+        return CatalogSlice(forms=forms, total_forms=total)
+    return CatalogSlice(forms=await cache.forms(form_ids), total_forms=total)
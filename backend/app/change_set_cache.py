@@ -0,0 +1,94 @@
+"""
+Memoized plan resolution.
+
+Re-submitted requests, repeated batch items and critique passes that return
+the plan unchanged all resolve the same `IntentPlan` against the same data.
+`ChangeSetCache` keeps the validated change-set per (canonical plan digest,
+placeholder namespace, database file, SQLite data version), so a repeat costs
+a dictionary lookup and a copy instead of the resolver's queries plus
+`validate_change_set`. Any commit to the database changes the data version and
+therefore misses every earlier entry.
+"""
+
+from collections import OrderedDict
+from typing import Any
+import hashlib
+import logging
+
+import orjson
+
+from .config import get_settings
+from .db import Database
+from .intent_schema import IntentPlan
+from .placeholders import PlaceholderAllocator
+from .request_context import add_metric
+
+logger = logging.getLogger(__name__)
+
+
+def plan_digest(plan: IntentPlan) -> str:
+    """
+    sha256 of the plan fields that affect resolution; notes and the
+    clarification question are free text the resolver never reads.
+    """
+    canonical = plan.model_dump(mode="json", exclude={"notes", "clarification_question"})
+    return hashlib.sha256(orjson.dumps(canonical, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class ChangeSetCache:
+    """
+    Bounded LRU of validated change-sets. Entries are stored serialized, so
+    every caller gets its own copy and may mutate it freely. Failed
+    resolutions (clarifications, validation errors) are not cached.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str, str, int], bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    async def resolve(self, plan: IntentPlan, db: Database, namespace: str = "") -> dict[str, Any]:
+        """
+        `build_change_set` followed by `validate_change_set`, memoized.
+        """
+        from .change_set_validator import validate_change_set
+        from .resolver import build_change_set
+
+        version = await db.data_version()
+        key = (plan_digest(plan), namespace, str(db.path), version)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            add_metric("change_set_cache_hits", 1)
+            return orjson.loads(cached)
+
+        self.misses += 1
+        add_metric("change_set_cache_misses", 1)
+        change_set = await build_change_set(plan, db, PlaceholderAllocator(plan, namespace))
+        await validate_change_set(change_set, db)
+        if self.max_entries > 0:
+            # Keyed by the version read before resolving: a commit made
+            # meanwhile can only make this entry unreachable, never stale.
+            self._entries[key] = orjson.dumps(change_set)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug("change-set cache %s", self.stats())
+        return change_set
+
+
+_cache: ChangeSetCache | None = None
+
+
+def get_change_set_cache() -> ChangeSetCache:
+    global _cache
+    if _cache is None:
+        _cache = ChangeSetCache(get_settings().change_set_cache_size)
+    return _cache
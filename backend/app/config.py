@@ -25,6 +25,35 @@ class Settings(BaseSettings):
     anthropic_model: str = Field(default="claude-3-5-sonnet-20241022", alias="ANTHROPIC_MODEL")
     sqlite_path: Path = Field(default_factory=_get_default_db_path, alias="SQLITE_PATH")
     max_changed_rows: int = Field(default=100, alias="MAX_CHANGED_ROWS")
+    suggestion_limit: int = Field(default=5, alias="SUGGESTION_LIMIT")
+    catalog_form_limit: int = Field(default=8, alias="CATALOG_FORM_LIMIT")
+    hierarchical_planning_threshold: int = Field(default=2000, alias="HIERARCHICAL_PLANNING_THRESHOLD")
+    form_picker_candidates: int = Field(default=200, alias="FORM_PICKER_CANDIDATES")
+    fast_path_enabled: bool = Field(default=True, alias="FAST_PATH_ENABLED")
+    planner_example_limit: int = Field(default=2, alias="PLANNER_EXAMPLE_LIMIT")
+    planner_example_token_budget: int = Field(default=600, alias="PLANNER_EXAMPLE_TOKEN_BUDGET")
+    session_ttl_seconds: int = Field(default=1800, alias="SESSION_TTL_SECONDS")
+    session_max_entries: int = Field(default=1000, alias="SESSION_MAX_ENTRIES")
+    idempotency_ttl_seconds: int = Field(default=600, alias="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_max_entries: int = Field(default=1000, alias="IDEMPOTENCY_MAX_ENTRIES")
+    explanation_cache_size: int = Field(default=512, alias="EXPLANATION_CACHE_SIZE")
+    change_set_cache_size: int = Field(default=256, alias="CHANGE_SET_CACHE_SIZE")
+    form_cache_size: int = Field(default=256, alias="FORM_CACHE_SIZE")
+    # Forms whose compiled logic (and other compiled plans) stay in memory.
+    compiled_form_cache_size: int = Field(default=256, alias="COMPILED_FORM_CACHE_SIZE")
+    forms_page_size: int = Field(default=100, alias="FORMS_PAGE_SIZE")
+    # Largest submission batch the logic and validation endpoints accept.
+    max_submission_batch: int = Field(default=50_000, alias="MAX_SUBMISSION_BATCH")
+    # "full" form structures or "delta" (only the touched rows) in before_snapshot.
+    snapshot_mode: str = Field(default="full", alias="SNAPSHOT_MODE")
+    # Serve get_form_structure from the materialized form_documents table.
+    form_documents_enabled: bool = Field(default=False, alias="FORM_DOCUMENTS_ENABLED")
+    # Serialize trusted response payloads with orjson instead of re-validating them.
+    fast_responses: bool = Field(default=False, alias="FAST_RESPONSES")
+    # Gzip fast-path bodies of at least this many bytes; 0 disables compression.
+    response_gzip_min_bytes: int = Field(default=0, alias="RESPONSE_GZIP_MIN_BYTES")
+    # "json" (columnar compact JSON) or "tsv" for change-sets embedded in prompts.
+    prompt_table_format: str = Field(default="json", alias="PROMPT_TABLE_FORMAT")
 
     @field_validator("sqlite_path", mode="before")
     @classmethod
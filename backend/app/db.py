@@ -6,10 +6,13 @@ from collections.abc import Iterable
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
+import re
+import sqlite3
 
 import aiosqlite
 
 from .config import get_settings
+from .migrations import apply_migrations, is_internal_table
 
 
 @dataclass
@@ -27,12 +30,59 @@ class TableInfo:
     columns: list[TableColumn]
 
 
+_migrated_paths: set[str] = set()
+# One idle connection per database file that only ever reads PRAGMA data_version.
+_version_watchers: dict[str, sqlite3.Connection] = {}
+
+
+def _fts_tokens(text: str) -> list[str]:
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _fts_query(text: str) -> str | None:
+    """
+    Turn free text into an FTS5 query that requires every word, e.g.
+    'Travel requests' -> '"travel" "requests"'. The index uses the porter
+    stemmer, so plural/singular variants still match without slow prefix scans.
+    """
+    tokens = _fts_tokens(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
 class Database:
     def __init__(self, path: Path | None = None) -> None:
         settings = get_settings()
         self.path = path or settings.sqlite_path
 
+    async def ensure_migrated(self) -> None:
+        key = str(self.path)
+        if key in _migrated_paths:
+            return
+        async with aiosqlite.connect(self.path) as db:
+            await apply_migrations(db)
+        _migrated_paths.add(key)
+
+    async def data_version(self) -> int:
+        """
+        A token that changes whenever any other connection commits to this
+        database. Every query here runs on a fresh connection, so the value is
+        read from a long-lived watcher connection that never writes; it is
+        only meaningful for equality checks.
+        """
+        # Migrating lazily on the first query would otherwise move the version
+        # right after it was read.
+        await self.ensure_migrated()
+        key = str(self.path)
+        watcher = _version_watchers.get(key)
+        if watcher is None:
+            watcher = sqlite3.connect(key, check_same_thread=False)
+            _version_watchers[key] = watcher
+        return int(watcher.execute("PRAGMA data_version").fetchone()[0])
+
     async def get_tables(self) -> list[TableInfo]:
+        await self.ensure_migrated()
         async with aiosqlite.connect(self.path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
@@ -42,6 +92,8 @@ class Database:
             tables: list[TableInfo] = []
             for row in rows:
                 name = row["name"]
+                if is_internal_table(name):
+                    continue
                 columns = await self._get_table_columns(db, name)
                 tables.append(TableInfo(name=name, columns=columns))
             return tables
@@ -67,6 +119,7 @@ class Database:
     async def fetch_one(
         self, query: str, params: Iterable[Any] | None = None
     ) -> dict[str, Any] | None:
+        await self.ensure_migrated()
         async with aiosqlite.connect(self.path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(query, tuple(params or []))
@@ -78,26 +131,107 @@ class Database:
     async def fetch_all(
         self, query: str, params: Iterable[Any] | None = None
     ) -> list[dict[str, Any]]:
+        await self.ensure_migrated()
         async with aiosqlite.connect(self.path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(query, tuple(params or []))
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+    async def search_forms(self, text: str, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        BM25-ranked form lookup over title and slug, best match first.
+        """
+        match = _fts_query(text)
+        if match is None:
+            return []
+        query = (
+            "SELECT f.*, bm25(fts_forms, 2.0, 1.0) AS search_rank "
+            "FROM fts_forms JOIN forms f ON f.rowid = fts_forms.rowid "
+            "WHERE fts_forms MATCH ? "
+            "ORDER BY search_rank LIMIT ?"
+        )
+        return await self.fetch_all(query, [match, limit])
+
+    async def search_fields(
+        self,
+        form_id: str,
+        text: str,
+        columns: tuple[str, ...] = ("code", "label"),
+        limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """
+        Field lookup scoped to one form, best match first.
+
+        The form scope lives inside the MATCH expression so FTS5 intersects a
+        tiny per-form doclist. Every candidate contains every query term, so
+        BM25's IDF component is identical across them and the ranking reduces
+        to length normalization, which is applied here instead of bm25() (that
+        would read catalog-wide doclists just to compute IDF).
+        """
+        match = _fts_query(text)
+        if match is None:
+            return []
+        form_key = '"' + str(form_id).replace('"', '""') + '"'
+        scoped_match = f"form_key : {form_key} AND {{{' '.join(columns)}}} : ({match})"
+        rows = await self.fetch_all(
+            "SELECT f.* FROM fts_fields JOIN form_fields f ON f.rowid = fts_fields.rowid "
+            "WHERE fts_fields MATCH ?",
+            [scoped_match],
+        )
+        rows = [row for row in rows if str(row["form_id"]) == str(form_id)]
+        rows.sort(
+            key=lambda row: (
+                sum(len(_fts_tokens(str(row.get(column) or ""))) for column in columns),
+                row.get("position") or 0,
+            )
+        )
+        return rows[:limit]
+
+    async def list_forms(
+        self,
+        limit: int | None,
+        after: tuple[str, str] | None = None,
+        status: str | None = None,
+        category_id: str | None = None,
+        org_id: str | None = None,
+        title_prefix: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        One page of form summaries in (title, id) order, titles compared
+        case-insensitively. `after` is the (title, id) of the last row of the
+        previous page; each filter is an equality on an indexed column, and
+        the title prefix is a range scan, so page cost does not grow with the
+        catalog. A `limit` of None returns every matching form.
+        """
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column, value in (("status", status), ("category_id", category_id), ("org_id", org_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if title_prefix:
+            # Anything starting with the prefix sorts below prefix + U+10FFFF.
+            clauses.append("title >= ? COLLATE NOCASE AND title < ? COLLATE NOCASE")
+            params.extend([title_prefix, title_prefix + "\U0010ffff"])
+        if after is not None:
+            # Spelled out rather than as a row value so SQLite seeks the index.
+            clauses.append("title >= ? COLLATE NOCASE AND (title > ? COLLATE NOCASE OR id > ?)")
+            params.extend([after[0], after[0], after[1]])
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        return await self.fetch_all(
+            f"SELECT id, slug, title, status FROM forms {where}"
+            "ORDER BY title COLLATE NOCASE, id LIMIT ?",
+            [*params, -1 if limit is None else limit],
+        )
+
     async def find_form_by_name(self, name: str) -> list[dict[str, Any]]:
-        pattern = f"%{name}%"
-        query = "SELECT * FROM forms WHERE title LIKE ? OR slug LIKE ?"
-        return await self.fetch_all(query, [pattern, pattern])
+        return await self.search_forms(name)
 
     async def find_field_by_label(
         self, form_id: str, label_or_code: str
     ) -> list[dict[str, Any]]:
-        pattern = f"%{label_or_code}%"
-        query = (
-            "SELECT * FROM form_fields "
-            "WHERE form_id = ? AND (label LIKE ? OR code LIKE ?)"
-        )
-        return await self.fetch_all(query, [form_id, pattern, pattern])
+        return await self.search_fields(form_id, label_or_code)
 
     async def get_option_items_for_field(self, field_id: str) -> list[dict[str, Any]]:
         query = (
@@ -130,7 +264,25 @@ class Database:
         query = "SELECT * FROM logic_rules WHERE form_id = ? ORDER BY priority"
         return await self.fetch_all(query, [form_id])
 
+    async def execute(self, query: str, params: Iterable[Any] | None = None) -> None:
+        await self.ensure_migrated()
+        async with aiosqlite.connect(self.path) as db:
+            await db.execute(query, tuple(params or []))
+            await db.commit()
+
     async def get_form_structure(self, form_id: str) -> dict[str, Any] | None:
+        """
+        A form with its pages, fields, options and logic. With
+        FORM_DOCUMENTS_ENABLED this is a primary-key lookup of the
+        materialized document, rebuilt first if a child row changed.
+        """
+        if get_settings().form_documents_enabled:
+            from .form_documents import materialized_structure
+
+            return await materialized_structure(self, form_id)
+        return await self.build_form_structure(form_id)
+
+    async def build_form_structure(self, form_id: str) -> dict[str, Any] | None:
         form = await self.fetch_one(
             "SELECT id, slug, title, description, status FROM forms WHERE id = ?",
             [form_id],
@@ -180,12 +332,9 @@ class Database:
         }
 
     async def get_form_snapshots(self, form_ids: Iterable[str]) -> dict[str, Any]:
-        snapshots: dict[str, Any] = {}
-        for form_id in form_ids:
-            structure = await self.get_form_structure(form_id)
-            if structure is not None:
-                snapshots[form_id] = structure
-        return snapshots
+        from .form_cache import get_form_cache
+
+        return await get_form_cache(self).get_many(form_ids)
 
 
 
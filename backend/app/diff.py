@@ -0,0 +1,186 @@
+"""
+Server-side before/after diff of a change-set.
+
+Applies a change-set to an in-memory copy of the affected forms'
+`before_snapshot` rows and reports one entry per changed entity:
+
+    {"entity": "option", "id": "$opt_1a2b3c4d", "status": "added",
+     "form_id": "...", "parent_id": "<field id>", "label": "Paris",
+     "changes": {"label": {"before": null, "after": "Paris"}, ...}}
+
+Entities are forms, pages, fields, options, rules, conditions and actions.
+Option sets and field bindings are plumbing: they only link options to their
+field. Placeholder ids resolve like existing ids, so an option of a new field
+on a new form still names both. Every row is looked up by id in a dict, so
+the work is linear in the snapshot plus change-set size. Updates that set
+every column to its current value are left out.
+"""
+
+from typing import Any
+import json
+
+
+# Change-set tables in parent-before-child order, with the entity they diff as.
+_ENTITIES = (
+    ("forms", "form"),
+    ("form_pages", "page"),
+    ("form_fields", "field"),
+    ("option_sets", None),
+    ("field_option_binding", None),
+    ("option_items", "option"),
+    ("logic_rules", "rule"),
+    ("logic_conditions", "condition"),
+    ("logic_actions", "action"),
+)
+_LABEL_COLUMNS = {
+    "form": ("title", "slug"),
+    "page": ("title",),
+    "field": ("label", "code"),
+    "option": ("label", "value"),
+    "rule": ("name",),
+}
+# Columns that only restate the row's identity or parent.
+_STRUCTURAL_COLUMNS = {"id", "form_id", "rule_id", "option_set_id"}
+
+
+def _same(before: Any, after: Any) -> bool:
+    if isinstance(before, bool) or isinstance(after, bool):
+        return before is not None and after is not None and int(before) == int(after)
+    return before == after
+
+
+def _ref_field_id(ref: Any) -> str | None:
+    try:
+        ref_obj = json.loads(ref) if isinstance(ref, str) else ref
+    except json.JSONDecodeError:
+        return None
+    if isinstance(ref_obj, dict) and ref_obj.get("type") == "field" and ref_obj.get("field_id") is not None:
+        return str(ref_obj["field_id"])
+    return None
+
+
+class _State:
+    """
+    Rows by id per table and the field behind each option set, seeded from
+    the snapshots and advanced row by row as the change-set is applied.
+    """
+
+    def __init__(self, before_snapshot: dict[str, Any] | None) -> None:
+        self.rows: dict[str, dict[str, dict[str, Any]]] = {table: {} for table, _ in _ENTITIES}
+        self.option_set_fields: dict[str, str] = {}
+        for snapshot in (before_snapshot or {}).values():
+            if not isinstance(snapshot, dict):
+                continue
+            form = snapshot.get("form") or {}
+            if form.get("id") is not None:
+                self.rows["forms"][str(form["id"])] = form
+            for table, key in (
+                ("form_pages", "pages"),
+                ("form_fields", "fields"),
+                ("logic_rules", "logic_rules"),
+                ("logic_conditions", "logic_conditions"),
+                ("logic_actions", "logic_actions"),
+            ):
+                for row in snapshot.get(key) or []:
+                    self.rows[table][str(row["id"])] = row
+            for field_id, items in (snapshot.get("options_by_field") or {}).items():
+                for item in items:
+                    self.rows["option_items"][str(item["id"])] = item
+                    if item.get("option_set_id") is not None:
+                        self.option_set_fields[str(item["option_set_id"])] = str(field_id)
+
+    def parent(self, table: str, row: dict[str, Any]) -> str | None:
+        if table == "option_items":
+            return self.option_set_fields.get(str(row.get("option_set_id")))
+        if table in ("logic_conditions", "logic_actions"):
+            return None if row.get("rule_id") is None else str(row["rule_id"])
+        if table == "form_fields" and row.get("page_id") is not None:
+            return str(row["page_id"])
+        return None
+
+    def form_of(self, table: str, row: dict[str, Any]) -> str | None:
+        if table == "forms":
+            return None if row.get("id") is None else str(row["id"])
+        if row.get("form_id") is not None:
+            return str(row["form_id"])
+        parent = self.parent(table, row)
+        parent_table = {"option_items": "form_fields"}.get(table, "logic_rules")
+        parent_row = self.rows[parent_table].get(parent) if parent else None
+        return None if parent_row is None or parent_row.get("form_id") is None else str(parent_row["form_id"])
+
+    def label(self, entity: str, row: dict[str, Any]) -> str | None:
+        for column in _LABEL_COLUMNS.get(entity, ()):
+            if row.get(column):
+                return str(row[column])
+        # Conditions and actions are named by the field they reference.
+        field_id = _ref_field_id(row.get("lhs_ref") or row.get("target_ref"))
+        field = self.rows["form_fields"].get(field_id) if field_id else None
+        if field is not None:
+            return str(field.get("label") or field.get("code"))
+        return None
+
+
+def compute_diff(change_set: dict[str, Any], before_snapshot: dict[str, Any] | None) -> list[dict[str, Any]]:
+    """
+    Per-entity changes of `change_set` against `before_snapshot`, parents
+    before children.
+    """
+    state = _State(before_snapshot)
+    entries: list[dict[str, Any]] = []
+    for table, entity in _ENTITIES:
+        section = change_set.get(table) or {}
+        for op in ("insert", "update", "delete"):
+            for row in section.get(op) or []:
+                if not isinstance(row, dict):
+                    continue
+                row_id = None if row.get("id") is None else str(row["id"])
+                before = state.rows[table].get(row_id) if row_id is not None else None
+                if op == "insert":
+                    after = dict(row)
+                elif op == "update":
+                    after = {**(before or {}), **row}
+                else:
+                    after = None
+
+                if table == "field_option_binding" and after is not None:
+                    state.option_set_fields[str(after.get("option_set_id"))] = str(after.get("field_id"))
+                if row_id is not None:
+                    if after is None:
+                        state.rows[table].pop(row_id, None)
+                    else:
+                        state.rows[table][row_id] = after
+                if entity is None:
+                    continue
+
+                current = after if after is not None else (before or row)
+                if op == "delete":
+                    status = "removed"
+                    changes: dict[str, Any] = {}
+                elif op == "insert":
+                    status = "added"
+                    changes = {
+                        column: {"before": None, "after": value}
+                        for column, value in row.items()
+                        if column not in _STRUCTURAL_COLUMNS and value is not None
+                    }
+                else:
+                    status = "modified"
+                    changes = {
+                        column: {"before": (before or {}).get(column), "after": value}
+                        for column, value in row.items()
+                        if column not in _STRUCTURAL_COLUMNS and not _same((before or {}).get(column), value)
+                    }
+                    if not changes:
+                        continue
+                entries.append(
+                    {
+                        "entity": entity,
+                        "id": row_id,
+                        "status": status,
+                        "form_id": state.form_of(table, current),
+                        "parent_id": state.parent(table, current),
+                        "label": state.label(entity, current),
+                        "changes": changes,
+                    }
+                )
+    return entries
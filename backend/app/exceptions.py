@@ -22,3 +22,8 @@ class LLMOperationError(RuntimeError):
     """Raised when an LLM operation fails."""
     pass
 
+
+
+class IdempotencyConflictError(ValueError):
+    """Raised when an Idempotency-Key is reused with a different request payload."""
+    pass
@@ -0,0 +1,328 @@
+"""
+Deterministic change-set explanations.
+
+Walks a change-set together with the `before_snapshot` of the affected forms
+and describes each change in terms of forms, fields, options and logic rules,
+resolving ids and placeholders to their labels. No LLM is involved; the agent
+only calls one when a polished narrative is requested.
+
+Explanations, rendered or generated, are memoized by a digest of their inputs
+in which random placeholder suffixes are renumbered, so re-planning the same
+request hits the same entry.
+"""
+
+from collections import OrderedDict
+from typing import Any
+import hashlib
+import json
+import re
+
+from .config import get_settings
+
+
+_OPERATORS = {
+    "=": "is",
+    "==": "is",
+    "!=": "is not",
+    "contains": "contains",
+    "not_contains": "does not contain",
+    ">": "is greater than",
+    "<": "is less than",
+    ">=": "is at least",
+    "<=": "is at most",
+}
+_FLAG_WORDS = {
+    "required": ("required", "optional"),
+    "read_only": ("read-only", "editable"),
+    "visible_by_default": ("visible by default", "hidden by default"),
+}
+
+
+class _Labels:
+    """
+    Id -> label lookups built from the before-snapshot and the change-set's
+    own inserts, so placeholders resolve like existing rows.
+    """
+
+    def __init__(self, change_set: dict[str, Any], before_snapshot: dict[str, Any] | None) -> None:
+        self.forms: dict[str, str] = {}
+        self.fields: dict[str, dict[str, Any]] = {}
+        self.options: dict[str, dict[str, Any]] = {}
+        self.option_set_fields: dict[str, str] = {}
+        self.rules: dict[str, dict[str, Any]] = {}
+
+        for form_id, snapshot in (before_snapshot or {}).items():
+            if not isinstance(snapshot, dict):
+                continue
+            form = snapshot.get("form") or {}
+            self.forms[str(form_id)] = str(form.get("title") or form_id)
+            for field in snapshot.get("fields") or []:
+                self.fields[str(field["id"])] = field
+            for field_id, items in (snapshot.get("options_by_field") or {}).items():
+                for item in items:
+                    self.options[str(item["id"])] = item
+                    if item.get("option_set_id") is not None:
+                        self.option_set_fields[str(item["option_set_id"])] = str(field_id)
+            for rule in snapshot.get("logic_rules") or []:
+                self.rules[str(rule["id"])] = rule
+
+        for row in _rows(change_set, "forms", "insert"):
+            self.forms[str(row.get("id"))] = str(row.get("title") or row.get("slug") or row.get("id"))
+        for row in _rows(change_set, "form_fields", "insert"):
+            self.fields[str(row.get("id"))] = row
+        for row in _rows(change_set, "field_option_binding", "insert"):
+            self.option_set_fields[str(row.get("option_set_id"))] = str(row.get("field_id"))
+        for row in _rows(change_set, "option_items", "insert"):
+            self.options[str(row.get("id"))] = row
+        for row in _rows(change_set, "logic_rules", "insert"):
+            self.rules[str(row.get("id"))] = row
+
+    def form(self, form_id: Any) -> str:
+        return self.forms.get(str(form_id), str(form_id))
+
+    def field(self, field_id: Any) -> str:
+        field = self.fields.get(str(field_id))
+        return str(field.get("label") or field.get("code")) if field else str(field_id)
+
+    def field_on_form(self, field_id: Any) -> str:
+        field = self.fields.get(str(field_id))
+        if field and field.get("form_id") is not None:
+            return f"**{self.field(field_id)}** on {self.form(field['form_id'])}"
+        return f"**{self.field(field_id)}**"
+
+    def option_set(self, option_set_id: Any) -> str:
+        field_id = self.option_set_fields.get(str(option_set_id))
+        if field_id is None:
+            return "an option list"
+        return self.field_on_form(field_id)
+
+    def rule(self, rule_id: Any) -> str:
+        rule = self.rules.get(str(rule_id))
+        return str(rule.get("name") or rule_id) if rule else str(rule_id)
+
+    def reference(self, ref: Any) -> str:
+        try:
+            ref_obj = json.loads(ref) if isinstance(ref, str) else ref
+        except json.JSONDecodeError:
+            return str(ref)
+        if isinstance(ref_obj, dict) and ref_obj.get("type") == "field":
+            if ref_obj.get("field_id") is not None:
+                return f"**{self.field(ref_obj['field_id'])}**"
+            if ref_obj.get("field_code"):
+                return f"**{ref_obj['field_code']}**"
+        return str(ref)
+
+
+def _rows(change_set: dict[str, Any], table: str, op: str) -> list[dict[str, Any]]:
+    return [row for row in (change_set.get(table) or {}).get(op) or [] if isinstance(row, dict)]
+
+
+def _value(raw: Any) -> str:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            pass
+    return f'"{raw}"' if isinstance(raw, str) else json.dumps(raw)
+
+
+def _join(values: list[str]) -> str:
+    if len(values) <= 2:
+        return " and ".join(values)
+    return ", ".join(values[:-1]) + f" and {values[-1]}"
+
+
+def _field_lines(change_set: dict[str, Any], labels: _Labels) -> list[str]:
+    lines: list[str] = []
+    for row in _rows(change_set, "form_fields", "insert"):
+        kind = str(row.get("field_type_key") or "").replace("_", " ")
+        flags = [_FLAG_WORDS[flag][0] for flag in ("required", "read_only") if row.get(flag)]
+        if row.get("visible_by_default") == 0:
+            flags.append(_FLAG_WORDS["visible_by_default"][1])
+        suffix = f" ({', '.join(flags)})" if flags else ""
+        lines.append(
+            f"Add a {kind + ' ' if kind else ''}field **{row.get('label') or row.get('code')}** "
+            f"to {labels.form(row.get('form_id'))}{suffix}."
+        )
+    for row in _rows(change_set, "form_fields", "update"):
+        target = labels.field_on_form(row.get("id"))
+        changes: list[str] = []
+        if "label" in row:
+            changes.append(f'rename it to "{row["label"]}"')
+        for flag, (on, off) in _FLAG_WORDS.items():
+            if flag in row:
+                changes.append(f"make it {on if row[flag] else off}")
+        if "placeholder" in row:
+            changes.append(f'set its placeholder to "{row["placeholder"]}"' if row["placeholder"] else "clear its placeholder")
+        for key in sorted(set(row) - {"id", "label", "placeholder", *_FLAG_WORDS}):
+            changes.append(f"set {key.replace('_', ' ')} to {_value(row[key])}")
+        lines.append(f"Update field {target}: {_join(changes) or 'no visible change'}.")
+    for row in _rows(change_set, "form_fields", "delete"):
+        lines.append(f"Remove field {labels.field_on_form(row.get('id'))}.")
+    return lines
+
+
+def _option_lines(change_set: dict[str, Any], labels: _Labels) -> list[str]:
+    lines: list[str] = []
+    added: dict[str, list[str]] = {}
+    for row in _rows(change_set, "option_items", "insert"):
+        added.setdefault(str(row.get("option_set_id")), []).append(f'"{row.get("label") or row.get("value")}"')
+    for option_set_id, values in added.items():
+        noun = "option" if len(values) == 1 else "options"
+        lines.append(f"Add {noun} {_join(values)} to {labels.option_set(option_set_id)}.")
+
+    for row in _rows(change_set, "option_items", "update"):
+        item = labels.options.get(str(row.get("id")), {})
+        old = item.get("label") or item.get("value") or row.get("id")
+        where = labels.option_set(item["option_set_id"]) if item.get("option_set_id") is not None else "its field"
+        new = row.get("label") or row.get("value")
+        if new is not None and new != old:
+            lines.append(f'Rename option "{old}" to "{new}" in {where}.')
+        if "is_active" in row:
+            verb = "Reactivate" if row["is_active"] else "Deactivate"
+            lines.append(f'{verb} option "{new or old}" in {where}.')
+    for row in _rows(change_set, "option_items", "delete"):
+        item = labels.options.get(str(row.get("id")), {})
+        lines.append(f'Delete option "{item.get("label") or row.get("id")}".')
+    return lines
+
+
+def _logic_lines(change_set: dict[str, Any], labels: _Labels) -> list[str]:
+    conditions: dict[str, list[dict[str, Any]]] = {}
+    for row in _rows(change_set, "logic_conditions", "insert"):
+        conditions.setdefault(str(row.get("rule_id")), []).append(row)
+    actions: dict[str, list[dict[str, Any]]] = {}
+    for row in _rows(change_set, "logic_actions", "insert"):
+        actions.setdefault(str(row.get("rule_id")), []).append(row)
+
+    def describe(rule_id: str) -> str:
+        parts = []
+        for index, cond in enumerate(sorted(conditions.pop(rule_id, []), key=lambda c: c.get("position") or 0)):
+            join = "" if index == 0 else f" {str(cond.get('bool_join') or 'AND').lower()} "
+            operator = _OPERATORS.get(str(cond.get("operator")), str(cond.get("operator")))
+            parts.append(f"{join}{labels.reference(cond.get('lhs_ref'))} {operator} {_value(cond.get('rhs'))}")
+        steps = [
+            f"{act.get('action')} {labels.reference(act.get('target_ref'))}"
+            for act in sorted(actions.pop(rule_id, []), key=lambda a: a.get("position") or 0)
+        ]
+        text = ""
+        if parts:
+            text += " when " + "".join(parts)
+        if steps:
+            text += ", " + _join(steps)
+        return text
+
+    lines: list[str] = []
+    for row in _rows(change_set, "logic_rules", "insert"):
+        rule_id = str(row.get("id"))
+        lines.append(f"Add logic rule \"{row.get('name')}\" to {labels.form(row.get('form_id'))}{describe(rule_id)}.")
+    for row in _rows(change_set, "logic_rules", "update"):
+        rule_id = str(row.get("id"))
+        lines.append(f"Update logic rule \"{labels.rule(rule_id)}\"{describe(rule_id)}.")
+    for row in _rows(change_set, "logic_rules", "delete"):
+        lines.append(f"Remove logic rule \"{labels.rule(row.get('id'))}\".")
+    # Conditions and actions added to rules that are not otherwise changed.
+    for rule_id in list(conditions) + [rule_id for rule_id in actions if rule_id not in conditions]:
+        lines.append(f"Extend logic rule \"{labels.rule(rule_id)}\"{describe(rule_id)}.")
+    for table, noun in (("logic_conditions", "condition"), ("logic_actions", "action")):
+        updated = len(_rows(change_set, table, "update"))
+        deleted = len(_rows(change_set, table, "delete"))
+        if updated:
+            lines.append(f"Update {updated} existing logic {noun}{'s' if updated != 1 else ''}.")
+        if deleted:
+            lines.append(f"Remove {deleted} logic {noun}{'s' if deleted != 1 else ''}.")
+    return lines
+
+
+_DESCRIBED_TABLES = {
+    "forms", "form_pages", "form_fields", "option_sets", "field_option_binding",
+    "option_items", "logic_rules", "logic_conditions", "logic_actions",
+}
+
+
+def render_explanation(change_set: dict[str, Any], before_snapshot: dict[str, Any] | None = None) -> str:
+    """
+    A markdown bullet list describing every change in `change_set`.
+    """
+    labels = _Labels(change_set, before_snapshot)
+    lines: list[str] = []
+    for row in _rows(change_set, "forms", "insert"):
+        lines.append(f"Create a new form **{labels.form(row.get('id'))}** ({row.get('status') or 'draft'}).")
+    for row in _rows(change_set, "forms", "update"):
+        changes = [f"{key} to {_value(value)}" for key, value in row.items() if key != "id"]
+        lines.append(f"Update form **{labels.form(row.get('id'))}**: set {_join(changes)}.")
+    for row in _rows(change_set, "forms", "delete"):
+        lines.append(f"Delete form **{labels.form(row.get('id'))}**.")
+    new_form_ids = {str(row.get("id")) for row in _rows(change_set, "forms", "insert")}
+    for row in _rows(change_set, "form_pages", "insert"):
+        if str(row.get("form_id")) not in new_form_ids:
+            lines.append(f"Add page \"{row.get('title')}\" to {labels.form(row.get('form_id'))}.")
+
+    lines.extend(_field_lines(change_set, labels))
+    lines.extend(_option_lines(change_set, labels))
+    lines.extend(_logic_lines(change_set, labels))
+
+    for table in sorted(set(change_set) - _DESCRIBED_TABLES):
+        for op in ("insert", "update", "delete"):
+            count = len(_rows(change_set, table, op))
+            if count:
+                lines.append(f"{op.capitalize()} {count} row{'s' if count != 1 else ''} in {table}.")
+
+    if not lines:
+        return "No changes are planned."
+    return "\n".join(f"- {line}" for line in lines)
+
+
+_PLACEHOLDER = re.compile(r"\$([a-z]+)_[0-9a-f]{8}\b")
+
+
+def explanation_digest(*parts: Any) -> str:
+    """
+    SHA-256 of the canonical JSON of `parts`, with each distinct placeholder
+    ("$fld_1a2b3c4d") renumbered by first appearance ("$fld#1").
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    numbering: dict[str, str] = {}
+
+    def renumber(match: re.Match[str]) -> str:
+        placeholder = match.group(0)
+        if placeholder not in numbering:
+            numbering[placeholder] = f"${match.group(1)}#{len(numbering) + 1}"
+        return numbering[placeholder]
+
+    return hashlib.sha256(_PLACEHOLDER.sub(renumber, canonical).encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """
+    Bounded LRU of explanation text by digest.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> str | None:
+        text = self._entries.get(digest)
+        if text is not None:
+            self._entries.move_to_end(digest)
+        return text
+
+    def put(self, digest: str, text: str) -> None:
+        self._entries[digest] = text
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_cache: ExplanationCache | None = None
+
+
+def get_explanation_cache() -> ExplanationCache:
+    global _cache
+    if _cache is None:
+        _cache = ExplanationCache(get_settings().explanation_cache_size)
+    return _cache
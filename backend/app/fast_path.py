@@ -0,0 +1,282 @@
+"""
+Rule-based planner for formulaic edit requests, used before falling back to
+the LLM. It only answers when every form, field and option it mentions
+resolves unambiguously against the catalog.
+"""
+
+from typing import Any
+import re
+
+from .db import Database
+from .intent_schema import FieldIntent, IntentPlan, OperationType, OptionIntent, TargetForm
+from .prompt_injection import detect_injection_attempt, sanitize_input
+from .resolver import _pick_exact_match
+
+
+_FLAGS = re.IGNORECASE
+
+_ADD_CLAUSE = re.compile(
+    r"(?:add|include|insert) (?:an? |the )?(?:new )?(?:(?:option|value|choice)s? )?(?P<values>.+?)"
+    r"(?: (?:option|value|choice)s?)?",
+    _FLAGS,
+)
+_RENAME_CLAUSE = re.compile(
+    r"(?:change|rename|replace) (?:the )?(?:(?:option|value|choice) )?(?P<old>.+?)"
+    r"(?: (?:option|value|choice))? (?:to|with|into) (?P<new>.+?)",
+    _FLAGS,
+)
+_REMOVE_CLAUSE = re.compile(
+    r"(?:remove|delete|drop|deactivate) (?:the )?(?:(?:option|value|choice)s? )?(?P<values>.+?)"
+    r"(?: (?:option|value|choice)s?)?",
+    _FLAGS,
+)
+
+# "update the dropdown options for the destination field in the travel request form: 1. ..., 2. ..."
+_OPTIONS_HEADER = re.compile(
+    r"(?:update|edit|change|modify) (?:the )?(?:(?:dropdown|select|radio|checkbox) )?(?:options|choices|values) "
+    r"(?:for|of|on|in) (?:the )?(?P<target>.+?)\s*:\s*(?P<clauses>.+)",
+    _FLAGS,
+)
+# "<clause> to/from/in the <field> field on the <form> form"
+_TARGET_CONNECTOR = re.compile(r" (?:to|from|in|on|for) (?:the )?", _FLAGS)
+_FIELD_TARGET = re.compile(
+    r"(?P<field>.+?) (?:field|dropdown|list|select|radio|options|choices) (?:in|on|of) (?:the )?(?P<form>.+?)(?: form)?",
+    _FLAGS,
+)
+_CLAUSE_SPLIT = re.compile(
+    r"\s*(?:\d+[.)]\s+|;\s*|,\s*(?:and\s+)?(?=(?:add|include|insert|change|rename|replace|remove|delete|drop)\b)"
+    r"|\s+and\s+(?=(?:add|include|insert|change|rename|replace|remove|delete|drop)\b))",
+    _FLAGS,
+)
+_VALUE_SPLIT = re.compile(r"\s*(?:,\s*(?:and\s+)?|\s+and\s+|/)\s*", _FLAGS)
+# Nouns that name a kind of thing rather than option text ("add a new form
+# to the destinations field"); requests using them go to the LLM planner.
+_GENERIC_VALUES = {
+    "form", "forms", "field", "fields", "option", "options", "value", "values",
+    "choice", "choices", "dropdown", "question", "questions", "item", "items", "entry", "entries",
+}
+
+_FIELD_STATES: dict[str, dict[str, Any]] = {
+    "required": {"required": True},
+    "mandatory": {"required": True},
+    "optional": {"required": False},
+    "not required": {"required": False},
+    "read-only": {"read_only": True},
+    "read only": {"read_only": True},
+    "editable": {"read_only": False},
+}
+_STATE = "|".join(re.escape(state) for state in sorted(_FIELD_STATES, key=len, reverse=True))
+_MAKE_FIELD = [
+    # "make the company name field on the travel request form required"
+    re.compile(
+        rf"(?:make|set|mark) (?:the )?(?P<field>.+?)(?: field)? (?:in|on|of) (?:the )?(?P<form>.+?)(?: form)?"
+        rf" (?:as )?(?P<state>{_STATE})",
+        _FLAGS,
+    ),
+    # "make company name required on the travel request form"
+    re.compile(
+        rf"(?:make|set|mark) (?:the )?(?P<field>.+?)(?: field)? (?:as )?(?P<state>{_STATE})"
+        rf" (?:in|on|of) (?:the )?(?P<form>.+?)(?: form)?",
+        _FLAGS,
+    ),
+]
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().rstrip(".!")
+
+
+def _split_values(text: str) -> list[str] | None:
+    values = [value.strip(" \"'") for value in _VALUE_SPLIT.split(text)]
+    values = [value for value in values if value]
+    if any(value.casefold() in _GENERIC_VALUES for value in values):
+        return None
+    return values
+
+
+def _parse_option_clauses(text: str) -> dict[str, Any] | None:
+    """
+    Parse add/rename/remove clauses into OptionIntent arguments, or None when
+    any clause is not one of the known shapes.
+    """
+    add_values: list[str] = []
+    rename_map: dict[str, str] = {}
+    remove_values: list[str] = []
+    clauses = [clause.strip(" ,;.") for clause in _CLAUSE_SPLIT.split(text)]
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return None
+    for clause in clauses:
+        if match := _RENAME_CLAUSE.fullmatch(clause):
+            old = match.group("old").strip(" \"'")
+            new = match.group("new").strip(" \"'")
+            if not old or not new or new.casefold() in _GENERIC_VALUES:
+                return None
+            rename_map[old] = new
+        elif match := _ADD_CLAUSE.fullmatch(clause):
+            values = _split_values(match.group("values"))
+            if values is None:
+                return None
+            add_values.extend(values)
+        elif match := _REMOVE_CLAUSE.fullmatch(clause):
+            values = _split_values(match.group("values"))
+            if values is None:
+                return None
+            remove_values.extend(values)
+        else:
+            return None
+    return {"add_values": add_values, "rename_map": rename_map, "remove_values": remove_values}
+
+
+def _split_target(text: str) -> tuple[str, str, str] | None:
+    """
+    Split "<clauses> to the <field> field on the <form> form" into its parts,
+    trying the right-most connector first so clause text may contain "to".
+    """
+    for connector in reversed(list(_TARGET_CONNECTOR.finditer(text))):
+        target = _FIELD_TARGET.fullmatch(text[connector.end():])
+        if target:
+            return text[:connector.start()], target.group("field"), target.group("form")
+    return None
+
+
+async def _resolve_form(db: Database, text: str) -> dict[str, Any] | None:
+    matches = await db.search_forms(text)
+    if len(matches) == 1:
+        return matches[0]
+    return _pick_exact_match(matches, text, ("title", "slug"))
+
+
+async def _resolve_field(db: Database, form_id: str, text: str) -> dict[str, Any] | None:
+    matches = await db.search_fields(form_id, text)
+    if len(matches) == 1:
+        return matches[0]
+    return _pick_exact_match(matches, text, ("label", "code"))
+
+
+def _find_item(items: list[dict[str, Any]], wanted: str) -> dict[str, Any] | None:
+    wanted = wanted.casefold()
+    for item in items:
+        if str(item["value"]).casefold() == wanted or str(item["label"]).casefold() == wanted:
+            return item
+    return None
+
+
+def _match_case(value: str, items: list[dict[str, Any]]) -> str:
+    """
+    Capitalize new option text when every existing label is capitalized, so
+    "paris" joins "London" and "Tokyo" as "Paris".
+    """
+    labels = [str(item["label"]) for item in items if str(item["label"])[:1].isalpha()]
+    if labels and all(label[:1].isupper() for label in labels):
+        return " ".join(word[:1].upper() + word[1:] for word in value.split(" "))
+    return value
+
+
+def _target_form(form: dict[str, Any]) -> TargetForm:
+    return TargetForm(form_id=str(form["id"]), form_name=form["title"], form_code=form["slug"])
+
+
+async def _plan_option_edit(
+    db: Database, edits: dict[str, Any], field_text: str, form_text: str
+) -> IntentPlan | None:
+    form = await _resolve_form(db, form_text)
+    if not form:
+        return None
+    field = await _resolve_field(db, str(form["id"]), field_text)
+    if not field:
+        return None
+    field_type = await db.fetch_one("SELECT has_options FROM field_types WHERE id = ?", [field["type_id"]])
+    if not field_type or not field_type["has_options"]:
+        return None
+
+    items = await db.get_option_items_for_field(field["id"])
+    add_values: list[str] = []
+    for value in edits["add_values"]:
+        if _find_item(items, value):
+            return None
+        add_values.append(_match_case(value, items))
+    rename_map: dict[str, str] = {}
+    for old, new in edits["rename_map"].items():
+        item = _find_item(items, old)
+        if not item:
+            return None
+        rename_map[item["label"]] = _match_case(new, items)
+    remove_values: list[str] = []
+    for value in edits["remove_values"]:
+        item = _find_item(items, value)
+        if not item:
+            return None
+        remove_values.append(item["label"])
+
+    return IntentPlan(
+        options=[
+            OptionIntent(
+                # Option edits are "insert" intents; removal-only edits are
+                # deletes so they are not flagged as having nothing to add.
+                operation=OperationType.insert if add_values or rename_map else OperationType.delete,
+                target_form=_target_form(form),
+                field_code=field["code"],
+                field_label=field["label"],
+                add_values=add_values,
+                rename_map=rename_map,
+                remove_values=remove_values,
+            )
+        ],
+        notes="Planned by the rule-based fast path.",
+    )
+
+
+async def _plan_field_state(
+    db: Database, field_text: str, form_text: str, state: str
+) -> IntentPlan | None:
+    form = await _resolve_form(db, form_text)
+    if not form:
+        return None
+    field = await _resolve_field(db, str(form["id"]), field_text)
+    if not field:
+        return None
+    return IntentPlan(
+        fields=[
+            FieldIntent(
+                operation=OperationType.update,
+                target_form=_target_form(form),
+                field_code=field["code"],
+                properties=dict(_FIELD_STATES[state.lower()]),
+            )
+        ],
+        notes="Planned by the rule-based fast path.",
+    )
+
+
+async def parse_fast_path(query: str, db: Database) -> IntentPlan | None:
+    """
+    Return an IntentPlan for a formulaic request, or None when the request
+    does not fit a known pattern or anything in it is ambiguous. Requests the
+    injection check flags are left to the LLM path, which rejects them.
+    """
+    is_suspicious, _ = detect_injection_attempt(query)
+    if is_suspicious:
+        return None
+    text = _normalize(sanitize_input(query))
+    if not text:
+        return None
+
+    for pattern in _MAKE_FIELD:
+        if match := pattern.fullmatch(text):
+            return await _plan_field_state(db, match.group("field"), match.group("form"), match.group("state"))
+
+    if match := _OPTIONS_HEADER.fullmatch(text):
+        target = _FIELD_TARGET.fullmatch(match.group("target"))
+        edits = _parse_option_clauses(match.group("clauses"))
+        if not target or not edits:
+            return None
+        return await _plan_option_edit(db, edits, target.group("field"), target.group("form"))
+
+    split = _split_target(text)
+    if split:
+        clauses, field_text, form_text = split
+        edits = _parse_option_clauses(clauses)
+        if edits:
+            return await _plan_option_edit(db, edits, field_text, form_text)
+    return None
@@ -0,0 +1,186 @@
+"""
+Field-to-logic reverse references.
+
+Logic conditions (`lhs_ref`) and actions (`target_ref`) name the field they
+read or act on inside a JSON string, by `field_id` or, for older rows, by
+`field_code`. The `field_references` table (migration 7) indexes those
+strings by field and is kept current by triggers on both logic tables, so
+finding the logic that depends on a field costs one index lookup per
+reference instead of a parse of every condition and action.
+
+The resolver uses it to cascade field deletes and code renames into the
+change-set; `dangling_references` reports logic of the affected forms that
+would be left pointing at a field that does not exist.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+import json
+
+from .db import Database
+
+
+_REF_COLUMNS = {"logic_conditions": "lhs_ref", "logic_actions": "target_ref"}
+_KINDS = {"logic_conditions": "condition", "logic_actions": "action"}
+
+
+def _placeholders(ids: list[str]) -> str:
+    return ",".join("?" for _ in ids)
+
+
+def _rows(change_set: dict[str, Any], table: str, op: str) -> list[dict[str, Any]]:
+    return [row for row in (change_set.get(table) or {}).get(op) or [] if isinstance(row, dict)]
+
+
+def _existing_ids(rows: Iterable[dict[str, Any]]) -> set[str]:
+    return {str(row["id"]) for row in rows if row.get("id") is not None and not str(row["id"]).startswith("$")}
+
+
+def ref_field(ref: Any) -> tuple[str | None, str | None] | None:
+    """
+    `(field_id, field_code)` of a field reference, or None for anything else.
+    """
+    try:
+        ref_obj = json.loads(ref) if isinstance(ref, str) else ref
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(ref_obj, dict) or ref_obj.get("type") != "field":
+        return None
+    field_id, field_code = ref_obj.get("field_id"), ref_obj.get("field_code")
+    return (None if field_id is None else str(field_id), None if field_code is None else str(field_code))
+
+
+async def references_to_fields(db: Database, field_ids: Iterable[str]) -> list[dict[str, Any]]:
+    """
+    Conditions and actions referencing any of `field_ids`, by id or by the
+    field's code within its form. Each row has `ref_table`, `ref_id`,
+    `rule_id`, `field_id` and `by_code`.
+    """
+    ids = sorted(set(field_ids))
+    if not ids:
+        return []
+    marks = _placeholders(ids)
+    return await db.fetch_all(
+        "SELECT r.ref_table, r.ref_id, r.rule_id, r.field_id, 0 AS by_code "
+        f"FROM field_references r WHERE r.field_id IN ({marks}) "
+        "UNION ALL "
+        "SELECT r.ref_table, r.ref_id, r.rule_id, f.id, 1 "
+        "FROM form_fields f "
+        "JOIN field_references r ON r.field_id IS NULL AND r.field_code = f.code "
+        "JOIN logic_rules lr ON lr.id = r.rule_id AND lr.form_id = f.form_id "
+        f"WHERE f.id IN ({marks}) "
+        "ORDER BY 1, 2",
+        ids + ids,
+    )
+
+
+async def logic_children(db: Database, table: str, rule_ids: Iterable[str]) -> list[dict[str, Any]]:
+    """
+    `id`, `rule_id` and the field reference (`ref`) of every row of `table`
+    belonging to `rule_ids`.
+    """
+    ids = sorted(set(rule_ids))
+    if not ids:
+        return []
+    return await db.fetch_all(
+        f"SELECT id, rule_id, {_REF_COLUMNS[table]} AS ref FROM {table} "
+        f"WHERE rule_id IN ({_placeholders(ids)}) ORDER BY rule_id, position, id",
+        ids,
+    )
+
+
+async def dangling_references(
+    db: Database, change_set: dict[str, Any], form_ids: Iterable[str]
+) -> list[str]:
+    """
+    Warnings for logic of `form_ids` that, once `change_set` is applied,
+    references a field that does not exist: existing references the change
+    leaves dangling (or that already were), and new or edited ones pointing
+    at a deleted or unknown field.
+    """
+    form_ids = sorted({str(form_id) for form_id in form_ids if not str(form_id).startswith("$")})
+    deleted_fields = _existing_ids(_rows(change_set, "form_fields", "delete"))
+    inserted_fields = {str(row.get("id")) for row in _rows(change_set, "form_fields", "insert")}
+    deleted_rules = _existing_ids(_rows(change_set, "logic_rules", "delete"))
+    rule_names = {str(row.get("id")): row.get("name") for row in _rows(change_set, "logic_rules", "insert")}
+    # Existing rows the change-set deletes or rewrites are judged by their new state below.
+    replaced = {
+        (table, row_id)
+        for table in _REF_COLUMNS
+        for op in ("update", "delete")
+        for row_id in _existing_ids(_rows(change_set, table, op))
+    }
+
+    dangling: list[tuple[str, str, str, str]] = []
+    if form_ids:
+        rows = await db.fetch_all(
+            "SELECT r.ref_table, r.ref_id, r.rule_id, lr.name, "
+            "COALESCE(r.field_id, r.field_code) AS field, COALESCE(by_id.id, by_code.id) AS resolved "
+            "FROM logic_rules lr "
+            "JOIN field_references r ON r.rule_id = lr.id "
+            "LEFT JOIN form_fields by_id ON by_id.id = r.field_id "
+            "LEFT JOIN form_fields by_code ON r.field_id IS NULL "
+            "AND by_code.form_id = lr.form_id AND by_code.code = r.field_code "
+            f"WHERE lr.form_id IN ({_placeholders(form_ids)}) "
+            "ORDER BY lr.priority, r.rule_id, r.ref_table, r.ref_id",
+            form_ids,
+        )
+        for row in rows:
+            if (row["ref_table"], str(row["ref_id"])) in replaced or str(row["rule_id"]) in deleted_rules:
+                continue
+            resolved = None if row["resolved"] is None else str(row["resolved"])
+            if resolved is None or resolved in deleted_fields:
+                rule_names.setdefault(str(row["rule_id"]), row["name"])
+                dangling.append((row["ref_table"], str(row["rule_id"]), str(row["field"]), resolved or ""))
+
+    written: list[tuple[str, str, str]] = []
+    unowned: dict[str, list[str]] = {}
+    for table, column in _REF_COLUMNS.items():
+        for op in ("insert", "update"):
+            for row in _rows(change_set, table, op):
+                ref = ref_field(row.get(column))
+                if ref is None or ref[0] is None:
+                    continue
+                if row.get("rule_id") is None:
+                    unowned.setdefault(table, []).append(str(row.get("id")))
+                written.append((table, str(row.get("rule_id") or row.get("id")), ref[0]))
+    # Edited rows carry their id only; name them by their rule.
+    owners: dict[str, str] = {}
+    for table, row_ids in unowned.items():
+        found = await db.fetch_all(
+            f"SELECT id, rule_id FROM {table} WHERE id IN ({_placeholders(row_ids)})", row_ids
+        )
+        owners.update((str(row["id"]), str(row["rule_id"])) for row in found)
+    to_check = sorted({field_id for _, _, field_id in written if not field_id.startswith("$")} - deleted_fields)
+    existing = set(inserted_fields)
+    if to_check:
+        found = await db.fetch_all(f"SELECT id FROM form_fields WHERE id IN ({_placeholders(to_check)})", to_check)
+        existing.update(str(row["id"]) for row in found)
+    for table, owner, field_id in written:
+        rule_id = owners.get(owner, owner)
+        if field_id in deleted_fields:
+            dangling.append((table, rule_id, field_id, field_id))
+        elif field_id not in existing:
+            dangling.append((table, rule_id, field_id, ""))
+
+    missing_names = sorted({rule_id for _, rule_id, _, _ in dangling if rule_id not in rule_names})
+    if missing_names:
+        for row in await db.fetch_all(
+            f"SELECT id, name FROM logic_rules WHERE id IN ({_placeholders(missing_names)})", missing_names
+        ):
+            rule_names[str(row["id"])] = row["name"]
+    # Deleted fields are named by their code.
+    codes: dict[str, str] = {}
+    named = sorted({resolved for _, _, _, resolved in dangling if resolved})
+    if named:
+        for row in await db.fetch_all(f"SELECT id, code FROM form_fields WHERE id IN ({_placeholders(named)})", named):
+            codes[str(row["id"])] = str(row["code"])
+
+    warnings: list[str] = []
+    for table, rule_id, field, resolved in dangling:
+        rule = rule_names.get(rule_id) or rule_id
+        state = "is deleted by this change" if resolved else "does not exist"
+        warning = f"Logic rule '{rule}' has a {_KINDS[table]} referencing field '{codes.get(resolved, field)}' that {state}."
+        if warning not in warnings:
+            warnings.append(warning)
+    return warnings
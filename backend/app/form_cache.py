@@ -0,0 +1,212 @@
+"""
+Process-level cache of form structures.
+
+`Database.get_form_structure` costs one query per field plus several for
+pages and logic, and the form endpoint, `before_snapshot` and the planner's
+forms inventory all need the same structures. Entries here are validated
+against the trigger-maintained `form_versions` counters; while SQLite's
+`data_version` has not moved since an entry was last checked, even that
+single version lookup is skipped. `CompiledFormCache` applies the same
+scheme to objects compiled from those structures.
+"""
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+import inspect
+
+import orjson
+
+from .config import get_settings
+from .db import Database
+from .request_context import add_metric
+
+
+@dataclass
+class _Entry:
+    version: int
+    checked_at: int
+    payload: bytes
+
+
+class FormStructureCache:
+    """
+    Bounded LRU of form structures for one database, keyed by form id.
+    Structures are stored serialized, so callers always get their own copy.
+    """
+
+    def __init__(self, db: Database, max_entries: int) -> None:
+        self.db = db
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def versions(self, form_ids: Iterable[str]) -> dict[str, int]:
+        """
+        Current `form_versions` counter per form id, in one query. Forms that
+        were never written since the migration report 0.
+        """
+        ids = list(dict.fromkeys(str(form_id) for form_id in form_ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" for _ in ids)
+        rows = await self.db.fetch_all(
+            f"SELECT form_id, version FROM form_versions WHERE form_id IN ({placeholders})", ids
+        )
+        versions = {form_id: 0 for form_id in ids}
+        versions.update({str(row["form_id"]): int(row["version"]) for row in rows})
+        return versions
+
+    async def version(self, form_id: str) -> int | None:
+        """
+        The form's version counter, or None when the form does not exist.
+        One statement; no structure is built.
+        """
+        row = await self.db.fetch_one(
+            "SELECT COALESCE(v.version, 0) AS version FROM forms f "
+            "LEFT JOIN form_versions v ON v.form_id = f.id WHERE f.id = ?",
+            [str(form_id)],
+        )
+        return int(row["version"]) if row else None
+
+    async def catalog_version(self) -> int:
+        """
+        Total of all form versions. Counters only grow, so any write to any
+        form, including inserts and deletes, changes it.
+        """
+        row = await self.db.fetch_one("SELECT COALESCE(SUM(version), 0) AS version FROM form_versions")
+        return int(row["version"]) if row else 0
+
+    async def get(self, form_id: str) -> dict[str, Any] | None:
+        structures = await self.get_many([form_id])
+        return structures.get(str(form_id))
+
+    async def get_many(self, form_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """
+        Structures for the existing forms among `form_ids`, in the given order.
+        """
+        ids = list(dict.fromkeys(str(form_id) for form_id in form_ids))
+        await self.db.ensure_migrated()
+        data_version = await self.db.data_version()
+
+        unchecked = [
+            form_id
+            for form_id in ids
+            if form_id not in self._entries or self._entries[form_id].checked_at != data_version
+        ]
+        versions = await self.versions(unchecked)
+
+        structures: dict[str, dict[str, Any]] = {}
+        for form_id in ids:
+            entry = self._entries.get(form_id)
+            if entry is not None and form_id in versions:
+                if entry.version == versions[form_id]:
+                    entry.checked_at = data_version
+                else:
+                    entry = None
+            if entry is not None:
+                self._entries.move_to_end(form_id)
+                add_metric("form_cache_hits", 1)
+                structures[form_id] = orjson.loads(entry.payload)
+                continue
+
+            add_metric("form_cache_misses", 1)
+            # The version was read before building, so a concurrent write
+            # leaves this entry behind the counter and it is rebuilt next time.
+            structure = await self.db.get_form_structure(form_id)
+            if structure is None:
+                self._entries.pop(form_id, None)
+                continue
+            self._store(form_id, _Entry(versions[form_id], data_version, orjson.dumps(structure)))
+            structures[form_id] = structure
+        return structures
+
+    def _store(self, form_id: str, entry: _Entry) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[form_id] = entry
+        self._entries.move_to_end(form_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class _CompiledEntry(Generic[T]):
+    version: int
+    checked_at: int
+    value: T
+
+
+class CompiledFormCache(Generic[T]):
+    """
+    Bounded LRU of objects compiled from a form's structure (logic programs,
+    validation plans), keyed by form id and rebuilt when the form's version
+    counter moves. `compile` may be a coroutine function when it needs more
+    than the structure. Compiled objects are shared between callers and must
+    not be mutated.
+    """
+
+    def __init__(
+        self, db: Database, compile: Callable[[dict[str, Any]], T | Awaitable[T]], max_entries: int
+    ) -> None:
+        self.db = db
+        self.compile = compile
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _CompiledEntry[T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, form_id: str) -> T | None:
+        """
+        The compiled form, or None when the form does not exist.
+        """
+        form_id = str(form_id)
+        structures = get_form_cache(self.db)
+        await self.db.ensure_migrated()
+        data_version = await self.db.data_version()
+        entry = self._entries.get(form_id)
+        if entry is not None and entry.checked_at == data_version:
+            self._entries.move_to_end(form_id)
+            return entry.value
+
+        version = await structures.version(form_id)
+        if version is None:
+            self._entries.pop(form_id, None)
+            return None
+        if entry is not None and entry.version == version:
+            entry.checked_at = data_version
+            self._entries.move_to_end(form_id)
+            return entry.value
+
+        structure = await structures.get(form_id)
+        if structure is None:
+            return None
+        compiled = self.compile(structure)
+        if inspect.isawaitable(compiled):
+            compiled = await compiled
+        entry = _CompiledEntry(version, data_version, compiled)
+        if self.max_entries > 0:
+            self._entries[form_id] = entry
+            self._entries.move_to_end(form_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry.value
+
+
+_caches: dict[str, FormStructureCache] = {}
+
+
+def get_form_cache(db: Database) -> FormStructureCache:
+    key = str(db.path)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = FormStructureCache(db, get_settings().form_cache_size)
+        _caches[key] = cache
+    return cache
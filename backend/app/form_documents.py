@@ -0,0 +1,152 @@
+"""
+Materialized form documents.
+
+With FORM_DOCUMENTS_ENABLED, each form's full structure is kept as one JSON
+blob in `form_documents`, tagged with the `form_versions` counter it was
+built at. The version triggers advance that counter on any write to a child
+row, which makes the document stale; the next read rebuilds it from the
+normalized tables and stores it again, so rebuilds are incremental per form
+and happen at most once per change. Deleting a form deletes its document.
+
+Check or rebuild the table from the command line:
+
+    python -m app.form_documents check [--db PATH]
+    python -m app.form_documents rebuild [--db PATH] [--form FORM_ID ...]
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+import argparse
+import asyncio
+import sys
+
+import orjson
+
+from .db import Database
+
+
+async def _current_version(db: Database, form_id: str) -> int:
+    row = await db.fetch_one("SELECT version FROM form_versions WHERE form_id = ?", [form_id])
+    return int(row["version"]) if row else 0
+
+
+async def _store(db: Database, form_id: str, version: int, structure: dict[str, Any]) -> None:
+    # Never overwrite a document built at a newer version by a concurrent reader.
+    await db.execute(
+        "INSERT INTO form_documents(form_id, version, document) VALUES (?, ?, ?) "
+        "ON CONFLICT(form_id) DO UPDATE SET version = excluded.version, document = excluded.document "
+        "WHERE excluded.version >= form_documents.version",
+        [form_id, version, orjson.dumps(structure).decode("utf-8")],
+    )
+
+
+async def rebuild_document(db: Database, form_id: str) -> dict[str, Any] | None:
+    """
+    Build `form_id` from the normalized tables and store its document.
+    """
+    # Read before building: a write in between leaves the document stale.
+    version = await _current_version(db, form_id)
+    structure = await db.build_form_structure(form_id)
+    if structure is None:
+        await db.execute("DELETE FROM form_documents WHERE form_id = ?", [form_id])
+        return None
+    await _store(db, form_id, version, structure)
+    return structure
+
+
+async def materialized_structure(db: Database, form_id: str) -> dict[str, Any] | None:
+    """
+    The form's document if it is current, otherwise a freshly built one.
+    """
+    row = await db.fetch_one(
+        "SELECT d.document, d.version = COALESCE(v.version, 0) AS current "
+        "FROM form_documents d LEFT JOIN form_versions v ON v.form_id = d.form_id "
+        "WHERE d.form_id = ?",
+        [form_id],
+    )
+    if row is not None and row["current"]:
+        return orjson.loads(row["document"])
+    return await rebuild_document(db, form_id)
+
+
+@dataclass
+class DocumentReport:
+    checked: int = 0
+    stale: list[str] = field(default_factory=list)
+    mismatched: list[str] = field(default_factory=list)
+    orphaned: list[str] = field(default_factory=list)
+
+    @property
+    def consistent(self) -> bool:
+        """
+        Stale documents are expected (they are rebuilt on read); current
+        ones that disagree with the tables, or documents of deleted forms,
+        are not.
+        """
+        return not self.mismatched and not self.orphaned
+
+
+async def check_documents(db: Database) -> DocumentReport:
+    """
+    Compare every current document with a structure built from the
+    normalized tables.
+    """
+    report = DocumentReport()
+    rows = await db.fetch_all(
+        "SELECT d.form_id, d.document, d.version = COALESCE(v.version, 0) AS current, "
+        "f.id IS NOT NULL AS form_exists "
+        "FROM form_documents d "
+        "LEFT JOIN form_versions v ON v.form_id = d.form_id "
+        "LEFT JOIN forms f ON f.id = d.form_id "
+        "ORDER BY d.form_id"
+    )
+    for row in rows:
+        form_id = str(row["form_id"])
+        report.checked += 1
+        if not row["form_exists"]:
+            report.orphaned.append(form_id)
+        elif not row["current"]:
+            report.stale.append(form_id)
+        elif orjson.loads(row["document"]) != await db.build_form_structure(form_id):
+            report.mismatched.append(form_id)
+    return report
+
+
+async def rebuild_documents(db: Database, form_ids: list[str] | None = None) -> int:
+    """
+    Rebuild the documents of `form_ids` (default: every form) and drop those
+    of deleted forms. Returns the number of documents written.
+    """
+    if form_ids is None:
+        await db.execute("DELETE FROM form_documents WHERE form_id NOT IN (SELECT id FROM forms)")
+        form_ids = [str(row["id"]) for row in await db.fetch_all("SELECT id FROM forms ORDER BY id")]
+    written = 0
+    for form_id in form_ids:
+        if await rebuild_document(db, form_id) is not None:
+            written += 1
+    return written
+
+
+async def _main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.form_documents", description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--db", type=Path, default=None, help="SQLite file (default: SQLITE_PATH)")
+    parser.add_argument("--form", action="append", dest="forms", help="Rebuild only this form id")
+    args = parser.parse_args(argv)
+    db = Database(path=args.db)
+
+    if args.command == "rebuild":
+        print(f"Rebuilt {await rebuild_documents(db, args.forms)} form documents.")
+        return 0
+
+    report = await check_documents(db)
+    print(f"Checked {report.checked} form documents: {len(report.stale)} stale (rebuilt on next read).")
+    for label, form_ids in (("Out of sync", report.mismatched), ("Orphaned", report.orphaned)):
+        for form_id in form_ids:
+            print(f"  {label}: {form_id}")
+    return 0 if report.consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,125 @@
+"""
+Form selectors: intents that target every form matching a status, category,
+slug pattern or org instead of one named form.
+
+Each fan-out intent expands its selector in one set-based query that also
+carries the per-form lookups the intent needs (the last page of every form,
+or the field with the intent's code). `COUNT(*) OVER ()` reports how many
+targets matched in total, while `LIMIT` stops the fetch at the row budget
+left under `MAX_CHANGED_ROWS`. The budget is therefore checked before any
+change-set rows are built, however many forms the selector matches.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+import json
+
+from .db import Database
+from .intent_schema import FormSelector
+
+
+def selector_filter(selector: FormSelector) -> tuple[str, list[Any]]:
+    """
+    SQL condition on `forms f` (and its parameters) matching `selector`.
+    """
+    clauses: list[str] = []
+    params: list[Any] = []
+    if selector.status:
+        clauses.append("f.status = ?")
+        params.append(selector.status.strip().lower())
+    if selector.category:
+        clauses.append(
+            "f.category_id IN (SELECT c.id FROM categories c "
+            "WHERE c.id = ? OR c.slug = ? COLLATE NOCASE OR c.name = ? COLLATE NOCASE)"
+        )
+        params.extend([selector.category.strip()] * 3)
+    if selector.slug_pattern:
+        clauses.append("f.slug GLOB ?")
+        params.append(selector.slug_pattern.strip().lower())
+    if selector.org_id:
+        clauses.append("f.org_id = ?")
+        params.append(selector.org_id)
+    if not clauses:
+        raise ValueError("Form selector needs at least one of status, category, slug_pattern or org_id")
+    return " AND ".join(clauses), params
+
+
+def describe_selector(selector: FormSelector) -> str:
+    fields = selector.model_dump(exclude_none=True)
+    return ", ".join(f"{key}={value!r}" for key, value in fields.items())
+
+
+async def forms_for_field_insert(
+    db: Database, selector: FormSelector, code: str, limit: int
+) -> list[dict[str, Any]]:
+    """
+    Forms matching `selector` with `form_id`, the id of the form's last page
+    (`page_id`), the highest field position on that page (`last_position`)
+    and whether the form already has a field `code` (`has_field`). Forms
+    without the field come first, and every row carries `matched`, the
+    number of those forms regardless of `limit`.
+    """
+    where, params = selector_filter(selector)
+    return await db.fetch_all(
+        "WITH targets AS ("
+        " SELECT f.id AS form_id,"
+        " (SELECT p.id FROM form_pages p WHERE p.form_id = f.id ORDER BY p.position DESC LIMIT 1) AS page_id,"
+        " EXISTS (SELECT 1 FROM form_fields x WHERE x.form_id = f.id AND x.code = ?) AS has_field"
+        f" FROM forms f WHERE {where}"
+        ") "
+        "SELECT t.form_id, t.page_id, t.has_field, "
+        "COALESCE((SELECT MAX(ff.position) FROM form_fields ff "
+        "WHERE ff.form_id = t.form_id AND ff.page_id = t.page_id), 0) AS last_position, "
+        "SUM(1 - t.has_field) OVER () AS matched "
+        "FROM targets t ORDER BY t.has_field, t.form_id LIMIT ?",
+        [code, *params, limit],
+    )
+
+
+async def fields_with_code(
+    db: Database,
+    selector: FormSelector,
+    code: str,
+    limit: int,
+    pending_form_ids: Iterable[str] = (),
+    rows_per_field: int = 1,
+    rows_per_unbound_field: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    The field `code` of every form matching `selector`: `form_id`,
+    `field_id`, `code`, `label` and the bound `option_set_id`, plus
+    `matched`. Forms in `pending_form_ids` (whose field is only being
+    inserted by the change-set) are included with a null `field_id`.
+
+    `planned` totals the change-set rows of all matches regardless of
+    `limit`, charging `rows_per_field` per field, or
+    `rows_per_unbound_field` for fields without an option set.
+    """
+    where, params = selector_filter(selector)
+    unbound = rows_per_field if rows_per_unbound_field is None else rows_per_unbound_field
+    return await db.fetch_all(
+        "SELECT f.id AS form_id, ff.id AS field_id, ff.code, ff.label, b.option_set_id, "
+        "COUNT(*) OVER () AS matched, "
+        "SUM(CASE WHEN b.option_set_id IS NULL THEN ? ELSE ? END) OVER () AS planned "
+        "FROM forms f "
+        "LEFT JOIN form_fields ff ON ff.form_id = f.id AND ff.code = ? "
+        "LEFT JOIN field_option_binding b ON b.field_id = ff.id "
+        f"WHERE {where} AND (ff.id IS NOT NULL OR f.id IN (SELECT value FROM json_each(?))) "
+        "ORDER BY f.id LIMIT ?",
+        [unbound, rows_per_field, code, *params, json.dumps(sorted(set(pending_form_ids))), limit],
+    )
+
+
+async def option_items_for_fields(db: Database, field_ids: Iterable[str]) -> list[dict[str, Any]]:
+    """
+    Option items bound to `field_ids`, with the owning `field_id`, in
+    position order.
+    """
+    return await db.fetch_all(
+        "SELECT b.field_id, oi.* "
+        "FROM field_option_binding b "
+        "JOIN option_items oi ON oi.option_set_id = b.option_set_id "
+        "WHERE b.field_id IN (SELECT value FROM json_each(?)) "
+        "ORDER BY b.field_id, oi.position",
+        [json.dumps(sorted(set(field_ids)))],
+    )
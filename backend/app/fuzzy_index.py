@@ -0,0 +1,483 @@
+"""
+In-memory character n-gram index for ranking clarification suggestions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+
+from .db import Database
+
+
+_NON_WORD = re.compile(r"[^\w\n]+|_+")
+_SPACES = re.compile(r" *\n *| {2,}")
+
+
+def _pad_texts(texts: list[str]) -> str:
+    """
+    Lowercase, collapse punctuation to single spaces and pad every text with a
+    leading and trailing space, joined by newlines (which never occur inside
+    a text), so all n-grams can be extracted from one buffer.
+    """
+    joined = "\n".join(text.replace("\n", " ") for text in texts).lower()
+    joined = _NON_WORD.sub(" ", joined)
+    joined = _SPACES.sub(lambda m: " \n " if "\n" in m.group(0) else " ", joined)
+    return f" {joined} "
+
+
+def _gram_codes(buffer: str, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encode every character n-gram of a padded buffer as one uint64 (21 bits per
+    code point) and return (codes, text number) for grams inside a text.
+    """
+    chars = np.frombuffer(buffer.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    width = chars.size - n + 1
+    if width <= 0:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    newline = chars == 10
+    codes = np.zeros(width, dtype=np.uint64)
+    crosses = np.zeros(width, dtype=bool)
+    for offset in range(n):
+        codes = (codes << np.uint64(21)) | chars[offset:offset + width]
+        crosses |= newline[offset:offset + width]
+    text_number = np.cumsum(newline)[:width]
+    keep = ~crosses
+    return codes[keep], text_number[keep].astype(np.int64)
+
+
+class NgramIndex:
+    """
+    Cosine similarity over binary character n-gram vectors.
+
+    Each n-gram gets a small integer id and the sparse document matrix is
+    stored row-wise (the gram ids of every slot) so queries scoped to one
+    group only touch that group's rows. With `inverted=True` it is also kept
+    column-wise (one posting array of slots per gram) and catalog-wide
+    scoring becomes a single `np.bincount`. Bulk loads are vectorized per
+    batch; upserts go to small side structures and replaced or removed
+    slots are masked out until `compact()`.
+    """
+
+    BATCH_SIZE = 50_000
+
+    def __init__(self, n: int = 3, inverted: bool = True) -> None:
+        self.n = n
+        self.inverted = inverted
+        self._vocab: dict[int, int] = {}
+        self._groups: dict[str, int] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slot_by_key: dict[str, int] = {}
+        self._keys: list[str] = []
+        # Per-slot arrays may be over-allocated; only the first `_size` are valid.
+        self._size = 0
+        self._slot_group = np.zeros(0, dtype=np.int32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        # Row-wise matrix over the bulk-loaded slots [0, _loaded).
+        self._loaded = 0
+        self._row_grams = np.zeros(0, dtype=np.int32)
+        self._row_start = np.zeros(1, dtype=np.int64)
+        self._group_order = np.zeros(0, dtype=np.int64)
+        self._group_sorted = np.zeros(0, dtype=np.int32)
+        # Column-wise postings, plus appends since the last load.
+        self._postings: dict[int, np.ndarray] = {}
+        self._pending: dict[int, list[int]] = {}
+        # Slots added by upsert since the last load.
+        self._extra_rows: dict[int, np.ndarray] = {}
+        self._extra_by_group: dict[int, list[int]] = {}
+        # Batches accumulated by bulk_add() until bulk_finish().
+        self._batch_rows: list[np.ndarray] = []
+        self._batch_lengths: list[np.ndarray] = []
+        self._batch_groups: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._slot_by_key)
+
+    def _group_id(self, group: str | None) -> int:
+        if group is None:
+            return -1
+        return self._groups.setdefault(group, len(self._groups))
+
+    def _gram_ids(self, codes: np.ndarray, grow: bool) -> np.ndarray:
+        unique, inverse = np.unique(codes, return_inverse=True)
+        lookup = np.empty(unique.size, dtype=np.int32)
+        for idx, code in enumerate(unique.tolist()):
+            gram_id = self._vocab.get(code)
+            if gram_id is None:
+                if grow:
+                    gram_id = len(self._vocab)
+                    self._vocab[code] = gram_id
+                else:
+                    gram_id = -1
+            lookup[idx] = gram_id
+        return lookup[inverse.reshape(-1)]
+
+    def _query_grams(self, text: str) -> np.ndarray:
+        codes, _ = _gram_codes(_pad_texts([text]), self.n)
+        grams = np.unique(self._gram_ids(codes, grow=False))
+        return grams[grams >= 0]
+
+    def bulk_load(self, entries: Iterable[tuple[str, str, str | None]]) -> None:
+        """
+        Replace the index contents with (key, text, group) entries.
+        """
+        self.bulk_start()
+        batch: list[tuple[str, str, str | None]] = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.BATCH_SIZE:
+                self.bulk_add(batch)
+                batch = []
+        self.bulk_add(batch)
+        self.bulk_finish()
+
+    def bulk_start(self) -> None:
+        self._reset()
+
+    def bulk_add(self, batch: list[tuple[str, str, str | None]]) -> None:
+        if not batch:
+            return
+        codes, text_number = _gram_codes(_pad_texts([text for _, text, _ in batch]), self.n)
+        grams = self._gram_ids(codes, grow=True).astype(np.int64)
+        # Deduplicate (text, gram) pairs and sort them by text in one pass.
+        stride = len(self._vocab) + 1
+        pairs = np.sort(text_number * stride + grams)
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+        self._batch_rows.append((pairs % stride).astype(np.int32))
+        self._batch_lengths.append(np.bincount(pairs // stride, minlength=len(batch)))
+        self._batch_groups.append(
+            np.fromiter((self._group_id(group) for _, _, group in batch), dtype=np.int32, count=len(batch))
+        )
+        for key, _, _ in batch:
+            if key in self._slot_by_key:
+                self._dead += 1
+            self._slot_by_key[key] = len(self._keys)
+            self._keys.append(key)
+
+    def bulk_finish(self) -> None:
+        rows = np.concatenate(self._batch_rows) if self._batch_rows else np.zeros(0, dtype=np.int32)
+        lengths = np.concatenate(self._batch_lengths) if self._batch_lengths else np.zeros(0, dtype=np.int64)
+        groups = np.concatenate(self._batch_groups) if self._batch_groups else np.zeros(0, dtype=np.int32)
+        self._batch_rows, self._batch_lengths, self._batch_groups = [], [], []
+        self._install(rows, lengths.astype(np.int64), groups)
+        if self._dead:
+            # Keys loaded twice keep only their last slot.
+            self._alive[:] = False
+            self._alive[list(self._slot_by_key.values())] = True
+
+    def _install(self, rows: np.ndarray, lengths: np.ndarray, groups: np.ndarray) -> None:
+        count = lengths.size
+        self._size = count
+        self._loaded = count
+        self._norms = np.sqrt(np.maximum(lengths, 1)).astype(np.float32)
+        self._slot_group = groups
+        self._alive = np.ones(count, dtype=bool)
+        self._row_grams = rows
+        self._row_start = np.concatenate([[0], np.cumsum(lengths)])
+        self._group_order = np.argsort(groups, kind="stable")
+        self._group_sorted = groups[self._group_order]
+        if self.inverted and rows.size:
+            slots = np.repeat(np.arange(count, dtype=np.int32), lengths)
+            order = np.argsort(rows, kind="stable")
+            unique, starts = np.unique(rows[order], return_index=True)
+            self._postings = dict(zip(unique.tolist(), np.split(slots[order], starts[1:])))
+
+    def _ensure_capacity(self, size: int) -> None:
+        if size <= self._alive.size:
+            return
+        capacity = max(size, 2 * self._alive.size, 64)
+        for name in ("_slot_group", "_norms", "_alive"):
+            current = getattr(self, name)
+            grown = np.zeros(capacity, dtype=current.dtype)
+            grown[: current.size] = current
+            setattr(self, name, grown)
+
+    def upsert(self, key: str, text: str, group: str | None = None) -> None:
+        self.remove(key)
+        codes, _ = _gram_codes(_pad_texts([text]), self.n)
+        grams = np.unique(self._gram_ids(codes, grow=True))
+        slot = self._size
+        group_id = self._group_id(group)
+        self._ensure_capacity(slot + 1)
+        self._size += 1
+        self._keys.append(key)
+        self._slot_by_key[key] = slot
+        self._norms[slot] = np.sqrt(max(grams.size, 1))
+        self._slot_group[slot] = group_id
+        self._alive[slot] = True
+        self._extra_rows[slot] = grams
+        self._extra_by_group.setdefault(group_id, []).append(slot)
+        if self.inverted:
+            for gram in grams.tolist():
+                self._pending.setdefault(gram, []).append(slot)
+        if self._dead + len(self._extra_rows) > max(1024, self._loaded // 4):
+            self.compact()
+
+    def remove(self, key: str) -> None:
+        slot = self._slot_by_key.pop(key, None)
+        if slot is not None and self._alive[slot]:
+            self._alive[slot] = False
+            self._dead += 1
+
+    def compact(self) -> None:
+        """
+        Rebuild the dense structures from live slots only.
+        """
+        live = np.flatnonzero(self._alive[: self._size])
+        keys = [self._keys[slot] for slot in live.tolist()]
+        rows = [self._slot_grams(slot) for slot in live.tolist()]
+        groups = self._slot_group[live].astype(np.int32)
+        lengths = np.fromiter((row.size for row in rows), dtype=np.int64, count=len(rows))
+        grams = np.concatenate(rows).astype(np.int32) if rows else np.zeros(0, dtype=np.int32)
+        self._reset()
+        self._keys = keys
+        self._slot_by_key = {key: slot for slot, key in enumerate(keys)}
+        self._install(grams, lengths, groups)
+
+    def _slot_grams(self, slot: int) -> np.ndarray:
+        if slot < self._loaded:
+            return self._row_grams[self._row_start[slot]:self._row_start[slot + 1]]
+        return self._extra_rows[slot]
+
+    def _group_slots(self, group_id: int) -> np.ndarray:
+        lo = np.searchsorted(self._group_sorted, group_id, side="left")
+        hi = np.searchsorted(self._group_sorted, group_id, side="right")
+        slots = self._group_order[lo:hi]
+        extra = self._extra_by_group.get(group_id)
+        if extra:
+            slots = np.concatenate([slots, np.asarray(extra, dtype=np.int64)])
+        return slots[self._alive[slots]]
+
+    def _score_rows(self, query: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        if not slots.size:
+            return np.zeros(0)
+        rows = [self._slot_grams(int(slot)) for slot in slots]
+        lengths = np.fromiter((row.size for row in rows), dtype=np.int64, count=len(rows))
+        hits = np.isin(np.concatenate(rows), query).astype(np.int64)
+        counts = np.add.reduceat(np.append(hits, 0), np.concatenate([[0], np.cumsum(lengths)[:-1]]))
+        counts[lengths == 0] = 0
+        return counts / (self._norms[slots] * np.sqrt(query.size))
+
+    def _score_all(self, query: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        live = np.flatnonzero(self._alive[: self._size])
+        if not self.inverted:
+            return live, self._score_rows(query, live)
+        grams = query.tolist()
+        chunks = [self._postings[g] for g in grams if g in self._postings]
+        chunks += [np.asarray(self._pending[g], dtype=np.int32) for g in grams if g in self._pending]
+        if not chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        counts = np.bincount(np.concatenate(chunks), minlength=self._size)[live]
+        return live, counts / (self._norms[live] * np.sqrt(query.size))
+
+    def top_k(
+        self, query: str, k: int = 5, group: str | None = None, min_score: float = 0.1
+    ) -> list[tuple[float, str]]:
+        """
+        Return up to `k` (score, key) pairs ranked by cosine similarity,
+        optionally restricted to one group (e.g. the fields of one form).
+        """
+        grams = self._query_grams(query)
+        if not self._slot_by_key or not grams.size:
+            return []
+        if group is not None:
+            group_id = self._groups.get(group)
+            if group_id is None:
+                return []
+            slots = self._group_slots(group_id)
+            scores = self._score_rows(grams, slots)
+        else:
+            slots, scores = self._score_all(grams)
+        keep = scores >= min_score
+        slots, scores = slots[keep], scores[keep]
+        k = min(k, int(scores.size))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self._keys[int(slots[i])]) for i in top.tolist()]
+
+
+class CatalogSuggester:
+    """
+    Form and field n-gram indexes over one database, refreshed incrementally
+    from the trigger-maintained `catalog_changes` log. The indexes only hold
+    ids; suggested rows are read back from the database.
+
+    Full builds run in the background (`start()`, called at app startup):
+    rows are read in batches and the numpy work runs in a worker thread,
+    so a cold index never blocks the event loop. Until the first build
+    finishes, suggestions come from the FTS5 index instead. Each build
+    prunes the change-log entries it has consumed.
+    """
+
+    # Beyond this many changed rows a full rebuild is cheaper than patching.
+    REBUILD_THRESHOLD = 50_000
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self.forms = NgramIndex()
+        # Field suggestions are always scoped to one form, so catalog-wide
+        # postings would only cost memory.
+        self.fields = NgramIndex(inverted=False)
+        self._last_seq: int | None = None
+        self._lock = asyncio.Lock()
+        self._build: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._last_seq is not None
+
+    def start(self) -> asyncio.Task[None]:
+        """
+        Start a full build in the background unless one is running.
+        """
+        if self._build is None or self._build.done():
+            self._build = asyncio.create_task(self._rebuild())
+        return self._build
+
+    async def wait_ready(self) -> None:
+        if not self.ready:
+            await self.start()
+
+    async def refresh(self) -> bool:
+        """
+        Apply pending catalog changes; False while no build has finished.
+        """
+        if not self.ready:
+            self.start()
+            return False
+        async with self._lock:
+            changes = await self.db.fetch_all(
+                "SELECT table_name, row_id, MAX(seq) AS seq, MIN(seq) AS first_seq FROM catalog_changes "
+                "WHERE seq > ? GROUP BY table_name, row_id",
+                [self._last_seq],
+            )
+            if not changes:
+                return True
+            # Log entries right after ours were pruned by another process's
+            # build, so patching would miss changes.
+            pruned = min(int(row["first_seq"]) for row in changes) > self._last_seq + 1
+            if pruned or len(changes) > self.REBUILD_THRESHOLD:
+                # Keep serving the current indexes until the new ones are swapped in.
+                self.start()
+                return True
+            await self._apply_changes(changes)
+            self._last_seq = max(int(row["seq"]) for row in changes)
+        return True
+
+    async def _rebuild(self) -> None:
+        last = await self.db.fetch_one("SELECT COALESCE(MAX(seq), 0) AS seq FROM catalog_changes")
+        last_seq = int(last["seq"]) if last else 0
+        forms, fields = NgramIndex(), NgramIndex(inverted=False)
+        for table_name, index in (("forms", forms), ("form_fields", fields)):
+            columns, entry = _SOURCES[table_name]
+            last_rowid = 0
+            while True:
+                rows = await self.db.fetch_all(
+                    f"SELECT rowid AS _rowid, {columns} FROM {table_name} "
+                    "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    [last_rowid, NgramIndex.BATCH_SIZE],
+                )
+                if not rows:
+                    break
+                await asyncio.to_thread(index.bulk_add, [entry(row) for row in rows])
+                last_rowid = rows[-1]["_rowid"]
+            await asyncio.to_thread(index.bulk_finish)
+        async with self._lock:
+            self.forms, self.fields = forms, fields
+            self._last_seq = last_seq
+        # The newest entry stays so MAX(seq) never goes back for the other
+        # readers of the log. Skipping empty deletes spares a commit, which
+        # would invalidate caches keyed by the SQLite data version.
+        log = await self.db.fetch_one("SELECT MIN(seq) AS first_seq, MAX(seq) AS seq FROM catalog_changes")
+        if log and log["first_seq"] is not None and log["first_seq"] < min(last_seq + 1, log["seq"]):
+            await self.db.execute(
+                "DELETE FROM catalog_changes WHERE seq <= ? AND seq < ?",
+                [last_seq, log["seq"]],
+            )
+
+    async def _apply_changes(self, changes: list[dict[str, Any]]) -> None:
+        for table_name, index in (("forms", self.forms), ("form_fields", self.fields)):
+            columns, entry = _SOURCES[table_name]
+            row_ids = [str(row["row_id"]) for row in changes if row["table_name"] == table_name]
+            current = await self._fetch_by_ids(table_name, columns, row_ids)
+            for row_id in row_ids:
+                row = current.get(row_id)
+                if row is None:
+                    index.remove(row_id)
+                else:
+                    index.upsert(*entry(row))
+
+    async def _fetch_by_ids(
+        self, table_name: str, columns: str, row_ids: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        for start in range(0, len(row_ids), 500):
+            chunk = row_ids[start:start + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = await self.db.fetch_all(
+                f"SELECT {columns} FROM {table_name} WHERE id IN ({placeholders})", chunk
+            )
+            found.update({str(row["id"]): row for row in rows})
+        return found
+
+    async def _ranked_rows(
+        self, table_name: str, columns: str, ranked: list[tuple[float, str]]
+    ) -> list[dict[str, Any]]:
+        rows = await self._fetch_by_ids(table_name, columns, [key for _, key in ranked])
+        return [rows[key] for _, key in ranked if key in rows]
+
+    async def suggest_forms(self, text: str, k: int) -> list[dict[str, Any]]:
+        """
+        Closest forms to `text` as {id, title, slug} rows, best first.
+        """
+        if not await self.refresh():
+            rows = await self.db.search_forms(text, k)
+            return [{"id": row["id"], "title": row["title"], "slug": row["slug"]} for row in rows]
+        return await self._ranked_rows("forms", "id, title, slug", self.forms.top_k(text, k))
+
+    async def suggest_fields(self, form_id: str, text: str, k: int) -> list[dict[str, Any]]:
+        """
+        Closest fields of one form to `text` as {id, label, code} rows, best first.
+        """
+        if not await self.refresh():
+            rows = await self.db.search_fields(str(form_id), text, limit=k)
+            return [{"id": row["id"], "label": row["label"], "code": row["code"]} for row in rows]
+        ranked = self.fields.top_k(text, k, group=str(form_id))
+        return await self._ranked_rows("form_fields", "id, label, code", ranked)
+
+
+def _form_entry(row: dict[str, Any]) -> tuple[str, str, str | None]:
+    return str(row["id"]), f"{row['title']} {row['slug']}", None
+
+
+def _field_entry(row: dict[str, Any]) -> tuple[str, str, str | None]:
+    return str(row["id"]), f"{row['label']} {row['code']}", str(row["form_id"])
+
+
+# Columns read to (re)index each table and how a row becomes an index entry.
+_SOURCES = {
+    "forms": ("id, slug, title", _form_entry),
+    "form_fields": ("id, form_id, code, label", _field_entry),
+}
+
+
+_suggesters: dict[str, CatalogSuggester] = {}
+
+
+def get_catalog_suggester(db: Database) -> CatalogSuggester:
+    key = str(db.path)
+    suggester = _suggesters.get(key)
+    if suggester is None:
+        suggester = CatalogSuggester(db)
+        _suggesters[key] = suggester
+    return suggester
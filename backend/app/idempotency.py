@@ -0,0 +1,97 @@
+"""
+Idempotency-Key support for the LLM-backed endpoints.
+
+The first request under a key runs the handler as its own task; retries with
+the same key and payload await that task (or reuse its stored result) instead
+of re-running the LLM pipeline. Failed runs are not kept, so a retry after an
+error executes again.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, TypeVar
+import asyncio
+import hashlib
+import json
+import time
+
+from .config import get_settings
+from .exceptions import IdempotencyConflictError
+
+T = TypeVar("T")
+
+
+def request_fingerprint(payload: Any) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    task: asyncio.Task
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Bounded store of in-flight and completed results keyed by idempotency
+    key, with expiry measured from the first request.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget_failure(self, key: str, task: asyncio.Task) -> None:
+        entry = self._entries.get(key)
+        if entry is None or entry.task is not task:
+            return
+        if task.cancelled() or task.exception() is not None:
+            del self._entries[key]
+
+    async def run(
+        self, key: str, fingerprint: str, compute: Callable[[], Awaitable[T]]
+    ) -> tuple[T, bool]:
+        """
+        Return (result, replayed). Raises IdempotencyConflictError when the key
+        was already used with a different payload.
+        """
+        self._expire()
+        entry = self._entries.get(key)
+        replayed = entry is not None
+        if entry is None:
+            # A separate task, so a disconnecting first caller does not cancel
+            # the work other retries are waiting on.
+            task = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda done: self._forget_failure(key, done))
+            entry = _Entry(fingerprint, task, time.monotonic() + self.ttl_seconds)
+            self._entries[key] = entry
+            self._expire()
+        elif entry.fingerprint != fingerprint:
+            raise IdempotencyConflictError(
+                "This Idempotency-Key was already used with a different request payload."
+            )
+        return await asyncio.shield(entry.task), replayed
+
+
+_store: IdempotencyStore | None = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = IdempotencyStore(settings.idempotency_ttl_seconds, settings.idempotency_max_entries)
+    return _store
@@ -23,10 +23,21 @@ class EntityType(str, Enum):
     logic_action = "logic_action"
 
 
+class FormSelector(BaseModel):
+    status: str | None = None
+    # Category id, slug or name.
+    category: str | None = None
+    # Glob over form slugs, e.g. "hr-*".
+    slug_pattern: str | None = None
+    org_id: str | None = None
+
+
 class TargetForm(BaseModel):
     form_id: str | None = None
     form_name: str | None = None
     form_code: str | None = None
+    # Targets every form matching the selector instead of one named form.
+    selector: FormSelector | None = None
 
 
 class FieldIntent(BaseModel):
@@ -7,12 +7,24 @@ from collections.abc import Sequence
 from typing import Any, Literal, TypedDict, AsyncIterator
 
 import json
+import logging
 import httpx
 from anthropic import Anthropic
 from openai import OpenAI
 
 from .config import get_settings
 from .exceptions import LLMOperationError
+from .request_context import add_metric
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token for English text),
+    good enough for prompt budgeting without a tokenizer dependency.
+    """
+    return (len(text) + 3) // 4
 
 
 class LlmMessage(TypedDict):
@@ -47,9 +59,12 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None = None,
+        system_prefix: str | None = None,
     ) -> list[LlmMessage]:
+        # OpenAI caches the longest previously seen prompt prefix automatically,
+        # so the stable prefix only has to come first.
         messages: list[LlmMessage] = [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": (system_prefix or "") + system_prompt},
         ]
         if extra_messages:
             messages.extend(extra_messages)
@@ -61,20 +76,59 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None = None,
+        system_prefix: str | None = None,
     ) -> dict[str, Any]:
+        """
+        `system_prefix`, when given, is sent ahead of `system_prompt` and marked
+        as the cacheable part of the prompt; it must be identical across calls.
+        """
         if self.settings.llm_provider == "anthropic":
-            return self._generate_json_anthropic(system_prompt, user_prompt, extra_messages)
-        return self._generate_json_openai(system_prompt, user_prompt, extra_messages)
+            return self._generate_json_anthropic(system_prompt, user_prompt, extra_messages, system_prefix)
+        return self._generate_json_openai(system_prompt, user_prompt, extra_messages, system_prefix)
 
     def generate_text(
         self,
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None = None,
+        system_prefix: str | None = None,
     ) -> str:
         if self.settings.llm_provider == "anthropic":
-            return self._generate_text_anthropic(system_prompt, user_prompt, extra_messages)
-        return self._generate_text_openai(system_prompt, user_prompt, extra_messages)
+            return self._generate_text_anthropic(system_prompt, user_prompt, extra_messages, system_prefix)
+        return self._generate_text_openai(system_prompt, user_prompt, extra_messages, system_prefix)
+
+    def _anthropic_system(self, system_message: str, system_prefix: str | None) -> str | list[dict[str, Any]]:
+        if not system_prefix:
+            return system_message
+        blocks: list[dict[str, Any]] = [
+            {"type": "text", "text": system_prefix, "cache_control": {"type": "ephemeral"}},
+        ]
+        if system_message:
+            blocks.append({"type": "text", "text": system_message})
+        return blocks
+
+    def _record_usage(self, provider: str, usage: Any) -> None:
+        """
+        Log and add to the request metrics how many input tokens were billed
+        and how many of them were served from the provider's prompt cache.
+        """
+        if usage is None:
+            return
+        if provider == "anthropic":
+            cached = getattr(usage, "cache_read_input_tokens", None) or 0
+            written = getattr(usage, "cache_creation_input_tokens", None) or 0
+            input_tokens = (getattr(usage, "input_tokens", None) or 0) + cached + written
+        else:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+            input_tokens = getattr(usage, "prompt_tokens", None) or 0
+        add_metric("llm_calls", 1)
+        add_metric("llm_input_tokens", input_tokens)
+        add_metric("llm_cached_input_tokens", cached)
+        logger.info(
+            "%s call: %d input tokens (%d cached, %d uncached)",
+            provider, input_tokens, cached, input_tokens - cached,
+        )
 
     async def stream_text(
         self,
@@ -95,15 +149,17 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None,
+        system_prefix: str | None = None,
     ) -> dict[str, Any]:
         client = self._ensure_openai()
-        messages = self._build_messages(system_prompt, user_prompt, extra_messages)
+        messages = self._build_messages(system_prompt, user_prompt, extra_messages, system_prefix)
         try:
             response = client.chat.completions.create(
                 model=self.settings.openai_model,
                 messages=[{"role": m["role"], "content": m["content"]} for m in messages],
                 response_format={"type": "json_object"},
             )
+            self._record_usage("openai", getattr(response, "usage", None))
             content = response.choices[0].message.content or "{}"
             return json.loads(content)
         except Exception as e:
@@ -115,6 +171,7 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None,
+        system_prefix: str | None = None,
     ) -> dict[str, Any]:
         client = self._ensure_anthropic()
         messages = self._build_messages(system_prompt, user_prompt, extra_messages)
@@ -130,10 +187,11 @@ class LlmClient:
         try:
             result = client.messages.create(
                 model=self.settings.anthropic_model,
-                system=system_message,
+                system=self._anthropic_system(system_message, system_prefix),
                 max_tokens=2048,
                 messages=user_messages,
             )
+            self._record_usage("anthropic", getattr(result, "usage", None))
             text = result.content[0].text
             return json.loads(text)
         except Exception as e:
@@ -145,14 +203,16 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None,
+        system_prefix: str | None = None,
     ) -> str:
         client = self._ensure_openai()
-        messages = self._build_messages(system_prompt, user_prompt, extra_messages)
+        messages = self._build_messages(system_prompt, user_prompt, extra_messages, system_prefix)
         try:
             response = client.chat.completions.create(
                 model=self.settings.openai_model,
                 messages=[{"role": m["role"], "content": m["content"]} for m in messages],
             )
+            self._record_usage("openai", getattr(response, "usage", None))
             content = response.choices[0].message.content or ""
             return content
         except Exception as e:
@@ -209,6 +269,7 @@ class LlmClient:
         system_prompt: str,
         user_prompt: str,
         extra_messages: Sequence[LlmMessage] | None,
+        system_prefix: str | None = None,
     ) -> str:
         client = self._ensure_anthropic()
         messages = self._build_messages(system_prompt, user_prompt, extra_messages)
@@ -224,10 +285,11 @@ class LlmClient:
         try:
             result = client.messages.create(
                 model=self.settings.anthropic_model,
-                system=system_message,
+                system=self._anthropic_system(system_message, system_prefix),
                 max_tokens=1024,
                 messages=user_messages,
             )
+            self._record_usage("anthropic", getattr(result, "usage", None))
             return result.content[0].text
         except Exception as e:
             error_msg = f"Anthropic API error: {type(e).__name__}: {e}"
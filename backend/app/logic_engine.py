@@ -0,0 +1,449 @@
+"""
+Form runtime: evaluate a form's logic rules against submitted values.
+
+`compile_form_logic` turns a form structure (as built by
+`Database.get_form_structure`) into a `FormLogic`: every enabled rule, in
+priority order, becomes a condition closure and a list of action closures.
+Condition operands are parsed once, `in`/`not_in` lists become frozensets
+and `matches` patterns are compiled once, so evaluating a submission is a
+walk over prebuilt closures with no JSON parsing or lookups by id.
+
+Evaluation starts from each field's defaults (`visible_by_default`,
+`required`, `read_only`, `default_value` for fields missing from the
+submission) and applies the rules in order. Conditions are chained by
+their `bool_join` with AND binding tighter than OR; conditions sharing a
+`group_id` are chained first and the group then joins the chain as one
+operand. A rule with no conditions always fires. Later rules see the
+values and flags set by earlier ones, so the highest priority number wins.
+Values and field states are keyed by field code.
+
+`get_logic_cache(db)` keeps compiled forms per database, rebuilt when the
+form's version counter moves.
+"""
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+import asyncio
+import json
+import logging
+import re
+
+from .config import get_settings
+from .db import Database
+from .form_cache import CompiledFormCache
+
+logger = logging.getLogger(__name__)
+
+_TRUE_STRINGS = {"true", "yes", "y", "1", "on"}
+
+
+@dataclass
+class FormState:
+    """
+    Result of evaluating a form's logic for one submission.
+    """
+
+    values: dict[str, Any]
+    visible: dict[str, bool]
+    required: dict[str, bool]
+    enabled: dict[str, bool]
+    errors: list[str] = field(default_factory=list)
+    notices: list[str] = field(default_factory=list)
+    page_id: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "values": self.values,
+            "visible": self.visible,
+            "required": self.required,
+            "enabled": self.enabled,
+            "errors": self.errors,
+            "notices": self.notices,
+            "page_id": self.page_id,
+        }
+
+
+Condition = Callable[[FormState], bool]
+Action = Callable[[FormState], None]
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    id: str
+    name: str | None
+    trigger: str
+    condition: Condition
+    actions: tuple[Action, ...]
+
+
+def _json(text: Any) -> Any:
+    if not isinstance(text, str):
+        return text
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or (isinstance(value, (list, tuple, set, dict)) and not value)
+
+
+def _is_true(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value) and not isinstance(value, (list, tuple, dict))
+
+
+def _number(value: Any) -> float | None:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _key(value: Any) -> str:
+    """
+    Comparison key: submitted values are often strings even for numeric or
+    boolean fields, so equality and set membership compare text.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _items(value: Any) -> list[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+@lru_cache(maxsize=1024)
+def _regex(pattern: str) -> re.Pattern[str] | None:
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def _comparison(op: str, rhs: Any) -> Callable[[Any], bool]:
+    """
+    Predicate on the left-hand value for `op` with a parsed `rhs`.
+    """
+    if op in ("=", "!="):
+        expected = _key(rhs)
+
+        def equals(value: Any) -> bool:
+            # A multi-select equals a value when it includes it.
+            if isinstance(value, (list, tuple, set)):
+                return any(_key(item) == expected for item in value)
+            return value is not None and _key(value) == expected
+
+        return equals if op == "=" else (lambda value: not equals(value))
+
+    if op in (">", ">=", "<", "<="):
+        bound = _number(rhs)
+        compare = {
+            ">": lambda a, b: a > b,
+            ">=": lambda a, b: a >= b,
+            "<": lambda a, b: a < b,
+            "<=": lambda a, b: a <= b,
+        }[op]
+        if bound is None:
+            # Non-numeric bounds (ISO dates, codes) compare as text.
+            text = None if rhs is None else str(rhs)
+            return lambda value: text is not None and value is not None and compare(str(value), text)
+
+        def numeric(value: Any) -> bool:
+            number = _number(value)
+            return number is not None and compare(number, bound)
+
+        return numeric
+
+    if op in ("in", "not_in"):
+        members = frozenset(_key(item) for item in _items(rhs))
+        if op == "in":
+            return lambda value: any(_key(item) in members for item in _items(value))
+        return lambda value: not any(_key(item) in members for item in _items(value))
+
+    if op == "contains":
+        needle = _key(rhs)
+        folded = needle.casefold()
+
+        def contains(value: Any) -> bool:
+            if isinstance(value, (list, tuple, set)):
+                return any(_key(item) == needle for item in value)
+            return value is not None and folded in str(value).casefold()
+
+        return contains
+
+    if op == "matches":
+        regex = _regex(str(rhs)) if rhs is not None else None
+        if regex is None:
+            logger.warning("logic condition has an invalid pattern %r; it never matches", rhs)
+            return lambda value: False
+        return lambda value: value is not None and regex.search(str(value)) is not None
+
+    # A false rhs negates the unary operators.
+    negate = rhs is False or (isinstance(rhs, str) and rhs.strip().lower() == "false")
+    if op == "is_empty":
+        return (lambda value: not _is_empty(value)) if negate else _is_empty
+    if op == "is_true":
+        return (lambda value: not _is_true(value)) if negate else _is_true
+    raise ValueError(f"Unsupported logic operator '{op}'")
+
+
+class _Fields:
+    """
+    Field codes by id and by code, for resolving references.
+    """
+
+    def __init__(self, fields: Iterable[Mapping[str, Any]]) -> None:
+        self.codes: dict[str, str] = {}
+        for row in fields:
+            code = str(row.get("code"))
+            self.codes[str(row["id"])] = code
+            self.codes.setdefault(code, code)
+
+    def code(self, ref: Any) -> tuple[str | None, str]:
+        """
+        `(field code, property)` named by a reference; the code is None for
+        non-field references and fields not on the form.
+        """
+        ref_obj = _json(ref)
+        if not isinstance(ref_obj, dict) or ref_obj.get("type") != "field":
+            return None, "value"
+        key = ref_obj.get("field_id") or ref_obj.get("field_code")
+        return self.codes.get(str(key)) if key is not None else None, str(ref_obj.get("property") or "value")
+
+
+def _operand(code: str | None, prop: str) -> Callable[[FormState], Any]:
+    if code is None:
+        return lambda state: None
+    if prop == "value":
+        return lambda state: state.values.get(code)
+    if prop in ("visible", "required", "enabled"):
+        return lambda state: getattr(state, prop).get(code)
+    return lambda state: None
+
+
+def _compile_condition(row: Mapping[str, Any], fields: _Fields) -> Condition:
+    read = _operand(*fields.code(row.get("lhs_ref")))
+    test = _comparison(str(row.get("operator") or "="), _json(row.get("rhs")))
+    return lambda state: test(read(state))
+
+
+def _chain(operands: list[tuple[str, Condition]]) -> Condition:
+    """
+    Join `(bool_join, condition)` pairs with AND before OR. The first
+    operand's join is ignored.
+    """
+    runs: list[list[Condition]] = []
+    for index, (join, condition) in enumerate(operands):
+        if index == 0 or join == "OR":
+            runs.append([condition])
+        else:
+            runs[-1].append(condition)
+    conjunctions: list[Condition] = []
+    for run in runs:
+        if len(run) == 1:
+            conjunctions.append(run[0])
+        else:
+            steps = tuple(run)
+            conjunctions.append(lambda state, steps=steps: all(step(state) for step in steps))
+    if len(conjunctions) == 1:
+        return conjunctions[0]
+    alternatives = tuple(conjunctions)
+    return lambda state: any(alternative(state) for alternative in alternatives)
+
+
+def _order(row: Mapping[str, Any]) -> tuple[bool, int, str]:
+    position = row.get("position")
+    return (position is None, int(position or 0), str(row.get("id")))
+
+
+def _compile_conditions(rows: list[Mapping[str, Any]], fields: _Fields) -> Condition:
+    if not rows:
+        return lambda state: True
+    # Ungrouped conditions are chain operands of their own; a group is one
+    # operand joined by its first member's bool_join.
+    operands: list[tuple[str, list[Mapping[str, Any]]]] = []
+    groups: dict[str, int] = {}
+    for row in sorted(rows, key=_order):
+        join = str(row.get("bool_join") or "AND")
+        group = row.get("group_id")
+        if group is not None and str(group) in groups:
+            operands[groups[str(group)]][1].append(row)
+            continue
+        if group is not None:
+            groups[str(group)] = len(operands)
+        operands.append((join, [row]))
+    return _chain(
+        [
+            (join, _chain([(str(row.get("bool_join") or "AND"), _compile_condition(row, fields)) for row in members]))
+            for join, members in operands
+        ]
+    )
+
+
+def _set_flag(flag: str, code: str, value: bool) -> Action:
+    def action(state: FormState) -> None:
+        getattr(state, flag)[code] = value
+
+    return action
+
+
+def _compile_action(row: Mapping[str, Any], fields: _Fields) -> Action | None:
+    kind = str(row.get("action"))
+    params = _json(row.get("params"))
+    param = params.get("value", params.get("message", params.get("page_id"))) if isinstance(params, dict) else params
+    code, _ = fields.code(row.get("target_ref"))
+
+    if kind in ("show_error", "show_notice"):
+        message = str(param) if param is not None else str(row.get("target_ref") or "")
+        target = "errors" if kind == "show_error" else "notices"
+        return lambda state: getattr(state, target).append(message)
+    if kind == "jump_to_page":
+        target = _json(row.get("target_ref"))
+        page_id = target.get("page_id") if isinstance(target, dict) else None
+        page_id = str(page_id or param) if (page_id or param) is not None else None
+
+        def jump(state: FormState) -> None:
+            state.page_id = page_id
+
+        return jump
+    if code is None:
+        return None
+
+    flags = {
+        "show": ("visible", True),
+        "hide": ("visible", False),
+        "require": ("required", True),
+        "optional": ("required", False),
+        "enable": ("enabled", True),
+        "disable": ("enabled", False),
+    }
+    if kind in flags:
+        flag, value = flags[kind]
+        return _set_flag(flag, code, value)
+    if kind in ("set_value", "clear_value"):
+        value = param if kind == "set_value" else None
+
+        def assign(state: FormState) -> None:
+            state.values[code] = value
+
+        return assign
+    raise ValueError(f"Unsupported logic action '{kind}'")
+
+
+class FormLogic:
+    """
+    A form's compiled rules and field defaults.
+    """
+
+    def __init__(self, form_id: str, rules: list[CompiledRule], defaults: dict[str, dict[str, Any]]) -> None:
+        self.form_id = form_id
+        self.rules = tuple(rules)
+        self._by_trigger = {
+            trigger: tuple(rule for rule in rules if rule.trigger == trigger)
+            for trigger in ("on_load", "on_change", "on_submit")
+        }
+        self._visible = {code: bool(field["visible"]) for code, field in defaults.items()}
+        self._required = {code: bool(field["required"]) for code, field in defaults.items()}
+        self._enabled = {code: bool(field["enabled"]) for code, field in defaults.items()}
+        self._values = {code: field["value"] for code, field in defaults.items() if field["value"] is not None}
+
+    def initial_state(self, values: Mapping[str, Any]) -> FormState:
+        return FormState(
+            values={**self._values, **values},
+            visible=dict(self._visible),
+            required=dict(self._required),
+            enabled=dict(self._enabled),
+        )
+
+    def evaluate(self, values: Mapping[str, Any], trigger: str | None = None) -> FormState:
+        """
+        Field states after applying the rules (of `trigger`, or all rules)
+        to `values`, keyed by field code.
+        """
+        return self._run(self._rules(trigger), values)
+
+    def evaluate_many(self, submissions: Iterable[Mapping[str, Any]], trigger: str | None = None) -> list[FormState]:
+        rules = self._rules(trigger)
+        return [self._run(rules, values) for values in submissions]
+
+    def _rules(self, trigger: str | None) -> tuple[CompiledRule, ...]:
+        return self.rules if trigger is None else self._by_trigger.get(trigger, ())
+
+    def _run(self, rules: tuple[CompiledRule, ...], values: Mapping[str, Any]) -> FormState:
+        state = self.initial_state(values)
+        for rule in rules:
+            if rule.condition(state):
+                for action in rule.actions:
+                    action(state)
+        return state
+
+
+def compile_form_logic(structure: Mapping[str, Any]) -> FormLogic:
+    """
+    Compile the enabled rules of a form structure, in priority order.
+    """
+    fields = _Fields(structure.get("fields") or [])
+    defaults = {
+        str(row.get("code")): {
+            "visible": row.get("visible_by_default", 1),
+            "required": row.get("required", 0),
+            "enabled": not row.get("read_only", 0),
+            "value": row.get("default_value"),
+        }
+        for row in structure.get("fields") or []
+    }
+    conditions: dict[str, list[Mapping[str, Any]]] = {}
+    for row in structure.get("logic_conditions") or []:
+        conditions.setdefault(str(row.get("rule_id")), []).append(row)
+    actions: dict[str, list[Mapping[str, Any]]] = {}
+    for row in structure.get("logic_actions") or []:
+        actions.setdefault(str(row.get("rule_id")), []).append(row)
+
+    rules: list[CompiledRule] = []
+    ordered = sorted(structure.get("logic_rules") or [], key=lambda rule: (int(rule.get("priority") or 0), str(rule.get("id"))))
+    for rule in ordered:
+        if not rule.get("enabled", 1):
+            continue
+        rule_id = str(rule.get("id"))
+        compiled_actions = [
+            _compile_action(row, fields) for row in sorted(actions.get(rule_id, []), key=_order)
+        ]
+        rules.append(
+            CompiledRule(
+                id=rule_id,
+                name=rule.get("name"),
+                trigger=str(rule.get("trigger") or "on_change"),
+                condition=_compile_conditions(conditions.get(rule_id, []), fields),
+                actions=tuple(action for action in compiled_actions if action is not None),
+            )
+        )
+    form = structure.get("form") or {}
+    return FormLogic(str(form.get("id")), rules, defaults)
+
+
+_caches: dict[str, CompiledFormCache[FormLogic]] = {}
+
+
+def get_logic_cache(db: Database) -> CompiledFormCache[FormLogic]:
+    key = str(db.path)
+    cache = _caches.get(key)
+    if cache is None:
+
+        async def compile(structure: dict[str, Any]) -> FormLogic:
+            return await asyncio.to_thread(compile_form_logic, structure)
+
+        cache = CompiledFormCache(db, compile, get_settings().compiled_form_cache_size)
+        _caches[key] = cache
+    return cache
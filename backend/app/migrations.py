@@ -0,0 +1,365 @@
+"""
+Idempotent schema migrations layered on top of the seeded SQLite database.
+"""
+
+from dataclasses import dataclass
+
+import aiosqlite
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    statements: list[str]
+
+
+def _form_version_triggers(table: str, form_ids: str) -> list[str]:
+    """
+    Triggers that bump `form_versions` for every form a row of `table` belongs
+    to. `form_ids` is a SELECT of (form_id, 1) rows with `{row}` standing for
+    NEW or OLD; it must carry a WHERE clause, which SQLite requires before an
+    upsert's ON CONFLICT.
+    """
+    events = {"insert": ["NEW"], "update": ["OLD", "NEW"], "delete": ["OLD"]}
+    statements = []
+    for event, rows in events.items():
+        bumps = "".join(
+            f"INSERT INTO form_versions(form_id, version) {form_ids.format(row=row)} "
+            "ON CONFLICT(form_id) DO UPDATE SET version = version + 1;\n"
+            for row in rows
+        )
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_form_versions_{table}_{event} "
+            f"AFTER {event.upper()} ON {table}\nBEGIN\n{bumps}END"
+        )
+    return statements
+
+
+def _field_reference_triggers(table: str, column: str) -> list[str]:
+    """
+    Triggers that keep `field_references` in step with the field reference
+    in `table`.`column`. Non-JSON and non-field references are not indexed.
+    """
+    ref = f"NEW.{column}"
+    index_new = (
+        "INSERT INTO field_references(ref_table, ref_id, rule_id, field_id, field_code) "
+        f"SELECT '{table}', NEW.id, NEW.rule_id, json_extract({ref}, '$.field_id'), json_extract({ref}, '$.field_code') "
+        f"WHERE CASE WHEN json_valid({ref}) THEN json_extract({ref}, '$.type') = 'field' END;\n"
+    )
+    drop_old = f"DELETE FROM field_references WHERE ref_table = '{table}' AND ref_id = OLD.id;\n"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_field_references_{table}_insert "
+        f"AFTER INSERT ON {table}\nBEGIN\n{index_new}END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_field_references_{table}_update "
+        f"AFTER UPDATE OF id, rule_id, {column} ON {table}\nBEGIN\n{drop_old}{index_new}END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_field_references_{table}_delete "
+        f"AFTER DELETE ON {table}\nBEGIN\n{drop_old}END",
+    ]
+
+
+def _backfill_field_references(table: str, column: str) -> str:
+    return (
+        "INSERT OR REPLACE INTO field_references(ref_table, ref_id, rule_id, field_id, field_code) "
+        f"SELECT '{table}', id, rule_id, json_extract({column}, '$.field_id'), json_extract({column}, '$.field_code') "
+        f"FROM {table} WHERE CASE WHEN json_valid({column}) THEN json_extract({column}, '$.type') = 'field' END"
+    )
+
+
+_OWN_FORM = "SELECT {row}.form_id, 1 WHERE {row}.form_id IS NOT NULL"
+_FIELD_FORM = "SELECT form_id, 1 FROM form_fields WHERE id = {row}.field_id"
+_RULE_FORM = "SELECT form_id, 1 FROM logic_rules WHERE id = {row}.rule_id"
+_OPTION_SET_FORMS = (
+    "SELECT DISTINCT f.form_id, 1 FROM field_option_binding b "
+    "JOIN form_fields f ON f.id = b.field_id WHERE b.option_set_id = {row}.option_set_id"
+)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        name="fts_search_index",
+        statements=[
+            "CREATE VIRTUAL TABLE IF NOT EXISTS fts_forms USING fts5(title, slug, tokenize='porter unicode61')",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS fts_fields USING fts5(form_key, code, label, tokenize='porter unicode61')",
+            "INSERT INTO fts_forms(rowid, title, slug) SELECT rowid, title, slug FROM forms",
+            "INSERT INTO fts_fields(rowid, form_key, code, label) "
+            "SELECT rowid, form_id, code, label FROM form_fields",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_forms_insert
+            AFTER INSERT ON forms
+            BEGIN
+                INSERT INTO fts_forms(rowid, title, slug) VALUES (NEW.rowid, NEW.title, NEW.slug);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_forms_update
+            AFTER UPDATE OF title, slug ON forms
+            BEGIN
+                UPDATE fts_forms SET title = NEW.title, slug = NEW.slug WHERE rowid = OLD.rowid;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_forms_delete
+            AFTER DELETE ON forms
+            BEGIN
+                DELETE FROM fts_forms WHERE rowid = OLD.rowid;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_fields_insert
+            AFTER INSERT ON form_fields
+            BEGIN
+                INSERT INTO fts_fields(rowid, form_key, code, label)
+                VALUES (NEW.rowid, NEW.form_id, NEW.code, NEW.label);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_fields_update
+            AFTER UPDATE OF form_id, code, label ON form_fields
+            BEGIN
+                UPDATE fts_fields SET form_key = NEW.form_id, code = NEW.code, label = NEW.label
+                WHERE rowid = OLD.rowid;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_fts_fields_delete
+            AFTER DELETE ON form_fields
+            BEGIN
+                DELETE FROM fts_fields WHERE rowid = OLD.rowid;
+            END
+            """,
+        ],
+    ),
+    Migration(
+        version=2,
+        name="catalog_change_log",
+        statements=[
+            """
+            CREATE TABLE IF NOT EXISTS catalog_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_forms_insert
+            AFTER INSERT ON forms
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('forms', NEW.id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_forms_update
+            AFTER UPDATE OF id, title, slug ON forms
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('forms', OLD.id);
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('forms', NEW.id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_forms_delete
+            AFTER DELETE ON forms
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('forms', OLD.id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_fields_insert
+            AFTER INSERT ON form_fields
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', NEW.id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_fields_update
+            AFTER UPDATE OF id, form_id, code, label ON form_fields
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', OLD.id);
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', NEW.id);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_fields_delete
+            AFTER DELETE ON form_fields
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', OLD.id);
+            END
+            """,
+        ],
+    ),
+    Migration(
+        version=3,
+        name="catalog_change_log_field_layout",
+        statements=[
+            # Planner caches also hold field types and ordering, so those
+            # columns must advance the change log too.
+            "DROP TRIGGER IF EXISTS trg_catalog_changes_fields_update",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_fields_update
+            AFTER UPDATE OF id, form_id, code, label, type_id, position ON form_fields
+            BEGIN
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', OLD.id);
+                INSERT INTO catalog_changes(table_name, row_id) VALUES ('form_fields', NEW.id);
+            END
+            """,
+        ],
+    ),
+    Migration(
+        version=4,
+        name="form_versions",
+        statements=[
+            # A per-form counter bumped by any write to a row that appears in
+            # the form's structure, for caches and ETags keyed by form.
+            """
+            CREATE TABLE IF NOT EXISTS form_versions (
+                form_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+            """,
+            *_form_version_triggers("forms", "SELECT {row}.id, 1 WHERE true"),
+            *_form_version_triggers("form_pages", _OWN_FORM),
+            *_form_version_triggers("form_fields", _OWN_FORM),
+            *_form_version_triggers("logic_rules", _OWN_FORM),
+            *_form_version_triggers("field_option_binding", _FIELD_FORM),
+            *_form_version_triggers("logic_conditions", _RULE_FORM),
+            *_form_version_triggers("logic_actions", _RULE_FORM),
+            *_form_version_triggers("option_items", _OPTION_SET_FORMS),
+            # Structures embed the field type key.
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_form_versions_field_types_update
+            AFTER UPDATE OF key ON field_types
+            BEGIN
+                INSERT INTO form_versions(form_id, version)
+                SELECT DISTINCT form_id, 1 FROM form_fields WHERE type_id = NEW.id
+                ON CONFLICT(form_id) DO UPDATE SET version = version + 1;
+            END
+            """,
+        ],
+    ),
+    Migration(
+        version=5,
+        name="form_listing_indexes",
+        statements=[
+            # Keyset pagination of /api/forms walks (title, id) in
+            # case-insensitive title order, optionally within one filter value.
+            "CREATE INDEX IF NOT EXISTS idx_forms_title_id ON forms(title COLLATE NOCASE, id)",
+            "CREATE INDEX IF NOT EXISTS idx_forms_status_title_id ON forms(status, title COLLATE NOCASE, id)",
+            "CREATE INDEX IF NOT EXISTS idx_forms_category_title_id ON forms(category_id, title COLLATE NOCASE, id)",
+            "CREATE INDEX IF NOT EXISTS idx_forms_org_title_id ON forms(org_id, title COLLATE NOCASE, id)",
+        ],
+    ),
+    Migration(
+        version=6,
+        name="form_documents",
+        statements=[
+            # Materialized form structures (FORM_DOCUMENTS_ENABLED). A document
+            # is current while its version equals the form's form_versions
+            # counter, which the version triggers advance on every child write.
+            """
+            CREATE TABLE IF NOT EXISTS form_documents (
+                form_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                document TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_form_documents_forms_delete
+            AFTER DELETE ON forms
+            BEGIN
+                DELETE FROM form_documents WHERE form_id = OLD.id;
+            END
+            """,
+        ],
+    ),
+    Migration(
+        version=7,
+        name="field_references",
+        statements=[
+            # Reverse index from fields to the logic conditions and actions
+            # that reference them, so deletes and renames of a field find
+            # their rules without parsing every lhs_ref and target_ref.
+            # References still written by code have a NULL field_id.
+            """
+            CREATE TABLE IF NOT EXISTS field_references (
+                ref_table TEXT NOT NULL,
+                ref_id TEXT NOT NULL,
+                rule_id TEXT NOT NULL,
+                field_id TEXT,
+                field_code TEXT,
+                PRIMARY KEY (ref_table, ref_id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_field_references_field ON field_references(field_id)",
+            "CREATE INDEX IF NOT EXISTS idx_field_references_code ON field_references(field_code) "
+            "WHERE field_id IS NULL",
+            "CREATE INDEX IF NOT EXISTS idx_logic_rules_form ON logic_rules(form_id)",
+            "CREATE INDEX IF NOT EXISTS idx_logic_conditions_rule ON logic_conditions(rule_id)",
+            "CREATE INDEX IF NOT EXISTS idx_logic_actions_rule ON logic_actions(rule_id)",
+            _backfill_field_references("logic_conditions", "lhs_ref"),
+            _backfill_field_references("logic_actions", "target_ref"),
+            *_field_reference_triggers("logic_conditions", "lhs_ref"),
+            *_field_reference_triggers("logic_actions", "target_ref"),
+        ],
+    ),
+    Migration(
+        version=8,
+        name="form_versions_field_type_metadata",
+        statements=[
+            # Compiled validation plans also depend on a field type's option
+            # and multi-value flags and its builtin validators.
+            "DROP TRIGGER IF EXISTS trg_form_versions_field_types_update",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_form_versions_field_types_update
+            AFTER UPDATE OF key, has_options, allows_multiple, builtin_validators ON field_types
+            BEGIN
+                INSERT INTO form_versions(form_id, version)
+                SELECT DISTINCT form_id, 1 FROM form_fields WHERE type_id = NEW.id
+                ON CONFLICT(form_id) DO UPDATE SET version = version + 1;
+            END
+            """,
+        ],
+    ),
+]
+
+# Tables created by migrations that are implementation details of the backend
+# and must not leak into the schema summary shown to the LLM.
+INTERNAL_TABLE_PREFIXES = ("sqlite_", "fts_")
+INTERNAL_TABLES = {"catalog_changes", "form_versions", "form_documents", "field_references"}
+
+
+def is_internal_table(name: str) -> bool:
+    return name.startswith(INTERNAL_TABLE_PREFIXES) or name in INTERNAL_TABLES
+
+
+async def apply_migrations(db: aiosqlite.Connection) -> int:
+    """
+    Apply every migration newer than the database's `user_version`.
+    Returns the resulting schema version.
+    """
+    current = await _get_user_version(db)
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock.
+            current = await _get_user_version(db)
+            if migration.version <= current:
+                await db.rollback()
+                continue
+            for statement in migration.statements:
+                await db.execute(statement)
+            await db.execute(f"PRAGMA user_version = {int(migration.version)}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        current = migration.version
+    return current
+
+
+async def _get_user_version(db: aiosqlite.Connection) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return int(row[0]) if row else 0
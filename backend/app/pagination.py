@@ -0,0 +1,29 @@
+"""
+Opaque cursors for keyset-paginated listings.
+"""
+
+import base64
+import binascii
+
+import orjson
+
+
+def encode_cursor(*values: str) -> str:
+    """
+    The sort key of the last row of a page as a URL-safe token.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> tuple[str, ...]:
+    """
+    Inverse of `encode_cursor`; raises ValueError for anything that is not a
+    cursor of `size` strings.
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, orjson.JSONDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
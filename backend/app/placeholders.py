@@ -0,0 +1,36 @@
+"""
+Deterministic placeholder ids for change-set rows that do not exist yet.
+
+Placeholders keep the `$<prefix>_<8 hex>` shape, but the hex part is derived
+from the plan content, a namespace and the allocation order instead of a
+random uuid, so resolving the same plan against the same data always yields a
+byte-identical change-set.
+"""
+
+import hashlib
+
+from .intent_schema import IntentPlan
+
+
+class PlaceholderAllocator:
+    def __init__(self, plan: IntentPlan, namespace: str = "") -> None:
+        canonical = plan.model_dump_json(exclude={"notes", "clarification_question"})
+        self._seed = hashlib.sha256(f"{namespace}\0{canonical}".encode("utf-8")).hexdigest()
+        self._counts: dict[str, int] = {}
+        self._issued: set[tuple[str, str]] = set()
+
+    def token(self, prefix: str, length: int = 8) -> str:
+        """
+        The next hex token for `prefix`, unique among the tokens this
+        allocator has issued.
+        """
+        while True:
+            count = self._counts.get(prefix, 0) + 1
+            self._counts[prefix] = count
+            token = hashlib.sha256(f"{self._seed}:{prefix}:{count}".encode("utf-8")).hexdigest()[:length]
+            if (prefix, token) not in self._issued:
+                self._issued.add((prefix, token))
+                return token
+
+    def __call__(self, prefix: str) -> str:
+        return f"${prefix}_{self.token(prefix)}"
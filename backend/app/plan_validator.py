@@ -51,7 +51,10 @@ async def detect_assumptions(plan: IntentPlan, db: Database) -> list[str]:
         if not field.field_code and not field.field_label:
             issues.append("Field missing both field_code and field_label")
     
-    new_form_fields = [f for f in plan.fields if f.operation.value == "insert" and not f.target_form.form_id]
+    new_form_fields = [
+        f for f in plan.fields
+        if f.operation.value == "insert" and not f.target_form.form_id and not f.target_form.selector
+    ]
     if new_form_fields:
         form_names = {f.target_form.form_name for f in new_form_fields if f.target_form.form_name}
         form_codes = {f.target_form.form_code for f in new_form_fields if f.target_form.form_code}
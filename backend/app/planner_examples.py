@@ -0,0 +1,246 @@
+"""
+Few-shot example library for the intent planner.
+
+Each example is tagged with the kinds of intent it demonstrates. A cheap
+keyword classifier scores the request against those kinds and only the most
+relevant examples that fit the token budget are sent, instead of all of them.
+"""
+
+from dataclasses import dataclass, field
+import re
+
+from .llm_client import estimate_tokens
+
+
+OPTION = "option"
+FIELD = "field"
+LOGIC = "logic"
+NEW_FORM = "new_form"
+CLARIFICATION = "clarification"
+
+
+@dataclass(frozen=True)
+class PlannerExample:
+    name: str
+    kinds: frozenset[str]
+    text: str
+    tokens: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "tokens", estimate_tokens(self.text))
+
+
+# Keyword patterns per intent kind, with their weight in the request score.
+_KIND_SIGNALS: dict[str, list[tuple[re.Pattern[str], float]]] = {
+    OPTION: [
+        (re.compile(r"\b(option|options|choice|choices|dropdown|drop-down|select|radio|values?)\b"), 1.0),
+        (re.compile(r"\b(rename|change)\b.+\bto\b"), 0.5),
+    ],
+    FIELD: [
+        (re.compile(r"\bfields?\b"), 1.0),
+        (re.compile(r"\b(required|optional|placeholder|label|text|number|date|email|read[- ]only)\b"), 0.5),
+    ],
+    LOGIC: [
+        (re.compile(r"\b(when|if|unless|only if|whenever)\b"), 1.0),
+        (re.compile(r"\b(show|hide|visible|hidden|rule|condition|logic)\b"), 1.0),
+    ],
+    NEW_FORM: [
+        (re.compile(r"\b(create|build|set up|make)\b.*\b(new )?form\b"), 1.0),
+        (re.compile(r"\bnew form\b"), 1.0),
+    ],
+}
+
+
+def classify_request(text: str) -> dict[str, float]:
+    """
+    Score how strongly `text` looks like each intent kind (0 = no signal).
+    """
+    lowered = text.lower()
+    return {
+        kind: sum(weight for pattern, weight in signals if pattern.search(lowered))
+        for kind, signals in _KIND_SIGNALS.items()
+    }
+
+
+class ExampleLibrary:
+    def __init__(self, examples: list[PlannerExample] | None = None) -> None:
+        self._examples: list[PlannerExample] = list(examples or [])
+
+    def register(self, example: PlannerExample) -> None:
+        self._examples = [e for e in self._examples if e.name != example.name] + [example]
+
+    def __iter__(self):
+        return iter(self._examples)
+
+    def select(self, text: str, k: int, token_budget: int) -> list[PlannerExample]:
+        """
+        Up to `k` examples ranked by the mean request score over their kinds,
+        so a broad example does not outrank a focused one just by covering
+        more kinds, skipping any that would push the total over `token_budget`.
+
+        Requests with no recognizable kind get the clarification example,
+        since they are the ones most likely to need one.
+        """
+        scores = classify_request(text)
+        if not any(scores.values()):
+            scores = {CLARIFICATION: 1.0}
+        ranked = sorted(
+            (
+                (
+                    sum(scores.get(kind, 0.0) for kind in example.kinds) / len(example.kinds),
+                    index,
+                    example,
+                )
+                for index, example in enumerate(self._examples)
+            ),
+            key=lambda item: (-item[0], item[1]),
+        )
+        chosen: list[PlannerExample] = []
+        used = 0
+        for score, _, example in ranked:
+            if score <= 0 or len(chosen) >= k:
+                break
+            if used + example.tokens > token_budget:
+                continue
+            chosen.append(example)
+            used += example.tokens
+        return chosen
+
+
+def render_examples(examples: list[PlannerExample]) -> str:
+    if not examples:
+        return ""
+    parts = ["Examples:"]
+    for number, example in enumerate(examples, start=1):
+        parts.append(f"{number}. {example.text}")
+    return "\n\n".join(parts) + "\n"
+
+
+OPTION_EDIT_EXAMPLE = PlannerExample(
+    name="option_edit",
+    kinds=frozenset({OPTION}),
+    text="""\
+User: "update the dropdown options for the destination field in the travel request form: 1. add a paris option, 2. change tokyo to milan"
+Response:
+{
+    "fields": [],
+    "options": [{
+    "operation": "insert",
+    "target_form": {"form_name": "Travel Request", "form_code": "travel-complex"},
+    "field_code": "destinations",
+    "field_label": "Destinations",
+    "add_values": ["Paris"],
+    "rename_map": {"Tokyo": "Milan"},
+    "remove_values": []
+    }],
+    "logic_blocks": [],
+    "needs_clarification": false,
+    "clarification_question": null
+}""",
+)
+
+CONDITIONAL_FIELD_EXAMPLE = PlannerExample(
+    name="conditional_field",
+    kinds=frozenset({FIELD, LOGIC}),
+    text="""\
+User: "I want the employment form to require university_name when employment_status is Student"
+Response:
+{
+    "fields": [{
+    "operation": "insert",
+    "target_form": {"form_name": "Employment Demo"},
+    "field_code": "university_name",
+    "field_label": "University name",
+    "field_type": "short_text",
+    "properties": {"required": false, "visible_by_default": false}
+    }],
+    "options": [],
+    "logic_blocks": [{
+    "operation": "insert",
+    "target_form": {"form_name": "Employment Demo"},
+    "description": "Show and require university_name when employment_status is Student",
+    "payload": {
+        "trigger": "on_change",
+        "scope": "form",
+        "priority": 100,
+        "conditions": [{
+        "lhs_ref": "{"type":"field","field_code":"employment_status","property":"value"}",
+        "operator": "=",
+        "rhs": ""Student"",
+        "bool_join": "AND",
+        "position": 1
+        }],
+        "actions": [{
+        "action": "show",
+        "target_ref": "{"type":"field","field_code":"university_name"}",
+        "params": null,
+        "position": 1
+        }, {
+        "action": "require",
+        "target_ref": "{"type":"field","field_code":"university_name"}",
+        "params": null,
+        "position": 2
+        }]
+    }
+    }],
+    "needs_clarification": false,
+    "clarification_question": null
+}""",
+)
+
+CLARIFICATION_EXAMPLE = PlannerExample(
+    name="missing_form_clarification",
+    kinds=frozenset({FIELD, CLARIFICATION}),
+    text="""\
+User: "add a description field to the form"
+Response (needs clarification):
+{
+    "fields": [],
+    "options": [],
+    "logic_blocks": [],
+    "notes": "User did not specify which form",
+    "needs_clarification": true,
+    "clarification_question": "Which form would you like to add the description field to? Available forms: Travel Request (travel-complex), Employment Demo (employment-demo), Snack Request (snack-request)"
+}""",
+)
+
+NEW_FORM_EXAMPLE = PlannerExample(
+    name="new_form",
+    kinds=frozenset({NEW_FORM, FIELD, OPTION}),
+    text="""\
+User: "I want to create a new form to allow employees to request a new snack. There should be a category field (ice cream/ beverage/ fruit/ chips/ gum), and name of the item (text)."
+Response:
+{
+    "fields": [{
+    "operation": "insert",
+    "target_form": {"form_name": "Snack Request"},
+    "field_code": "category",
+    "field_label": "Category",
+    "field_type": "dropdown",
+    "properties": {"required": true}
+    }, {
+    "operation": "insert",
+    "target_form": {"form_name": "Snack Request"},
+    "field_code": "item_name",
+    "field_label": "Item name",
+    "field_type": "short_text",
+    "properties": {"required": true}
+    }],
+    "options": [{
+    "operation": "insert",
+    "target_form": {"form_name": "Snack Request"},
+    "field_code": "category",
+    "field_label": "Category",
+    "add_values": ["ice cream", "beverage", "fruit", "chips", "gum"],
+    "rename_map": {},
+    "remove_values": []
+    }],
+    "logic_blocks": [],
+    "needs_clarification": false,
+    "clarification_question": null
+}""",
+)
+
+DEFAULT_LIBRARY = ExampleLibrary(
+    [OPTION_EDIT_EXAMPLE, CONDITIONAL_FIELD_EXAMPLE, CLARIFICATION_EXAMPLE, NEW_FORM_EXAMPLE]
+)
@@ -7,6 +7,7 @@ from typing import Any
 from uuid import uuid4
 
 _request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_request_metrics: ContextVar[dict[str, Any] | None] = ContextVar("request_metrics", default=None)
 
 
 def get_request_id() -> str | None:
@@ -23,3 +24,30 @@ def set_request_id(request_id: str | None = None) -> str:
 def clear_request_id() -> None:
     _request_id.set(None)
 
+
+def start_request_metrics() -> dict[str, Any]:
+    metrics: dict[str, Any] = {}
+    _request_metrics.set(metrics)
+    return metrics
+
+
+def record_metric(name: str, value: Any) -> None:
+    """
+    Attach a value to the current request's metrics; a no-op outside a request.
+    """
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        metrics[name] = value
+
+
+def add_metric(name: str, amount: int | float) -> None:
+    """
+    Add to a counter in the current request's metrics; a no-op outside a request.
+    """
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        metrics[name] = metrics.get(name, 0) + amount
+
+
+def get_request_metrics() -> dict[str, Any]:
+    return dict(_request_metrics.get() or {})
@@ -7,10 +7,13 @@ from __future__ import annotations
 import json
 import re
 from typing import Any
-from uuid import uuid4
 
 from .config import get_settings
 from .db import Database
+from .field_references import logic_children, references_to_fields
+from .form_selectors import describe_selector, fields_with_code, forms_for_field_insert, option_items_for_fields
+from .fuzzy_index import get_catalog_suggester
+from .placeholders import PlaceholderAllocator
 from .intent_schema import IntentPlan, OptionIntent, FieldIntent, LogicIntent, OperationType, TargetForm
 
 
@@ -21,15 +24,14 @@ class ResolutionClarificationNeeded(ValueError):
         reason: str,
         form_candidates: list[dict[str, Any]] | None = None,
         field_candidates: list[dict[str, Any]] | None = None,
+        reference: str | None = None,
     ) -> None:
         super().__init__(message)
         self.reason = reason
         self.form_candidates = form_candidates or []
         self.field_candidates = field_candidates or []
-
-
-def _placeholder(prefix: str) -> str:
-    return f"${prefix}_{uuid4().hex[:8]}"
+        # The form or field reference from the plan that could not be resolved.
+        self.reference = reference
 
 
 def _ensure_table_section(container: dict[str, Any], table: str) -> dict[str, list[dict[str, Any]]]:
@@ -53,6 +55,36 @@ def _normalize_field_label(value: str | None) -> str | None:
     return normalized
 
 
+def _pick_exact_match(
+    matches: list[dict[str, Any]], wanted: str, keys: tuple[str, ...]
+) -> dict[str, Any] | None:
+    """
+    Return the single ranked match whose key equals `wanted` (case-insensitive).
+    """
+    wanted_norm = wanted.strip().casefold()
+    exact = [
+        row for row in matches
+        if any(str(row.get(key) or "").strip().casefold() == wanted_norm for key in keys)
+    ]
+    if len(exact) == 1:
+        return exact[0]
+    return None
+
+
+async def _closest_fields(
+    db: Database, form_id: str, wanted: str, candidates: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """
+    Order ambiguous field matches by n-gram similarity to what the user typed
+    and keep only the top suggestions.
+    """
+    limit = get_settings().suggestion_limit
+    ranked = await get_catalog_suggester(db).suggest_fields(form_id, wanted, len(candidates))
+    order = {str(row["id"]): idx for idx, row in enumerate(ranked)}
+    ordered = sorted(candidates, key=lambda c: order.get(str(c["id"]), len(order)))
+    return ordered[:limit]
+
+
 def _find_fields_in_changeset_for_options(
     change_set: dict[str, Any],
     form_id: str,
@@ -101,23 +133,30 @@ def _find_fields_in_changeset_for_options(
     return []
 
 
-async def build_change_set(plan: IntentPlan, db: Database) -> dict[str, Any]:
+async def build_change_set(
+    plan: IntentPlan, db: Database, placeholders: PlaceholderAllocator | None = None
+) -> dict[str, Any]:
+    """
+    Resolve `plan` into a change-set. New rows get deterministic placeholder
+    ids from `placeholders` (by default derived from the plan alone), so the
+    same plan against the same data gives a byte-identical change-set.
+    """
     from .change_set_validator import validate_change_set_structure
     
     settings = get_settings()
     change_set: dict[str, Any] = {}
     
     new_form_ids: dict[str, str] = {}
+    if placeholders is None:
+        placeholders = PlaceholderAllocator(plan)
 
-    await _create_new_forms(plan, db, change_set, new_form_ids)
-    await _apply_field_intents(plan.fields, db, change_set, new_form_ids)
-    await _apply_option_intents(plan.options, db, change_set, new_form_ids)
-    await _apply_logic_intents(plan.logic_blocks, db, change_set, new_form_ids)
+    await _create_new_forms(plan, db, change_set, new_form_ids, placeholders)
+    await _apply_field_intents(plan.fields, db, change_set, new_form_ids, placeholders)
+    await _apply_option_intents(plan.options, db, change_set, new_form_ids, placeholders)
+    await _apply_logic_intents(plan.logic_blocks, db, change_set, new_form_ids, placeholders)
+    await _cascade_field_changes(db, change_set)
 
-    total_rows = 0
-    for table in change_set.values():
-        for op in ("insert", "update", "delete"):
-            total_rows += len(table[op])
+    total_rows = _count_rows(change_set)
     if total_rows > settings.max_changed_rows:
         raise ValueError(f"Planned {total_rows} row changes which exceeds limit {settings.max_changed_rows}")
 
@@ -126,12 +165,39 @@ async def build_change_set(plan: IntentPlan, db: Database) -> dict[str, Any]:
     return change_set
 
 
+def _count_rows(change_set: dict[str, Any]) -> int:
+    return sum(len(table[op]) for table in change_set.values() for op in ("insert", "update", "delete"))
+
+
+def _fan_out_limit(change_set: dict[str, Any], rows_per_target: int = 1) -> int:
+    """
+    How many fan-out targets to fetch: one more than still fits under
+    `max_changed_rows`, so `_check_fan_out` sees whether the selector
+    overflows without the query returning every match.
+    """
+    remaining = max(get_settings().max_changed_rows - _count_rows(change_set), 0)
+    return remaining // max(rows_per_target, 1) + 1
+
+
+def _check_fan_out(change_set: dict[str, Any], planned_rows: int) -> None:
+    total_rows = _count_rows(change_set) + planned_rows
+    limit = get_settings().max_changed_rows
+    if total_rows > limit:
+        raise ValueError(f"Planned {total_rows} row changes which exceeds limit {limit}")
+
+
 async def _create_new_forms(
-    plan: IntentPlan, db: Database, change_set: dict[str, Any], new_form_ids: dict[str, str]
+    plan: IntentPlan,
+    db: Database,
+    change_set: dict[str, Any],
+    new_form_ids: dict[str, str],
+    placeholders: PlaceholderAllocator,
 ) -> None:
     unique_forms: dict[str, dict[str, Any]] = {}
     
     for intent in plan.fields + plan.options + plan.logic_blocks:
+        if intent.target_form.selector:
+            continue
         form_key = (
             intent.target_form.form_id
             or intent.target_form.form_name
@@ -152,7 +218,7 @@ async def _create_new_forms(
         if matches:
             continue
         
-        form_id = _placeholder("form")
+        form_id = placeholders("form")
         slug = name_or_code.lower().replace(" ", "-")
         title = name_or_code if target_form.get("form_name") else name_or_code.replace("-", " ").title()
         
@@ -165,7 +231,7 @@ async def _create_new_forms(
             "status": "draft",
         })
         
-        page_id = _placeholder("page")
+        page_id = placeholders("page")
         pages_table = _ensure_table_section(change_set, "form_pages")
         pages_table["insert"].append({
             "id": page_id,
@@ -190,20 +256,27 @@ async def _resolve_form_id(
     if new_form_ids and name_or_code in new_form_ids:
         return new_form_ids[name_or_code]
     
-    matches = await db.find_form_by_name(name_or_code)
+    matches = await db.search_forms(name_or_code)
+    if len(matches) > 1:
+        exact = _pick_exact_match(matches, name_or_code, ("title", "slug"))
+        if exact:
+            return str(exact["id"])
     if not matches:
-        all_forms = await db.fetch_all(
-            "SELECT id, slug, title FROM forms ORDER BY title"
-        )
-        if all_forms:
-            form_list = ", ".join([f"{row['title']} ({row['slug']})" for row in all_forms])
+        limit = get_settings().suggestion_limit
+        suggestions = await get_catalog_suggester(db).suggest_forms(name_or_code, limit)
+        if not suggestions:
+            suggestions = await db.fetch_all(
+                "SELECT id, slug, title FROM forms ORDER BY title LIMIT ?", [limit]
+            )
+        if suggestions:
+            form_list = ", ".join([f"{row['title']} ({row['slug']})" for row in suggestions])
             message = (
                 f"I could not find any form matching '{name_or_code}'. "
-                f"Please choose one of the available forms: {form_list}"
+                f"Please choose one of the closest available forms: {form_list}"
             )
             candidates = [
                 {"id": row["id"], "title": row["title"], "slug": row["slug"]}
-                for row in all_forms
+                for row in suggestions
             ]
         else:
             message = (
@@ -215,6 +288,7 @@ async def _resolve_form_id(
             message=message,
             reason="form_not_found",
             form_candidates=candidates,
+            reference=name_or_code,
         )
     if len(matches) > 1:
         form_list = ", ".join([f"{row['title']} ({row['slug']})" for row in matches])
@@ -230,6 +304,7 @@ async def _resolve_form_id(
             message=message,
             reason="form_ambiguous",
             form_candidates=candidates,
+            reference=name_or_code,
         )
     return str(matches[0]["id"])
 
@@ -272,13 +347,11 @@ async def _resolve_field(
         if candidates:
             return candidates[0]
         
-        fuzzy_candidates = await db.fetch_all(
-            "SELECT * FROM form_fields WHERE form_id = ? AND code LIKE ?",
-            [form_id, f"%{intent.field_code}%"],
-        )
+        fuzzy_candidates = await db.search_fields(form_id, intent.field_code, columns=("code",))
         if len(fuzzy_candidates) == 1:
             return fuzzy_candidates[0]
         if len(fuzzy_candidates) > 1:
+            fuzzy_candidates = await _closest_fields(db, form_id, intent.field_code, fuzzy_candidates)
             field_list = ", ".join([f"{c['label']} ({c['code']})" for c in fuzzy_candidates])
             message = (
                 f"Multiple fields match code '{intent.field_code}' on this form. "
@@ -292,13 +365,18 @@ async def _resolve_field(
                 message=message,
                 reason="field_ambiguous",
                 field_candidates=field_candidates,
+                reference=intent.field_code,
             )
     
     if intent.field_label:
-        candidates = await db.find_field_by_label(form_id, intent.field_label)
+        candidates = await db.search_fields(form_id, intent.field_label)
         if len(candidates) == 1:
             return candidates[0]
         if len(candidates) > 1:
+            exact = _pick_exact_match(candidates, intent.field_label, ("label", "code"))
+            if exact:
+                return exact
+            candidates = await _closest_fields(db, form_id, intent.field_label, candidates)
             field_list = ", ".join([f"{c['label']} ({c['code']})" for c in candidates])
             message = (
                 f"Multiple fields match '{intent.field_label}' on this form. "
@@ -312,14 +390,22 @@ async def _resolve_field(
                 message=message,
                 reason="field_ambiguous",
                 field_candidates=field_candidates,
+                reference=intent.field_label,
             )
     return None
 
 
 async def _apply_field_intents(
-    intents: list[FieldIntent], db: Database, change_set: dict[str, Any], new_form_ids: dict[str, str]
+    intents: list[FieldIntent],
+    db: Database,
+    change_set: dict[str, Any],
+    new_form_ids: dict[str, str],
+    placeholders: PlaceholderAllocator,
 ) -> None:
     for intent in intents:
+        if intent.target_form.selector:
+            await _fan_out_field_intent(intent, db, change_set, placeholders)
+            continue
         form_id = await _resolve_form_id(db, intent.target_form.model_dump(), new_form_ids)
         table = _ensure_table_section(change_set, "form_fields")
 
@@ -360,42 +446,16 @@ async def _apply_field_intents(
                 )
                 if existing_fields:
                     new_position = int(existing_fields[0]["position"]) + 1
-            code = intent.field_code or intent.field_label or f"field_{uuid4().hex[:6]}"
-            label = intent.field_label or code.replace("_", " ").title()
-            row = {
-                "id": _placeholder("fld"),
-                "form_id": form_id,
-                "page_id": target_page["id"],
-                "type_id": field_type["id"],
-                "field_type_key": field_type["key"],  
-                "code": code,
-                "label": label,
-                "help_text": intent.properties.get("help_text") if intent.properties else None,
-                "position": new_position,
-                "required": 1 if intent.properties.get("required") else 0 if intent.properties else 0,
-                "read_only": 1 if intent.properties.get("read_only") else 0 if intent.properties else 0,
-                "placeholder": intent.properties.get("placeholder") if intent.properties else None,
-                "default_value": intent.properties.get("default_value") if intent.properties else None,
-                "validation_schema": intent.properties.get("validation_schema") if intent.properties else None,
-                "visible_by_default": 1 if intent.properties.get("visible_by_default", True) else 0 if intent.properties else 1,
-            }
-            table["insert"].append(row)
+            code = intent.field_code or intent.field_label or f"field_{placeholders.token('field', 6)}"
+            table["insert"].append(
+                _field_insert_row(intent, field_type, code, form_id, target_page["id"], new_position, placeholders("fld"))
+            )
 
         elif intent.operation is OperationType.update:
             existing = await _resolve_field(db, form_id, intent, change_set)
             if not existing:
                 raise ValueError("Field update could not resolve an existing field")
-            update_row = {"id": existing["id"]}
-            if intent.field_label:
-                update_row["label"] = intent.field_label
-            if intent.properties:
-                if "required" in intent.properties:
-                    update_row["required"] = 1 if intent.properties["required"] else 0
-                if "read_only" in intent.properties:
-                    update_row["read_only"] = 1 if intent.properties["read_only"] else 0
-                if "placeholder" in intent.properties:
-                    update_row["placeholder"] = intent.properties["placeholder"]
-            table["update"].append(update_row)
+            table["update"].append(_field_update_row(intent, existing))
 
         elif intent.operation is OperationType.delete:
             existing = await _resolve_field(db, form_id, intent, change_set)
@@ -404,10 +464,118 @@ async def _apply_field_intents(
             table["delete"].append({"id": existing["id"]})
 
 
+def _field_insert_row(
+    intent: FieldIntent,
+    field_type: dict[str, Any],
+    code: str,
+    form_id: str,
+    page_id: str,
+    position: int,
+    row_id: str,
+) -> dict[str, Any]:
+    label = intent.field_label or code.replace("_", " ").title()
+    return {
+        "id": row_id,
+        "form_id": form_id,
+        "page_id": page_id,
+        "type_id": field_type["id"],
+        "field_type_key": field_type["key"],  
+        "code": code,
+        "label": label,
+        "help_text": intent.properties.get("help_text") if intent.properties else None,
+        "position": position,
+        "required": 1 if intent.properties.get("required") else 0 if intent.properties else 0,
+        "read_only": 1 if intent.properties.get("read_only") else 0 if intent.properties else 0,
+        "placeholder": intent.properties.get("placeholder") if intent.properties else None,
+        "default_value": intent.properties.get("default_value") if intent.properties else None,
+        "validation_schema": intent.properties.get("validation_schema") if intent.properties else None,
+        "visible_by_default": 1 if intent.properties.get("visible_by_default", True) else 0 if intent.properties else 1,
+    }
+
+
+def _field_update_row(intent: FieldIntent, existing: dict[str, Any]) -> dict[str, Any]:
+    update_row = {"id": existing["id"]}
+    if intent.field_label:
+        update_row["label"] = intent.field_label
+    if intent.properties:
+        if "required" in intent.properties:
+            update_row["required"] = 1 if intent.properties["required"] else 0
+        if "read_only" in intent.properties:
+            update_row["read_only"] = 1 if intent.properties["read_only"] else 0
+        if "placeholder" in intent.properties:
+            update_row["placeholder"] = intent.properties["placeholder"]
+        if intent.properties.get("code") and intent.properties["code"] != existing.get("code"):
+            update_row["code"] = intent.properties["code"]
+    return update_row
+
+
+async def _fan_out_field_intent(
+    intent: FieldIntent,
+    db: Database,
+    change_set: dict[str, Any],
+    placeholders: PlaceholderAllocator,
+) -> None:
+    """
+    Apply a field intent to every form its selector matches. Fields are
+    matched by exact code only; an insert skips forms that already have a
+    field with that code, like the single-form path.
+    """
+    selector = intent.target_form.selector
+    code = intent.field_code or intent.field_label
+    if not code:
+        raise ValueError("Field intents targeting a form selector need a field_code")
+    table = _ensure_table_section(change_set, "form_fields")
+
+    if intent.operation is OperationType.insert:
+        if not intent.field_type:
+            raise ValueError("Field insert requires field_type")
+        field_type = await db.get_field_type_by_key(intent.field_type)
+        if not field_type:
+            raise ValueError(f"Unknown field type key '{intent.field_type}'")
+        targets = await forms_for_field_insert(db, selector, code, _fan_out_limit(change_set))
+        if not targets:
+            raise ValueError(f"No forms match the selector ({describe_selector(selector)})")
+        _check_fan_out(change_set, int(targets[0]["matched"]))
+        targets = [target for target in targets if not target["has_field"]]
+        for target in targets:
+            if target["page_id"] is None:
+                raise ValueError(f"Form {target['form_id']} has no pages")
+        table["insert"].extend(
+            _field_insert_row(
+                intent,
+                field_type,
+                code,
+                str(target["form_id"]),
+                target["page_id"],
+                int(target["last_position"]) + 1,
+                placeholders("fld"),
+            )
+            for target in targets
+        )
+        return
+
+    targets = await fields_with_code(db, selector, code, _fan_out_limit(change_set))
+    if not targets:
+        raise ValueError(f"No form matching the selector ({describe_selector(selector)}) has a field with code '{code}'")
+    _check_fan_out(change_set, int(targets[0]["matched"]))
+    existing = [{"id": target["field_id"], "code": target["code"]} for target in targets]
+    if intent.operation is OperationType.update:
+        table["update"].extend(_field_update_row(intent, field) for field in existing)
+    elif intent.operation is OperationType.delete:
+        table["delete"].extend({"id": field["id"]} for field in existing)
+
+
 async def _apply_option_intents(
-    intents: list[OptionIntent], db: Database, change_set: dict[str, Any], new_form_ids: dict[str, str]
+    intents: list[OptionIntent],
+    db: Database,
+    change_set: dict[str, Any],
+    new_form_ids: dict[str, str],
+    placeholders: PlaceholderAllocator,
 ) -> None:
     for intent in intents:
+        if intent.target_form.selector:
+            await _fan_out_option_intent(intent, db, change_set, placeholders)
+            continue
         form_id = await _resolve_form_id(db, intent.target_form.model_dump(), new_form_ids)
         
         field = None
@@ -438,6 +606,7 @@ async def _apply_option_intents(
                     message=message,
                     reason="field_ambiguous",
                     field_candidates=field_candidates,
+                    reference=intent.field_code or intent.field_label,
                 )
         
         if not field:
@@ -461,15 +630,18 @@ async def _apply_option_intents(
                 if form_row
                 else f"form id {form_id}"
             )
-            fields = await db.fetch_all(
-                "SELECT id, label, code FROM form_fields WHERE form_id = ? ORDER BY position",
-                [form_id],
-            )
             wanted = intent.field_code or intent.field_label or "the dropdown field"
+            limit = get_settings().suggestion_limit
+            fields = await get_catalog_suggester(db).suggest_fields(form_id, wanted, limit)
+            if not fields:
+                fields = await db.fetch_all(
+                    "SELECT id, label, code FROM form_fields WHERE form_id = ? ORDER BY position LIMIT ?",
+                    [form_id, limit],
+                )
             field_list = ", ".join([f"{row['label']} ({row['code']})" for row in fields]) if fields else "no fields"
             message = (
                 f"I could not find a field that looks like '{wanted}' on {form_label}. "
-                f"Existing fields: {field_list}. "
+                f"Closest existing fields: {field_list}. "
                 f"If you want to CREATE a new field, please say 'create a new field' or 'add new field' explicitly."
             )
             field_candidates = [
@@ -480,75 +652,150 @@ async def _apply_option_intents(
                 message=message,
                 reason="field_not_found",
                 field_candidates=field_candidates,
+                reference=intent.field_code or intent.field_label,
             )
 
         option_set = await db.get_option_set_for_field(field["id"])
-        option_sets_table = _ensure_table_section(change_set, "option_sets")
-        binding_table = _ensure_table_section(change_set, "field_option_binding")
-        option_items_table = _ensure_table_section(change_set, "option_items")
+        existing_items = await db.get_option_items_for_field(field["id"])
+        _append_option_rows(
+            intent, field, form_id, option_set["id"] if option_set else None, existing_items, change_set, placeholders
+        )
+
+
+def _append_option_rows(
+    intent: OptionIntent,
+    field: dict[str, Any],
+    form_id: str,
+    option_set_id: str | None,
+    existing_items: list[dict[str, Any]],
+    change_set: dict[str, Any],
+    placeholders: PlaceholderAllocator,
+) -> None:
+    option_sets_table = _ensure_table_section(change_set, "option_sets")
+    binding_table = _ensure_table_section(change_set, "field_option_binding")
+    option_items_table = _ensure_table_section(change_set, "option_items")
 
-        if not option_set:
-            option_set_id = _placeholder("optset")
-            option_set = {
+    if not option_set_id:
+        option_set_id = placeholders("optset")
+        option_sets_table["insert"].append(
+            {
                 "id": option_set_id,
                 "form_id": form_id,
                 "name": f"{field['label']} options",
             }
-            option_sets_table["insert"].append(option_set)
-            binding_table["insert"].append(
+        )
+        binding_table["insert"].append(
+            {
+                "field_id": field["id"],
+                "option_set_id": option_set_id,
+                "display_pattern": None,
+            }
+        )
+
+    existing_by_value = {item["value"]: item for item in existing_items}
+    existing_by_label = {item["label"]: item for item in existing_items}
+
+    if intent.operation is OperationType.insert:
+        max_position = max((int(item["position"]) for item in existing_items), default=0)
+        for value in intent.add_values:
+            if value in existing_by_value:
+                continue
+            max_position += 1
+            option_items_table["insert"].append(
                 {
-                    "field_id": field["id"],
+                    "id": placeholders("opt"),
                     "option_set_id": option_set_id,
-                    "display_pattern": None,
+                    "value": value,
+                    "label": value,
+                    "position": max_position,
+                    "is_active": 1,
                 }
             )
-        option_set_id = option_set["id"]
 
-        existing_items = await db.get_option_items_for_field(field["id"])
-        existing_by_value = {item["value"]: item for item in existing_items}
-        existing_by_label = {item["label"]: item for item in existing_items}
+    if intent.rename_map:
+        for old_value, new_value in intent.rename_map.items():
+            item = existing_by_value.get(old_value) or existing_by_label.get(old_value)
+            if not item:
+                continue
+            option_items_table["update"].append(
+                {
+                    "id": item["id"],
+                    "value": new_value,
+                    "label": new_value,
+                }
+            )
 
-        if intent.operation is OperationType.insert:
-            max_position = max((int(item["position"]) for item in existing_items), default=0)
-            for value in intent.add_values:
-                if value in existing_by_value:
-                    continue
-                max_position += 1
-                option_items_table["insert"].append(
-                    {
-                        "id": _placeholder("opt"),
-                        "option_set_id": option_set_id,
-                        "value": value,
-                        "label": value,
-                        "position": max_position,
-                        "is_active": 1,
-                    }
-                )
+    if intent.remove_values:
+        for value in intent.remove_values:
+            item = existing_by_value.get(value) or existing_by_label.get(value)
+            if not item:
+                continue
+            option_items_table["update"].append(
+                {
+                    "id": item["id"],
+                    "is_active": 0,
+                }
+            )
 
-        if intent.rename_map:
-            for old_value, new_value in intent.rename_map.items():
-                item = existing_by_value.get(old_value) or existing_by_label.get(old_value)
-                if not item:
-                    continue
-                option_items_table["update"].append(
-                    {
-                        "id": item["id"],
-                        "value": new_value,
-                        "label": new_value,
-                    }
-                )
 
-        if intent.remove_values:
-            for value in intent.remove_values:
-                item = existing_by_value.get(value) or existing_by_label.get(value)
-                if not item:
-                    continue
-                option_items_table["update"].append(
-                    {
-                        "id": item["id"],
-                        "is_active": 0,
-                    }
-                )
+async def _fan_out_option_intent(
+    intent: OptionIntent,
+    db: Database,
+    change_set: dict[str, Any],
+    placeholders: PlaceholderAllocator,
+) -> None:
+    """
+    Apply an option intent to the field with the intent's code on every form
+    its selector matches, including fields the change-set itself inserts.
+    Each field is charged the most rows the intent can produce for it (one
+    per value, plus the option set and binding of an unbound field) before
+    any are built. Existing option items of the fetched fields are then
+    read in one query.
+    """
+    selector = intent.target_form.selector
+    code = intent.field_code
+    if not code:
+        raise ValueError("Option intents targeting a form selector need a field_code")
+    pending = {
+        str(row["form_id"]): row
+        for row in change_set.get("form_fields", {}).get("insert", [])
+        if row.get("code") == code and not str(row.get("form_id")).startswith("$")
+    }
+    added = len(intent.add_values) if intent.operation is OperationType.insert else 0
+    rows_per_field = added + len(intent.rename_map) + len(intent.remove_values)
+    targets = await fields_with_code(
+        db,
+        selector,
+        code,
+        _fan_out_limit(change_set, rows_per_field),
+        pending,
+        rows_per_field=rows_per_field,
+        rows_per_unbound_field=rows_per_field + 2,
+    )
+    if not targets:
+        raise ValueError(f"No form matching the selector ({describe_selector(selector)}) has a field with code '{code}'")
+    _check_fan_out(change_set, int(targets[0]["planned"]))
+
+    items_by_field: dict[str, list[dict[str, Any]]] = {}
+    bound = [str(target["field_id"]) for target in targets if target["option_set_id"]]
+    if bound:
+        for item in await option_items_for_fields(db, bound):
+            items_by_field.setdefault(str(item["field_id"]), []).append(item)
+    for target in targets:
+        form_id = str(target["form_id"])
+        if target["field_id"] is None:
+            field = pending[form_id]
+        else:
+            field = {"id": target["field_id"], "label": target["label"]}
+        _append_option_rows(
+            intent,
+            field,
+            form_id,
+            target["option_set_id"],
+            items_by_field.get(str(field["id"]), []),
+            change_set,
+            placeholders,
+        )
 
 
 async def _resolve_field_reference(
@@ -654,9 +901,15 @@ async def _resolve_field_reference(
 
 
 async def _apply_logic_intents(
-    intents: list[LogicIntent], db: Database, change_set: dict[str, Any], new_form_ids: dict[str, str]
+    intents: list[LogicIntent],
+    db: Database,
+    change_set: dict[str, Any],
+    new_form_ids: dict[str, str],
+    placeholders: PlaceholderAllocator,
 ) -> None:
     for intent in intents:
+        if intent.target_form.selector:
+            raise ValueError("Logic intents cannot target a form selector; name a single form")
         form_id = await _resolve_form_id(db, intent.target_form.model_dump(), new_form_ids)
         rules_table = _ensure_table_section(change_set, "logic_rules")
         conditions_table = _ensure_table_section(change_set, "logic_conditions")
@@ -674,7 +927,7 @@ async def _apply_logic_intents(
             while final_priority in existing_priorities:
                 final_priority += 1
             
-            rule_id = _placeholder("rule")
+            rule_id = placeholders("rule")
             rule = {
                 "id": rule_id,
                 "form_id": form_id,
@@ -692,7 +945,7 @@ async def _apply_logic_intents(
                 
                 conditions_table["insert"].append(
                     {
-                        "id": _placeholder("cond"),
+                        "id": placeholders("cond"),
                         "rule_id": rule_id,
                         "group_id": None,
                         "lhs_ref": resolved_lhs_ref,
@@ -709,7 +962,7 @@ async def _apply_logic_intents(
                 
                 actions_table["insert"].append(
                     {
-                        "id": _placeholder("act"),
+                        "id": placeholders("act"),
                         "rule_id": rule_id,
                         "action": act.get("action"),
                         "target_ref": resolved_target_ref,
@@ -785,7 +1038,7 @@ async def _apply_logic_intents(
                             cond.get("lhs_ref"), form_id, db, change_set
                         )
                         conditions_table["insert"].append({
-                            "id": _placeholder("cond"),
+                            "id": placeholders("cond"),
                             "rule_id": rule_id,
                             "group_id": None,
                             "lhs_ref": resolved_lhs_ref,
@@ -821,7 +1074,7 @@ async def _apply_logic_intents(
                             act.get("target_ref"), form_id, db, change_set
                         )
                         actions_table["insert"].append({
-                            "id": _placeholder("act"),
+                            "id": placeholders("act"),
                             "rule_id": rule_id,
                             "action": act.get("action"),
                             "target_ref": resolved_target_ref,
@@ -870,3 +1123,90 @@ async def _apply_logic_intents(
                 actions_table["delete"].append({"id": act["id"]})
 
 
+async def _cascade_field_changes(db: Database, change_set: dict[str, Any]) -> None:
+    """
+    Carry field deletes and code renames over to the logic that references
+    the field, found through the `field_references` index:
+
+    - a rule with a condition on a deleted field is deleted with all of its
+      conditions and actions, as is a rule left without actions;
+    - an action on a deleted field is deleted;
+    - a reference by code to a renamed field is rewritten to its id.
+
+    Rules the plan itself edits are left alone; dangling references in them
+    are reported as warnings instead.
+    """
+    fields = change_set.get("form_fields") or {}
+    deleted = {
+        str(row["id"]) for row in fields.get("delete", []) if row.get("id") and not str(row["id"]).startswith("$")
+    }
+    renamed = {
+        str(row["id"]) for row in fields.get("update", [])
+        if "code" in row and row.get("id") and str(row["id"]) not in deleted
+    }
+    if not deleted and not renamed:
+        return
+    references = await references_to_fields(db, deleted | renamed)
+    if not references:
+        return
+
+    def touched(table: str, *ops: str) -> set[str]:
+        section = change_set.get(table) or {}
+        return {str(row.get("id")) for op in ops for row in section.get(op, []) if isinstance(row, dict)}
+
+    edited_rules = touched("logic_rules", "update", "delete") | {
+        str(row.get("rule_id"))
+        for table in ("logic_conditions", "logic_actions")
+        for op in ("insert", "update")
+        for row in (change_set.get(table) or {}).get(op, [])
+        if isinstance(row, dict) and row.get("rule_id")
+    }
+    edited_rows = touched("logic_conditions", "update", "delete") | touched("logic_actions", "update", "delete")
+
+    drop_rules: set[str] = set()
+    drop_actions: set[str] = set()
+    rewrite: dict[str, dict[str, str]] = {"logic_conditions": {}, "logic_actions": {}}
+    for ref in references:
+        rule_id, ref_id, field_id = str(ref["rule_id"]), str(ref["ref_id"]), str(ref["field_id"])
+        if rule_id in edited_rules or ref_id in edited_rows:
+            continue
+        if field_id in deleted and ref["ref_table"] == "logic_conditions":
+            drop_rules.add(rule_id)
+        elif field_id in deleted:
+            drop_actions.add(ref_id)
+        elif ref["by_code"]:
+            rewrite[ref["ref_table"]][ref_id] = field_id
+
+    actions = await logic_children(db, "logic_actions", {str(ref["rule_id"]) for ref in references})
+    remaining: dict[str, int] = {}
+    for action in actions:
+        if str(action["id"]) not in drop_actions:
+            remaining[str(action["rule_id"])] = remaining.get(str(action["rule_id"]), 0) + 1
+    for ref in references:
+        if str(ref["ref_id"]) in drop_actions and not remaining.get(str(ref["rule_id"])):
+            drop_rules.add(str(ref["rule_id"]))
+
+    condition_rules = drop_rules | {
+        str(ref["rule_id"]) for ref in references if str(ref["ref_id"]) in rewrite["logic_conditions"]
+    }
+    conditions = await logic_children(db, "logic_conditions", condition_rules)
+    for table, column, rows in (
+        ("logic_conditions", "lhs_ref", conditions),
+        ("logic_actions", "target_ref", actions),
+    ):
+        # The plan may already delete some of these rows.
+        deleting = touched(table, "delete")
+        for row in rows:
+            row_id, rule_id = str(row["id"]), str(row["rule_id"])
+            if rule_id in drop_rules or row_id in drop_actions:
+                if row_id not in deleting:
+                    _ensure_table_section(change_set, table)["delete"].append({"id": row_id})
+                    deleting.add(row_id)
+            elif row_id in rewrite[table]:
+                ref_obj = json.loads(row["ref"])
+                ref_obj.pop("field_code", None)
+                ref_obj["field_id"] = rewrite[table][row_id]
+                _ensure_table_section(change_set, table)["update"].append({"id": row_id, column: json.dumps(ref_obj)})
+    if drop_rules:
+        rules = _ensure_table_section(change_set, "logic_rules")
+        rules["delete"].extend({"id": rule_id} for rule_id in sorted(drop_rules - touched("logic_rules", "delete")))
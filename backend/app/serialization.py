@@ -0,0 +1,120 @@
+"""
+Compact, canonical serialization of plans and change-sets for LLM prompts.
+
+Indented JSON with empty `insert`/`update`/`delete` arrays and every row
+repeating the same keys costs a large share of the input tokens of the
+critique and explanation calls. `prompt_json` drops empty values, sorts keys,
+and writes lists of same-shaped rows as a column header plus value rows;
+`prompt_tables` renders change-sets as TSV blocks instead.
+"""
+
+from typing import Any
+import json
+import logging
+
+import orjson
+from pydantic import BaseModel
+
+from .llm_client import estimate_tokens
+from .request_context import add_metric
+
+logger = logging.getLogger(__name__)
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+def prune(value: Any) -> Any:
+    """
+    Drop None, empty strings and empty lists/dicts at every level, keeping
+    meaningful falsy values such as 0 and False.
+    """
+    if isinstance(value, dict):
+        pruned = {key: prune(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if not _is_empty(item)}
+    if isinstance(value, list):
+        return [item for item in (prune(item) for item in value) if not _is_empty(item)]
+    return value
+
+
+def _columnar(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    columns: list[str] = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    columns.sort()
+    return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in rows]}
+
+
+def _compact_rows(value: Any) -> Any:
+    """
+    Replace lists of two or more dicts with one column header and value rows.
+    """
+    if isinstance(value, dict):
+        return {key: _compact_rows(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_compact_rows(item) for item in value]
+        if len(items) > 1 and all(isinstance(item, dict) for item in items):
+            return _columnar(items)
+        return items
+    return value
+
+
+def _log_savings(label: str, original: Any, text: str) -> None:
+    before = estimate_tokens(json.dumps(original, indent=2, default=str))
+    after = estimate_tokens(text)
+    add_metric("prompt_serialization_tokens_saved", before - after)
+    logger.info("%s serialized in ~%d tokens (~%d as indented JSON)", label, after, before)
+
+
+def prompt_json(value: Any, label: str = "payload", columnar: bool = True) -> str:
+    """
+    Canonical compact JSON: empty values dropped, keys sorted, no whitespace,
+    and (with `columnar`) repeated row keys written once per list. Pass
+    columnar=False for JSON the model is asked to echo back, such as plans.
+    """
+    original = _plain(value)
+    data = prune(original)
+    if columnar:
+        data = _compact_rows(data)
+    text = orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    _log_savings(label, original, text)
+    return text
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str) and not any(ch in value for ch in "\t\n\r\""):
+        return value
+    return orjson.dumps(value).decode("utf-8")
+
+
+def prompt_tables(change_set: dict[str, Any], label: str = "change-set") -> str:
+    """
+    A change-set as one TSV block per non-empty table and operation:
+
+        [form_fields.insert]
+        code	form_id	id	label
+        university_name	employment-demo	$fld_1	University name
+    """
+    blocks: list[str] = []
+    for table in sorted(change_set):
+        ops = change_set[table] or {}
+        for op in ("insert", "update", "delete"):
+            rows = [prune(row) for row in ops.get(op) or [] if isinstance(row, dict)]
+            if not rows:
+                continue
+            columns = _columnar(rows)["columns"]
+            lines = [f"[{table}.{op}]", "\t".join(columns)]
+            lines.extend("\t".join(_cell(row.get(column)) for column in columns) for row in rows)
+            blocks.append("\n".join(lines))
+    text = "\n\n".join(blocks)
+    _log_savings(label, change_set, text)
+    return text
@@ -0,0 +1,199 @@
+"""
+Server-side planning sessions for multi-turn clarification.
+
+A session keeps the root request, the clarification history, the last intent
+plan and the resolution problem that blocked it, plus the planner context
+built on the first turn. Follow-up turns then only re-plan the intents the
+clarification was about instead of the whole request.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+import re
+import time
+
+from .config import get_settings
+from .intent_schema import IntentPlan, TargetForm
+from .prompt_compiler import PlannerContext
+
+
+_FORM_REASONS = {"form_not_found", "form_ambiguous"}
+_FIELD_REASONS = {"field_not_found", "field_ambiguous"}
+
+
+@dataclass
+class PlanningSession:
+    session_id: str
+    query: str
+    history: list[dict[str, str]] = field(default_factory=list)
+    # Number of history items already validated, so follow-ups only check new ones.
+    validated_items: int = 0
+    plan: IntentPlan | None = None
+    # The resolution clarification that blocked `plan`, if any.
+    pending: dict[str, Any] | None = None
+    context: PlannerContext | None = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def extend_history(self, items: list[dict[str, str]]) -> list[dict[str, str]]:
+        """
+        Add a turn's history to the session and return the new items. Clients
+        may send either the full history or only the latest answers.
+        """
+        if items[: len(self.history)] == self.history:
+            new_items = items[len(self.history):]
+        else:
+            new_items = items
+        self.history = self.history + new_items
+        return new_items
+
+    def record_turn(self, plan: IntentPlan, response: dict[str, Any]) -> None:
+        self.plan = plan
+        self.pending = None
+        if response["type"] == "clarification" and response.get("reason") in _FORM_REASONS | _FIELD_REASONS:
+            self.pending = {
+                "reason": response["reason"],
+                "reference": response.get("reference"),
+                "question": response["question"],
+                "form_candidates": response.get("form_candidates") or [],
+                "field_candidates": response.get("field_candidates") or [],
+            }
+
+
+class SessionStore:
+    """
+    In-memory session store with idle expiry and a size cap (oldest first).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions: OrderedDict[str, PlanningSession] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.updated_at >= cutoff and len(self._sessions) <= self.max_entries:
+                break
+            self._sessions.popitem(last=False)
+
+    def create(self, query: str) -> PlanningSession:
+        session = PlanningSession(session_id=uuid4().hex, query=query)
+        self._sessions[session.session_id] = session
+        self._expire()
+        return session
+
+    def get(self, session_id: str) -> PlanningSession | None:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.updated_at = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def discard(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+_store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = SessionStore(settings.session_ttl_seconds, settings.session_max_entries)
+    return _store
+
+
+def _casefold(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().casefold()
+
+
+def _choose_candidate(
+    answer: str, candidates: list[dict[str, Any]], keys: tuple[str, ...]
+) -> dict[str, Any] | None:
+    """
+    The candidate the answer names: an exact title/slug/label/code match, or
+    the only candidate whose name appears in the answer.
+    """
+    wanted = _casefold(answer).strip(" .!\"'")
+    exact = [c for c in candidates if any(_casefold(c.get(key)) == wanted for key in keys)]
+    if len(exact) == 1:
+        return exact[0]
+    mentioned = [
+        c
+        for c in candidates
+        if any(
+            _casefold(c.get(key)) and re.search(rf"\b{re.escape(_casefold(c.get(key)))}\b", wanted)
+            for key in keys
+        )
+    ]
+    if len(mentioned) == 1:
+        return mentioned[0]
+    return None
+
+
+def _form_reference(target_form: TargetForm) -> str | None:
+    if target_form.form_id:
+        return None
+    return target_form.form_name or target_form.form_code
+
+
+def _is_unresolved(intent: Any, pending: dict[str, Any]) -> bool:
+    reference = pending.get("reference")
+    if not reference:
+        return False
+    if pending["reason"] in _FORM_REASONS:
+        return _form_reference(intent.target_form) == reference
+    return getattr(intent, "field_code", None) == reference or getattr(intent, "field_label", None) == reference
+
+
+def split_plan(plan: IntentPlan, pending: dict[str, Any]) -> tuple[IntentPlan, IntentPlan]:
+    """
+    Split a blocked plan into (resolved, unresolved) parts: the intents that
+    refer to the reference the clarification was about, and the rest.
+    """
+    resolved = IntentPlan(notes=plan.notes)
+    unresolved = IntentPlan()
+    for kind in ("fields", "options", "logic_blocks"):
+        for intent in getattr(plan, kind):
+            target = unresolved if _is_unresolved(intent, pending) else resolved
+            getattr(target, kind).append(intent.model_copy(deep=True))
+    return resolved, unresolved
+
+
+def apply_candidate_answer(plan: IntentPlan, pending: dict[str, Any], answer: str) -> IntentPlan | None:
+    """
+    Patch the blocked intents with the candidate the user picked, or return
+    None when the answer does not name exactly one candidate.
+    """
+    if pending["reason"] in _FORM_REASONS:
+        choice = _choose_candidate(answer, pending["form_candidates"], ("title", "slug"))
+    else:
+        choice = _choose_candidate(answer, pending["field_candidates"], ("label", "code"))
+    if choice is None:
+        return None
+
+    patched = plan.model_copy(deep=True)
+    changed = False
+    for kind in ("fields", "options", "logic_blocks"):
+        for intent in getattr(patched, kind):
+            if not _is_unresolved(intent, pending):
+                continue
+            if pending["reason"] in _FORM_REASONS:
+                intent.target_form = TargetForm(
+                    form_id=str(choice["id"]), form_name=choice.get("title"), form_code=choice.get("slug")
+                )
+            elif kind != "logic_blocks":
+                intent.field_code = choice.get("code")
+                intent.field_label = choice.get("label")
+            else:
+                continue
+            changed = True
+    return patched if changed else None
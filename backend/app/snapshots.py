@@ -0,0 +1,174 @@
+"""
+Delta `before_snapshot`s: only the rows a change-set touches.
+
+A full snapshot carries every page, field, option and rule of each affected
+form, which for big forms dwarfs the change itself. A delta snapshot has the
+same shape (`form`, `pages`, `fields`, `options_by_field`, `logic_rules`,
+`logic_conditions`, `logic_actions`) but holds only:
+
+- the form row;
+- fields the change-set updates, deletes, binds or references from logic,
+  plus the field owning any changed option list;
+- the complete option list of those fields (an option's siblings);
+- the pages those fields sit on, and pages new fields are placed on;
+- changed rules with all of their conditions and actions.
+
+It is marked with `"partial": true`; the full structure stays available from
+`GET /api/forms/{form_id}` or by asking for `snapshot: "full"`. Every row kind
+is loaded with one `IN (...)` query, so the cost follows the size of the
+change-set rather than of the forms.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+import json
+
+from .db import Database
+
+
+def _existing(value: Any) -> str | None:
+    """
+    `value` as an id of a row that already exists, or None for placeholders.
+    """
+    if value is None:
+        return None
+    value = str(value)
+    return None if value.startswith("$") else value
+
+
+def _rows(change_set: dict[str, Any], table: str, *ops: str) -> list[dict[str, Any]]:
+    section = change_set.get(table) or {}
+    return [row for op in ops for row in section.get(op) or [] if isinstance(row, dict)]
+
+
+def _ref_field_id(ref: Any) -> str | None:
+    try:
+        ref_obj = json.loads(ref) if isinstance(ref, str) else ref
+    except json.JSONDecodeError:
+        return None
+    if isinstance(ref_obj, dict) and ref_obj.get("type") == "field":
+        return _existing(ref_obj.get("field_id"))
+    return None
+
+
+async def _fetch_in(db: Database, sql: str, ids: Iterable[str]) -> list[dict[str, Any]]:
+    """
+    Run `sql`, whose `{ids}` stands for a placeholder list, for `ids`.
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return []
+    return await db.fetch_all(sql.format(ids=",".join("?" for _ in ids)), ids)
+
+
+async def delta_snapshots(
+    db: Database, change_set: dict[str, Any], form_ids: Iterable[str]
+) -> dict[str, Any]:
+    """
+    Partial snapshots of `form_ids` covering the rows `change_set` touches.
+    """
+    fields: set[str] = set()
+    pages: set[str] = set()
+    option_sets: set[str] = set()
+    rules: set[str] = set()
+
+    for row in _rows(change_set, "form_fields", "update", "delete"):
+        fields.add(_existing(row.get("id")))
+    for row in _rows(change_set, "form_fields", "insert", "update"):
+        pages.add(_existing(row.get("page_id")))
+    for row in _rows(change_set, "form_pages", "update", "delete"):
+        pages.add(_existing(row.get("id")))
+    for row in _rows(change_set, "field_option_binding", "insert", "update", "delete"):
+        fields.add(_existing(row.get("field_id")))
+        option_sets.add(_existing(row.get("option_set_id")))
+    option_rows = _rows(change_set, "option_items", "insert", "update", "delete")
+    for row in option_rows:
+        option_sets.add(_existing(row.get("option_set_id")))
+    for row in _rows(change_set, "logic_rules", "update", "delete"):
+        rules.add(_existing(row.get("id")))
+    for table, ref_key in (("logic_conditions", "lhs_ref"), ("logic_actions", "target_ref")):
+        for row in _rows(change_set, table, "insert", "update", "delete"):
+            rules.add(_existing(row.get("rule_id")))
+            fields.add(_ref_field_id(row.get(ref_key)))
+
+    # Rows changed by id only name their parent indirectly.
+    item_ids = [_existing(row.get("id")) for row in option_rows if not row.get("option_set_id")]
+    for row in await _fetch_in(db, "SELECT option_set_id FROM option_items WHERE id IN ({ids})", filter(None, item_ids)):
+        option_sets.add(str(row["option_set_id"]))
+    for table in ("logic_conditions", "logic_actions"):
+        ids = [_existing(row.get("id")) for row in _rows(change_set, table, "update", "delete") if not row.get("rule_id")]
+        for row in await _fetch_in(db, f"SELECT rule_id FROM {table} WHERE id IN ({{ids}})", filter(None, ids)):
+            rules.add(str(row["rule_id"]))
+
+    rules.discard(None)
+    logic_rules = await _fetch_in(db, "SELECT * FROM logic_rules WHERE id IN ({ids}) ORDER BY priority", rules)
+    rule_ids = [str(rule["id"]) for rule in logic_rules]
+    logic_conditions = await _fetch_in(db, "SELECT * FROM logic_conditions WHERE rule_id IN ({ids})", rule_ids)
+    logic_actions = await _fetch_in(db, "SELECT * FROM logic_actions WHERE rule_id IN ({ids})", rule_ids)
+    for row in logic_conditions:
+        fields.add(_ref_field_id(row.get("lhs_ref")))
+    for row in logic_actions:
+        fields.add(_ref_field_id(row.get("target_ref")))
+
+    option_sets.discard(None)
+    for row in await _fetch_in(db, "SELECT field_id FROM field_option_binding WHERE option_set_id IN ({ids})", option_sets):
+        fields.add(str(row["field_id"]))
+
+    fields.discard(None)
+    field_rows = await _fetch_in(
+        db,
+        "SELECT f.*, ft.key AS field_type_key FROM form_fields f "
+        "JOIN field_types ft ON ft.id = f.type_id "
+        "WHERE f.id IN ({ids}) ORDER BY f.page_id, f.position",
+        fields,
+    )
+    option_rows = await _fetch_in(
+        db,
+        "SELECT b.field_id AS bound_field_id, oi.* FROM option_items oi "
+        "JOIN field_option_binding b ON b.option_set_id = oi.option_set_id "
+        "WHERE b.field_id IN ({ids}) ORDER BY oi.position",
+        [str(field["id"]) for field in field_rows],
+    )
+    pages.update(_existing(field.get("page_id")) for field in field_rows)
+    pages.discard(None)
+    page_rows = await _fetch_in(db, "SELECT * FROM form_pages WHERE id IN ({ids}) ORDER BY position", pages)
+    form_rows = await _fetch_in(
+        db, "SELECT id, slug, title, description, status FROM forms WHERE id IN ({ids})", map(str, form_ids)
+    )
+
+    snapshots: dict[str, Any] = {}
+    for form in sorted(form_rows, key=lambda row: str(row["id"])):
+        snapshots[str(form["id"])] = {
+            "form": form,
+            "pages": [],
+            "fields": [],
+            "options_by_field": {},
+            "logic_rules": [],
+            "logic_conditions": [],
+            "logic_actions": [],
+            "partial": True,
+        }
+    field_forms = {str(field["id"]): str(field["form_id"]) for field in field_rows}
+    rule_forms = {str(rule["id"]): str(rule["form_id"]) for rule in logic_rules}
+    grouped = (
+        ("pages", page_rows, lambda row: row["form_id"]),
+        ("fields", field_rows, lambda row: row["form_id"]),
+        ("logic_rules", logic_rules, lambda row: row["form_id"]),
+        ("logic_conditions", logic_conditions, lambda row: rule_forms.get(str(row["rule_id"]))),
+        ("logic_actions", logic_actions, lambda row: rule_forms.get(str(row["rule_id"]))),
+    )
+    for key, rows, owner in grouped:
+        for row in rows:
+            snapshot = snapshots.get(str(owner(row)))
+            if snapshot is not None:
+                snapshot[key].append(row)
+    for field in field_rows:
+        snapshot = snapshots.get(str(field["form_id"]))
+        if snapshot is not None:
+            snapshot["options_by_field"][str(field["id"])] = []
+    for row in option_rows:
+        field_id = str(row.pop("bound_field_id"))
+        snapshot = snapshots.get(field_forms.get(field_id, ""))
+        if snapshot is not None:
+            snapshot["options_by_field"][field_id].append(row)
+    return snapshots
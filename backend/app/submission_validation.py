@@ -0,0 +1,383 @@
+"""
+Batch validation of form submissions against field metadata.
+
+`compile_validation_plan` turns a form structure and the field type catalog
+into a `ValidationPlan`: one `FieldCheck` per field carrying its required
+flag, default value, the sorted array of its active option values and the
+constraints of its `validation_schema` and the type's `builtin_validators`.
+Supported constraints are `minLength`, `maxLength`, `minimum`, `maximum`,
+`pattern`, `enum` and `format` (`email`, `date`, `uri`); builtin validators
+name a format or `number`.
+
+`ValidationPlan.validate` takes a list of submissions (dicts keyed by field
+code) or columnar input (field code -> list of values) and checks one
+column at a time: missing values, option membership (`np.isin` over the
+whole column, multi-value fields flattened first), numeric bounds and
+string lengths are array operations; regular expressions run per value.
+Fields missing from a submission take their `default_value`. With the
+`FormState`s of the logic engine, hidden fields are skipped and required
+flags follow the rules.
+
+`get_validation_cache(db)` keeps compiled plans per form version.
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+import asyncio
+import json
+import logging
+import re
+
+import numpy as np
+
+from .config import get_settings
+from .db import Database
+from .form_cache import CompiledFormCache
+from .logic_engine import FormState
+
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_PATTERNS = {
+    "email": re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+"),
+    "uri": re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*://\S+"),
+}
+_FORMAT_ALIASES = {"email": "email", "url": "uri", "uri": "uri", "date": "date", "number": "number", "numeric": "number"}
+_TYPE_FORMATS = {"email": "email", "date": "date", "number": "number"}
+
+MESSAGES = {
+    "required": "is required",
+    "invalid_option": "is not one of the field's options",
+    "multiple_not_allowed": "accepts a single value",
+    "not_a_number": "must be a number",
+    "not_a_date": "must be a date (YYYY-MM-DD)",
+    "invalid_email": "must be an email address",
+    "invalid_uri": "must be a URL",
+    "too_short": "is too short",
+    "too_long": "is too long",
+    "below_minimum": "is below the minimum",
+    "above_maximum": "is above the maximum",
+    "pattern_mismatch": "does not match the expected pattern",
+    "not_allowed": "is not an allowed value",
+}
+
+
+def _json(text: Any) -> Any:
+    if not isinstance(text, str):
+        return text
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def _strings(values: Sequence[Any]) -> np.ndarray:
+    return np.array([str(value) for value in values], dtype=str)
+
+
+def _objects(values: Sequence[Any], count: int) -> np.ndarray:
+    # fromiter keeps list values as elements instead of adding a dimension.
+    return np.fromiter(values, dtype=object, count=count)
+
+
+@dataclass(frozen=True)
+class FieldCheck:
+    code: str
+    label: str
+    required: bool
+    multiple: bool
+    default: Any = None
+    options: np.ndarray | None = None
+    format: str | None = None
+    min_length: int | None = None
+    max_length: int | None = None
+    minimum: float | None = None
+    maximum: float | None = None
+    pattern: re.Pattern[str] | None = None
+    enum: np.ndarray | None = None
+
+
+@dataclass(frozen=True)
+class SubmissionError:
+    row: int
+    field: str
+    code: str
+    message: str
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"row": self.row, "field": self.field, "code": self.code, "message": self.message}
+
+
+@dataclass
+class ValidationResult:
+    rows: int
+    errors: list[SubmissionError] = field(default_factory=list)
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Per-row mask of submissions without errors.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        mask[[error.row for error in self.errors]] = False
+        return mask
+
+    def by_row(self) -> dict[int, list[SubmissionError]]:
+        grouped: dict[int, list[SubmissionError]] = {}
+        for error in self.errors:
+            grouped.setdefault(error.row, []).append(error)
+        return grouped
+
+
+class _Errors:
+    """
+    Error rows collected as arrays per (field, code) and materialized once.
+    """
+
+    def __init__(self) -> None:
+        self.parts: list[tuple[np.ndarray, int, FieldCheck, str]] = []
+
+    def add(self, rows: np.ndarray, position: int, check: FieldCheck, code: str) -> None:
+        if rows.size:
+            self.parts.append((rows, position, check, code))
+
+    def result(self, count: int) -> ValidationResult:
+        errors = [
+            (int(row), position, SubmissionError(int(row), check.code, code, f"{check.label} {MESSAGES[code]}"))
+            for rows, position, check, code in self.parts
+            for row in rows
+        ]
+        errors.sort(key=lambda item: (item[0], item[1]))
+        return ValidationResult(count, [error for _, _, error in errors])
+
+
+def _pattern(code: str, pattern: Any) -> re.Pattern[str] | None:
+    if not isinstance(pattern, str):
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error:
+        logger.warning("field %s has an invalid validation pattern %r; the constraint is ignored", code, pattern)
+        return None
+
+
+def _field_check(row: Mapping[str, Any], field_type: Mapping[str, Any], options: list[dict[str, Any]]) -> FieldCheck:
+    schema = _json(row.get("validation_schema"))
+    schema = schema if isinstance(schema, dict) else {}
+    builtin = _json(field_type.get("builtin_validators"))
+    names = list(builtin) if isinstance(builtin, (list, dict)) else []
+
+    formats = [_TYPE_FORMATS.get(str(row.get("field_type_key")))]
+    formats += [_FORMAT_ALIASES.get(str(name).lower()) for name in names]
+    formats.append(_FORMAT_ALIASES.get(str(schema.get("format", "")).lower()))
+    formats = [name for name in formats if name]
+
+    option_values = None
+    if field_type.get("has_options"):
+        option_values = np.sort(_strings([item["value"] for item in options if item.get("is_active", 1)]))
+    enum = schema.get("enum")
+    pattern = schema.get("pattern")
+    number = lambda key: float(schema[key]) if isinstance(schema.get(key), (int, float)) else None
+    length = lambda key: int(schema[key]) if isinstance(schema.get(key), int) else None
+    return FieldCheck(
+        code=str(row.get("code")),
+        label=str(row.get("label") or row.get("code")),
+        required=bool(row.get("required")),
+        multiple=bool(field_type.get("allows_multiple")),
+        default=row.get("default_value"),
+        options=option_values,
+        format=formats[0] if formats else None,
+        min_length=length("minLength"),
+        max_length=length("maxLength"),
+        minimum=number("minimum"),
+        maximum=number("maximum"),
+        pattern=_pattern(str(row.get("code")), pattern),
+        enum=np.sort(_strings(enum)) if isinstance(enum, list) else None,
+    )
+
+
+class ValidationPlan:
+    """
+    A form's compiled field checks, in page and position order.
+    """
+
+    def __init__(self, form_id: str, checks: list[FieldCheck]) -> None:
+        self.form_id = form_id
+        self.checks = tuple(checks)
+
+    def validate(
+        self,
+        submissions: Sequence[Mapping[str, Any]] | Mapping[str, Sequence[Any]],
+        states: Sequence[FormState] | None = None,
+    ) -> ValidationResult:
+        """
+        Errors per row for `submissions`, given as rows or as columns.
+        """
+        if isinstance(submissions, Mapping):
+            count = len(next(iter(submissions.values()), []))
+            if any(len(column) != count for column in submissions.values()):
+                raise ValueError("Columnar submissions must have columns of equal length")
+            column = lambda code: submissions[code] if code in submissions else [None] * count
+        else:
+            count = len(submissions)
+            column = lambda code: [row.get(code) for row in submissions]
+        if states is not None and len(states) != count:
+            raise ValueError("Expected one logic state per submission")
+
+        errors = _Errors()
+        for position, check in enumerate(self.checks):
+            values = _objects(column(check.code), count)
+            if states is None:
+                required = np.full(count, check.required)
+                active = np.ones(count, dtype=bool)
+            else:
+                active = np.fromiter((state.visible.get(check.code, True) for state in states), bool, count)
+                required = active & np.fromiter(
+                    (state.required.get(check.code, check.required) for state in states), bool, count
+                )
+            self._check_column(values, required, active, position, check, errors)
+        return errors.result(count)
+
+    def _check_column(
+        self,
+        values: np.ndarray,
+        required: np.ndarray,
+        active: np.ndarray,
+        position: int,
+        check: FieldCheck,
+        errors: _Errors,
+    ) -> None:
+        missing = (values == None) | (values == "")  # noqa: E711 - elementwise on object arrays
+        if check.multiple:
+            missing |= np.fromiter((isinstance(value, (list, tuple)) and not value for value in values), bool, values.size)
+        if check.default is not None:
+            values = values.copy()
+            values[missing] = check.default
+            missing[:] = False
+        errors.add(np.flatnonzero(required & missing), position, check, "required")
+
+        rows = np.flatnonzero(active & ~missing)
+        if not rows.size:
+            return
+        present = values[rows]
+        is_list = np.fromiter((isinstance(value, (list, tuple)) for value in present), bool, rows.size)
+        if check.multiple:
+            lengths = np.fromiter((len(value) if listed else 1 for value, listed in zip(present, is_list)), np.int64, rows.size)
+            flat = _strings([item for value, listed in zip(present, is_list) for item in (value if listed else (value,))])
+            owners = np.repeat(np.arange(rows.size), lengths)
+        else:
+            errors.add(rows[is_list], position, check, "multiple_not_allowed")
+            rows, present = rows[~is_list], present[~is_list]
+            flat = _strings(present)
+            owners = np.arange(rows.size)
+
+        def flag(bad_items: np.ndarray, code: str) -> None:
+            # Map failing items back to their submission rows.
+            bad_rows = np.bincount(owners[bad_items], minlength=rows.size) > 0
+            errors.add(rows[bad_rows], position, check, code)
+
+        if check.options is not None:
+            flag(~np.isin(flat, check.options), "invalid_option")
+        if check.enum is not None:
+            flag(~np.isin(flat, check.enum), "not_allowed")
+        if check.min_length is not None or check.max_length is not None:
+            sizes = np.char.str_len(flat)
+            if check.min_length is not None:
+                flag(sizes < check.min_length, "too_short")
+            if check.max_length is not None:
+                flag(sizes > check.max_length, "too_long")
+        if check.pattern is not None:
+            flag(~np.frompyfunc(lambda text: check.pattern.search(text) is not None, 1, 1)(flat).astype(bool), "pattern_mismatch")
+
+        if check.format in _FORMAT_PATTERNS:
+            regex = _FORMAT_PATTERNS[check.format]
+            matched = np.frompyfunc(lambda text: regex.fullmatch(text) is not None, 1, 1)(flat).astype(bool)
+            flag(~matched, f"invalid_{check.format}")
+        elif check.format == "date":
+            flag(~_dates(flat), "not_a_date")
+        elif check.format == "number" or check.minimum is not None or check.maximum is not None:
+            numbers = _numbers(flat)
+            bad = np.isnan(numbers)
+            if check.format == "number":
+                flag(bad, "not_a_number")
+            if check.minimum is not None:
+                flag(~bad & (numbers < check.minimum), "below_minimum")
+            if check.maximum is not None:
+                flag(~bad & (numbers > check.maximum), "above_maximum")
+
+
+def _numbers(values: np.ndarray) -> np.ndarray:
+    """
+    String values as float64, NaN where one is not a finite number.
+    Converts the whole column at once and falls back to per-value parsing
+    only when some value fails.
+    """
+    try:
+        numbers = values.astype(np.float64)
+    except ValueError:
+        numbers = np.full(values.size, np.nan)
+        for index, value in enumerate(values):
+            try:
+                numbers[index] = float(value)
+            except ValueError:
+                pass
+    numbers[~np.isfinite(numbers)] = np.nan
+    return numbers
+
+
+def _dates(values: np.ndarray) -> np.ndarray:
+    """
+    Mask of strings that are YYYY-MM-DD calendar dates, with the same
+    fallback.
+    """
+    exact = np.char.str_len(values) == 10
+    try:
+        values.astype("datetime64[D]")
+        return exact
+    except ValueError:
+        pass
+    ok = np.zeros(values.size, dtype=bool)
+    for index, value in enumerate(values):
+        try:
+            np.datetime64(value, "D")
+            ok[index] = True
+        except ValueError:
+            pass
+    return ok & exact
+
+
+def compile_validation_plan(structure: Mapping[str, Any], field_types: Mapping[str, Mapping[str, Any]]) -> ValidationPlan:
+    """
+    Compile the fields of a form structure; `field_types` maps type keys to
+    `field_types` rows.
+    """
+    options = structure.get("options_by_field") or {}
+    checks = [
+        _field_check(row, field_types.get(str(row.get("field_type_key")), {}), options.get(str(row.get("id")), []))
+        for row in structure.get("fields") or []
+    ]
+    form = structure.get("form") or {}
+    return ValidationPlan(str(form.get("id")), checks)
+
+
+async def load_field_types(db: Database) -> dict[str, dict[str, Any]]:
+    rows = await db.fetch_all("SELECT key, has_options, allows_multiple, builtin_validators FROM field_types")
+    return {str(row["key"]): row for row in rows}
+
+
+_caches: dict[str, CompiledFormCache[ValidationPlan]] = {}
+
+
+def get_validation_cache(db: Database) -> CompiledFormCache[ValidationPlan]:
+    key = str(db.path)
+    cache = _caches.get(key)
+    if cache is None:
+
+        async def compile(structure: dict[str, Any]) -> ValidationPlan:
+            field_types = await load_field_types(db)
+            return await asyncio.to_thread(compile_validation_plan, structure, field_types)
+
+        cache = CompiledFormCache(db, compile, get_settings().compiled_form_cache_size)
+        _caches[key] = cache
+    return cache
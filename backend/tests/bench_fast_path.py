@@ -0,0 +1,60 @@
+"""
+Measure how much of the scenario traffic the rule-based fast path serves
+without an LLM call, and how long it takes.
+
+Usage: python tests/bench_fast_path.py [--scenarios tests/scenarios.json] [--runs 20]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+from app.fast_path import parse_fast_path
+from app.resolver import build_change_set
+
+from conftest import seed_copy
+
+
+async def run(scenarios_path: Path, runs: int) -> None:
+  data = json.loads(scenarios_path.read_text(encoding="utf-8"))
+  with tempfile.TemporaryDirectory() as tmp:
+    # Work on a copy so migrations never touch the seeded database.
+    db = Database(path=seed_copy(tmp))
+    await db.ensure_migrated()
+
+    served = 0
+    for scenario in data:
+      query = scenario["query"]
+      plan = await parse_fast_path(query, db)
+      start = time.perf_counter()
+      for _ in range(runs):
+        await parse_fast_path(query, db)
+      elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+      if plan is None:
+        print(f"llm        {elapsed_ms:6.2f} ms  {scenario['name']}")
+        continue
+      change_set = await build_change_set(plan=plan, db=db)
+      rows = sum(len(ops[op]) for ops in change_set.values() for op in ("insert", "update", "delete"))
+      served += 1
+      print(f"fast_path  {elapsed_ms:6.2f} ms  {scenario['name']} ({rows} row changes)")
+
+    total = len(data)
+    print(f"\nFast-path coverage: {served}/{total} ({100 * served / max(total, 1):.0f}%)")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--scenarios", type=Path, default=here.parent / "scenarios.json")
+  parser.add_argument("--runs", type=int, default=20)
+  args = parser.parse_args()
+  asyncio.run(run(args.scenarios, args.runs))
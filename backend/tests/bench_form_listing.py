@@ -0,0 +1,63 @@
+"""
+Benchmark /api/forms listing queries as the catalog grows: the legacy
+unpaginated `ORDER BY title`, the first keyset page, a page deep into the
+catalog, and a filtered title-prefix page.
+
+Usage: python tests/bench_form_listing.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+from bench_search_index import _build_catalog
+
+
+async def _time(label: str, runs: int, fn) -> None:
+  start = time.perf_counter()
+  rows = 0
+  for _ in range(runs):
+    rows += len(await fn())
+  elapsed = (time.perf_counter() - start) / runs * 1000
+  print(f"  {label:<24} {elapsed:9.2f} ms/query  ({rows // runs} rows)")
+
+
+async def run(sizes: list[int], page_size: int, runs: int) -> None:
+  for size in sizes:
+    with tempfile.TemporaryDirectory() as tmp:
+      path = Path(tmp) / "catalog.sqlite"
+      _build_catalog(path, size, size)
+      db = Database(path=path)
+      await db.ensure_migrated()
+      middle = await db.fetch_one(
+        "SELECT title, id FROM forms ORDER BY title COLLATE NOCASE, id LIMIT 1 OFFSET ?", [size // 2]
+      )
+      print(f"{size} forms")
+      await _time("legacy full listing", runs, lambda: db.fetch_all(
+        "SELECT id, slug, title, status FROM forms ORDER BY title"
+      ))
+      await _time("first page", runs, lambda: db.list_forms(page_size))
+      await _time("page at the midpoint", runs, lambda: db.list_forms(
+        page_size, after=(middle["title"], middle["id"])
+      ))
+      await _time("status + prefix page", runs, lambda: db.list_forms(
+        page_size, status="published", title_prefix="Laptop"
+      ))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+  parser.add_argument("--page-size", type=int, default=100)
+  parser.add_argument("--runs", type=int, default=20)
+  args = parser.parse_args()
+  asyncio.run(run(args.sizes, args.page_size, args.runs))
@@ -0,0 +1,98 @@
+"""
+Benchmark CPU time per /api/query change-set response: the response-model
+path (model construction plus FastAPI's validation and serialization), the
+FAST_RESPONSES orjson path, and orjson with gzip.
+
+The payload carries a `before_snapshot` of the seed forms repeated --forms
+times and --rows inserted option rows.
+
+Usage: python tests/bench_responses.py [--forms 40] [--rows 500]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from starlette.requests import Request
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from fastapi.routing import serialize_response
+
+from app.api_models import ChangeSetResponse
+from app.db import Database
+from app.main import create_app
+from app.responses import fast_json_response, trusted_payload
+
+from conftest import seed_copy
+
+
+async def _payload(form_copies: int, rows: int) -> dict:
+  with tempfile.TemporaryDirectory() as tmp:
+    db = Database(path=seed_copy(tmp))
+    forms = await db.fetch_all("SELECT id FROM forms")
+    structures = [await db.get_form_structure(str(form["id"])) for form in forms]
+  snapshot = {
+    f"{structure['form']['id']}-{copy}": structure
+    for copy in range(form_copies)
+    for structure in structures
+  }
+  change_set = {
+    "option_items": {
+      "insert": [
+        {"id": f"$opt_{i:08x}", "option_set_id": "set-1", "value": f"value_{i}", "label": f"Value {i}",
+         "position": i, "is_active": 1}
+        for i in range(rows)
+      ],
+      "update": [],
+      "delete": [],
+    }
+  }
+  return {"type": "change_set", "plan": {"options": []}, "change_set": change_set,
+          "before_snapshot": snapshot, "planner": "llm", "session_id": "s"}
+
+
+def _cpu(label: str, runs: int, fn) -> None:
+  start = time.process_time()
+  size = 0
+  for _ in range(runs):
+    size = fn()
+  elapsed = (time.process_time() - start) / runs * 1000
+  print(f"{label:<30} {elapsed:8.2f} ms CPU/response  ({size / 1024:.0f} KiB)")
+
+
+def run(form_copies: int, rows: int, runs: int) -> None:
+  values = asyncio.run(_payload(form_copies, rows))
+  route = next(route for route in create_app().routes if getattr(route, "path", "") == "/api/query")
+  loop = asyncio.new_event_loop()
+  request = Request({"type": "http", "headers": [(b"accept-encoding", b"gzip")]})
+
+  def response_model() -> int:
+    model = ChangeSetResponse(**values)
+    return len(loop.run_until_complete(
+      serialize_response(field=route.response_field, response_content=model, dump_json=True)
+    ))
+
+  def fast(gzip_min_bytes: int) -> int:
+    payload = trusted_payload(ChangeSetResponse, values)
+    return len(fast_json_response(payload, request, {}, gzip_min_bytes).body)
+
+  _cpu("response model (default)", runs, response_model)
+  _cpu("FAST_RESPONSES", runs, lambda: fast(0))
+  _cpu("FAST_RESPONSES + gzip", runs, lambda: fast(1024))
+  loop.close()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--forms", type=int, default=40)
+  parser.add_argument("--rows", type=int, default=500)
+  parser.add_argument("--runs", type=int, default=50)
+  args = parser.parse_args()
+  run(args.forms, args.rows, args.runs)
@@ -0,0 +1,130 @@
+"""
+Benchmark the FTS5 search index against the legacy LIKE scans on a synthetic
+catalog, plus the n-gram suggestion index used for clarification candidates.
+
+Usage: python tests/bench_search_index.py [--forms 50000] [--fields 2000000]
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app.fuzzy_index import CatalogSuggester
+from app.migrations import is_internal_table
+
+WORDS = [
+    "travel", "request", "expense", "laptop", "vendor", "onboarding", "incident", "access",
+    "software", "hardware", "leave", "benefits", "payroll", "audit", "safety", "training",
+    "feedback", "survey", "contract", "renewal", "badge", "parking", "relocation", "visa",
+]
+FIELD_WORDS = [
+    "name", "email", "phone", "date", "amount", "reason", "manager", "department", "cost",
+    "center", "destination", "start", "end", "notes", "priority", "category", "status",
+]
+
+
+def _build_catalog(path: Path, form_count: int, field_count: int) -> None:
+    seed = sqlite3.connect(get_settings().sqlite_path)
+    schema = [
+        sql for name, sql in seed.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND sql IS NOT NULL"
+        )
+        if not is_internal_table(name)
+    ]
+    field_types = seed.execute("SELECT * FROM field_types").fetchall()
+    seed.close()
+
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    for sql in schema:
+        conn.execute(sql)
+    conn.executemany("INSERT INTO field_types VALUES (?, ?, ?, ?, ?)", field_types)
+    conn.executemany(
+        "INSERT INTO forms (id, slug, title, status) VALUES (?, ?, ?, 'published')",
+        (
+            (f"form-{i}", f"form-{i}", " ".join(rng.sample(WORDS, 3)).title() + f" {i}")
+            for i in range(form_count)
+        ),
+    )
+    per_form = max(1, field_count // max(1, form_count))
+    conn.executemany(
+        "INSERT INTO form_fields (id, form_id, type_id, code, label, position) "
+        "VALUES (?, ?, 1, ?, ?, ?)",
+        (
+            (
+                f"fld-{i}",
+                f"form-{i // per_form}",
+                f"{rng.choice(FIELD_WORDS)}_{rng.choice(FIELD_WORDS)}_{i % per_form}",
+                f"{rng.choice(FIELD_WORDS).title()} {rng.choice(FIELD_WORDS)}",
+                i % per_form,
+            )
+            for i in range(field_count)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _time(label: str, runs: int, fn) -> None:
+    start = time.perf_counter()
+    hits = 0
+    for _ in range(runs):
+        hits += len(await fn())
+    elapsed = (time.perf_counter() - start) / runs * 1000
+    print(f"{label:<28} {elapsed:9.2f} ms/query  ({hits // runs} hits)")
+
+
+async def run(form_count: int, field_count: int, runs: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "catalog.sqlite"
+        start = time.perf_counter()
+        _build_catalog(path, form_count, field_count)
+        print(f"Built catalog: {form_count} forms, {field_count} fields in {time.perf_counter() - start:.1f}s")
+
+        db = Database(path=path)
+        start = time.perf_counter()
+        await db.ensure_migrated()
+        print(f"Built FTS index in {time.perf_counter() - start:.1f}s\n")
+
+        form_name = "Laptop Vendor"
+        field_text = "cost center"
+        form_id = f"form-{form_count // 2}"
+
+        await _time("forms LIKE", runs, lambda: db.fetch_all(
+            "SELECT * FROM forms WHERE title LIKE ? OR slug LIKE ?",
+            [f"%{form_name}%", f"%{form_name}%"],
+        ))
+        await _time("forms FTS5 bm25", runs, lambda: db.search_forms(form_name))
+        await _time("fields LIKE (one form)", runs, lambda: db.fetch_all(
+            "SELECT * FROM form_fields WHERE form_id = ? AND (label LIKE ? OR code LIKE ?)",
+            [form_id, f"%{field_text}%", f"%{field_text}%"],
+        ))
+        await _time("fields FTS5 ranked (one form)", runs, lambda: db.search_fields(form_id, field_text))
+
+        suggester = CatalogSuggester(db)
+        start = time.perf_counter()
+        await suggester.wait_ready()
+        print(f"\nBuilt n-gram suggestion index in {time.perf_counter() - start:.1f}s")
+        await _time("suggest forms (typo)", runs, lambda: suggester.suggest_forms("lptop vendr", 5))
+        await _time("suggest fields (typo)", runs, lambda: suggester.suggest_fields(form_id, "cost centr", 5))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--forms", type=int, default=50_000)
+  parser.add_argument("--fields", type=int, default=2_000_000)
+  parser.add_argument("--runs", type=int, default=20)
+  args = parser.parse_args()
+  asyncio.run(run(args.forms, args.fields, args.runs))
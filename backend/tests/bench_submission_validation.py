@@ -0,0 +1,87 @@
+"""
+Microbenchmark of the batch submission validator on the seed forms:
+compiling each form's field checks, validating a batch given as rows and
+as columns, and a per-submission loop (one-row batches, roughly what a
+validator that checks submissions one at a time pays per row).
+
+Submissions mix valid option values, unknown values and blanks, so every
+check finds errors on some rows.
+
+Usage: python tests/bench_submission_validation.py [--submissions 100000] [--seed 7]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+from app.submission_validation import compile_validation_plan, load_field_types
+
+from conftest import seed_copy
+
+
+def _submissions(structure: dict, count: int, rng: random.Random) -> list[dict]:
+  choices = {}
+  for field in structure["fields"]:
+    options = [item["value"] for item in structure["options_by_field"].get(str(field["id"]), [])]
+    choices[field["code"]] = options + ["unknown", None] if options else ["", "text", "42", "2024-05-01", None]
+  return [{code: rng.choice(values) for code, values in choices.items()} for _ in range(count)]
+
+
+async def _structures() -> tuple[list[tuple[str, dict]], dict]:
+  with tempfile.TemporaryDirectory() as tmp:
+    db = Database(path=seed_copy(tmp))
+    forms = await db.fetch_all("SELECT id, slug FROM forms ORDER BY slug")
+    structures = [(form["slug"], await db.get_form_structure(str(form["id"]))) for form in forms]
+    return structures, await load_field_types(db)
+
+
+async def run(count: int, seed: int) -> None:
+  rng = random.Random(seed)
+  structures, field_types = await _structures()
+  for slug, structure in structures:
+    if not structure["fields"]:
+      continue
+    submissions = _submissions(structure, count, rng)
+    columns = {field["code"]: [row[field["code"]] for row in submissions] for field in structure["fields"]}
+
+    start = time.perf_counter()
+    plan = compile_validation_plan(structure, field_types)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    errors = len(plan.validate(submissions).errors)
+    rows_us = (time.perf_counter() - start) / count * 1e6
+
+    start = time.perf_counter()
+    plan.validate(columns)
+    columns_us = (time.perf_counter() - start) / count * 1e6
+
+    sample = submissions[: min(count, 2_000)]
+    start = time.perf_counter()
+    for row in sample:
+      plan.validate([row])
+    single_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    print(
+      f"{slug:<24} {len(plan.checks):3d} fields  compile {compile_ms:6.2f} ms  "
+      f"rows {rows_us:6.2f} us  columns {columns_us:6.2f} us  one at a time {single_us:7.2f} us  "
+      f"({errors} errors)"
+    )
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--submissions", type=int, default=100_000)
+  parser.add_argument("--seed", type=int, default=7)
+  args = parser.parse_args()
+  asyncio.run(run(args.submissions, args.seed))
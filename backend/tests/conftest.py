@@ -0,0 +1,59 @@
+"""
+Shared fixtures and helpers. Every test works on its own copy of the seed
+database, so migrations and writes never touch the tracked file.
+
+Test modules and bench scripts import the helpers with
+`from conftest import ...` (this directory is on sys.path in both cases).
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+
+
+def seed_copy(directory: str | Path) -> Path:
+    """
+    Copy the seed database into `directory` and return the copy's path.
+    """
+    path = Path(directory) / "forms.sqlite"
+    shutil.copy(get_settings().sqlite_path, path)
+    return path
+
+
+async def lookup_form_id(db: Database, slug: str) -> str:
+    row = await db.fetch_one("SELECT id FROM forms WHERE slug = ?", [slug])
+    return str(row["id"])
+
+
+async def write(db: Database, statement: str, params: list) -> None:
+    """
+    Run one write on a separate connection, as another process would.
+    """
+    async with aiosqlite.connect(db.path) as conn:
+        await conn.execute(statement, params)
+        await conn.commit()
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Database:
+    return Database(path=seed_copy(tmp_path))
+
+
+@pytest.fixture
+def api_db(db: Database, monkeypatch) -> Database:
+    """
+    `db`, also used by apps built with `create_app()`.
+    """
+    monkeypatch.setattr(get_settings(), "sqlite_path", db.path)
+    return db
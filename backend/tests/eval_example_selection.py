@@ -0,0 +1,59 @@
+"""
+Offline evaluation of few-shot example selection: which examples each
+scenario gets and how many prompt tokens that saves compared with sending
+the whole library. No LLM calls are made.
+
+Usage: python tests/eval_example_selection.py [--scenarios tests/scenarios.json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.llm_client import estimate_tokens
+from app.planner_examples import DEFAULT_LIBRARY, classify_request, render_examples
+
+
+def run(scenarios_path: Path) -> None:
+  settings = get_settings()
+  data = json.loads(scenarios_path.read_text(encoding="utf-8"))
+  all_tokens = estimate_tokens(render_examples(list(DEFAULT_LIBRARY)))
+
+  total_all = 0
+  total_selected = 0
+  for scenario in data:
+    query = scenario["query"]
+    scores = classify_request(query)
+    selected = DEFAULT_LIBRARY.select(
+      query,
+      k=settings.planner_example_limit,
+      token_budget=settings.planner_example_token_budget,
+    )
+    selected_tokens = estimate_tokens(render_examples(selected))
+    total_all += all_tokens
+    total_selected += selected_tokens
+    kinds = ", ".join(f"{kind}={score:g}" for kind, score in scores.items() if score)
+    print(f"=== {scenario['name']} ===")
+    print(f"  kinds:    {kinds or '(none)'}")
+    print(f"  examples: {', '.join(example.name for example in selected) or '(none)'}")
+    print(f"  tokens:   {selected_tokens} vs {all_tokens} for the full library")
+
+  saved = total_all - total_selected
+  print(
+    f"\nExample tokens over {len(data)} scenarios: {total_selected} vs {total_all} "
+    f"(saved {saved}, {100 * saved / max(total_all, 1):.0f}%)"
+  )
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--scenarios", type=Path, default=here.parent / "scenarios.json")
+  args = parser.parse_args()
+  run(args.scenarios)
@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.agent import FormAgent, _get_forms_and_fields_summary
+from app.catalog_retrieval import retrieval_text, select_catalog
+from app.db import Database
+
+
+@pytest.mark.asyncio
+async def test_select_catalog_keeps_forms_named_by_fields(db: Database) -> None:
+    catalog = await select_catalog(db, "require university_name when employment_status is Student", limit=2)
+    assert catalog.truncated
+    assert catalog.forms[0]["slug"] == "employment-demo"
+
+    text = retrieval_text(
+        "add a paris option",
+        [{"question": "Which form has the destinations field?", "answer": "the travel one"}],
+    )
+    catalog = await select_catalog(db, text, limit=1)
+    assert [form["slug"] for form in catalog.forms] == ["travel-complex"]
+
+
+@pytest.mark.asyncio
+async def test_small_catalog_is_shown_whole(db: Database) -> None:
+    catalog = await select_catalog(db, "anything at all", limit=50)
+    assert not catalog.truncated
+    summary = await _get_forms_and_fields_summary(db, catalog)
+    assert summary.count("\n  Form: ") == catalog.total_forms
+    assert "most relevant" not in summary
+
+    catalog = await select_catalog(db, "laptop", limit=1)
+    summary = await _get_forms_and_fields_summary(db, catalog)
+    assert summary.count("\n  Form: ") == 1
+    assert "Laptop Request" in summary
+    assert f"1 of {catalog.total_forms} forms" in summary
+
+
+class _RecordingLlm:
+    def __init__(self, responses: list[dict]) -> None:
+        self.responses = responses
+        self.system_prompts: list[str] = []
+
+        self.prefixes: list[str | None] = []
+
+    def generate_json(self, system_prompt: str, user_prompt: str, extra_messages=None, system_prefix=None) -> dict:
+        self.system_prompts.append(system_prompt)
+        self.prefixes.append(system_prefix)
+        return self.responses.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_hierarchical_planning_details_only_picked_forms(db: Database, monkeypatch) -> None:
+    empty_plan = {"fields": [], "options": [], "logic_blocks": [], "needs_clarification": False}
+    llm = _RecordingLlm([{"form_slugs": ["travel-complex", "not-a-form"]}, empty_plan])
+    agent = FormAgent(db=db, llm=llm)
+    monkeypatch.setattr(agent.settings, "hierarchical_planning_threshold", 2)
+
+    await agent.plan_from_query("add a paris option to the destinations field of the travel request")
+
+    picker_prompt, planner_prompt = llm.system_prompts
+    assert "slug=travel-complex" in picker_prompt
+    assert "code=destinations" not in picker_prompt
+    assert "code=destinations" in planner_prompt
+    assert "slug=laptop-request" not in planner_prompt
+
+
+@pytest.mark.asyncio
+async def test_planner_prompt_prefix_is_stable_across_requests(db: Database) -> None:
+    empty_plan = {"fields": [], "options": [], "logic_blocks": [], "needs_clarification": False}
+    llm = _RecordingLlm([dict(empty_plan), dict(empty_plan)])
+    agent = FormAgent(db=db, llm=llm)
+
+    await agent.plan_from_query("add a zanzibar option to the destinations field of the travel request")
+    await agent.plan_from_query(
+        "make the laptop kind field required",
+        history=[{"question": "Which form?", "answer": "the laptop request"}],
+    )
+
+    first, second = llm.prefixes
+    assert first and first == second
+    assert "zanzibar" not in first.lower()
+    assert "code=destinations" not in first
+    assert "ZERO HALLUCINATIONS POLICY" in first
+    # Examples are picked per request, so they follow the cached prefix.
+    assert "Examples:" not in first
+    assert '"rename_map": {"Tokyo": "Milan"}' in llm.system_prompts[0]
@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.change_set_cache import ChangeSetCache
+from app.db import Database
+from app.intent_schema import IntentPlan
+from app.request_context import get_request_metrics, start_request_metrics
+from app.resolver import build_change_set
+
+
+def _plan(notes: str | None = None) -> IntentPlan:
+    return IntentPlan.model_validate(
+        {
+            "options": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Travel Request"},
+                    "field_code": "destinations",
+                    "add_values": ["Paris"],
+                }
+            ],
+            "notes": notes,
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeat_resolution_is_served_from_cache(db: Database) -> None:
+    cache = ChangeSetCache(8)
+    start_request_metrics()
+
+    first = await cache.resolve(_plan(), db)
+    assert first == await build_change_set(_plan(), db)
+    first["option_items"]["insert"].clear()
+
+    # Notes do not take part in resolution, so they share the entry.
+    second = await cache.resolve(_plan(notes="again"), db)
+    assert second["option_items"]["insert"][0]["label"] == "Paris"
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+    assert get_request_metrics()["change_set_cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_commit_invalidates_entries(db: Database) -> None:
+    cache = ChangeSetCache(8)
+    await cache.resolve(_plan(), db)
+
+    async with aiosqlite.connect(db.path) as conn:
+        await conn.execute("UPDATE forms SET title = title || ' (old)' WHERE slug = 'employment-demo'")
+        await conn.commit()
+
+    await cache.resolve(_plan(), db)
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_are_bounded(db: Database) -> None:
+    cache = ChangeSetCache(1)
+    await cache.resolve(_plan(), db)
+    await cache.resolve(_plan(), db, namespace="other")
+    assert len(cache) == 1
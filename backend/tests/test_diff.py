@@ -0,0 +1,113 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.agent import FormAgent
+from app.api_models import EntityDiff
+from app.db import Database
+from app.diff import compute_diff
+from app.intent_schema import IntentPlan
+from app.resolver import build_change_set
+
+
+class _NoLlm:
+    def generate_json(self, *args, **kwargs):
+        raise AssertionError("fast-path requests must not call the LLM")
+
+
+@pytest.mark.asyncio
+async def test_option_edits_are_diffed_against_the_snapshot(db: Database) -> None:
+    agent = FormAgent(db=db, llm=_NoLlm())
+    result = await agent.plan_and_resolve(
+        "update the dropdown options for the destination field in the travel request form: "
+        "1. add a paris option, 2. change tokyo to milan"
+    )
+    (form_id,) = result["before_snapshot"]
+    field_id = next(
+        str(field["id"]) for field in result["before_snapshot"][form_id]["fields"] if field["code"] == "destinations"
+    )
+    added, renamed = [EntityDiff.model_validate(entry) for entry in result["diff"]]
+
+    assert (added.entity, added.status, added.label) == ("option", "added", "Paris")
+    assert (added.form_id, added.parent_id) == (form_id, field_id)
+    assert added.changes["value"].after == "Paris"
+
+    assert (renamed.status, renamed.label, renamed.parent_id) == ("modified", "Milan", field_id)
+    assert {column: (change.before, change.after) for column, change in renamed.changes.items()} == {
+        "value": ("Tokyo", "Milan"),
+        "label": ("Tokyo", "Milan"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_placeholders_link_new_rows_to_new_parents(db: Database) -> None:
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "category",
+                    "field_label": "Category",
+                    "field_type": "dropdown",
+                },
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "notes",
+                    "field_label": "Notes",
+                    "field_type": "long_text",
+                },
+            ],
+            "options": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "category",
+                    "add_values": ["Fruit"],
+                }
+            ],
+            "logic_blocks": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "description": "Show notes",
+                    "payload": {
+                        "conditions": [
+                            {
+                                "lhs_ref": '{"type":"field","field_code":"category","property":"value"}',
+                                "operator": "=",
+                                "rhs": '"Fruit"',
+                            }
+                        ],
+                        "actions": [{"action": "show", "target_ref": '{"type":"field","field_code":"notes"}'}],
+                    },
+                }
+            ],
+        }
+    )
+    change_set = await build_change_set(plan, db)
+    diff = compute_diff(change_set, None)
+
+    form_id = change_set["forms"]["insert"][0]["id"]
+    category_id = next(row["id"] for row in change_set["form_fields"]["insert"] if row["code"] == "category")
+    rule_id = change_set["logic_rules"]["insert"][0]["id"]
+    summary = [(entry["entity"], entry["label"], entry["parent_id"]) for entry in diff if entry["entity"] != "page"]
+    assert summary[0] == ("form", "Snack Request", None)
+    assert [label for entity, label, _ in summary if entity == "field"] == ["Category", "Notes"]
+    assert ("option", "Fruit", category_id) in summary
+    assert ("condition", "Category", rule_id) in summary
+    assert ("action", "Notes", rule_id) in summary
+    assert all(entry["status"] == "added" and entry["form_id"] == form_id for entry in diff)
+
+
+def test_no_op_updates_are_dropped() -> None:
+    snapshot = {"f1": {"form": {"id": "f1", "title": "T"}, "fields": [{"id": "x", "form_id": "f1", "label": "A", "required": 1}]}}
+    change_set = {"form_fields": {"update": [{"id": "x", "required": True}], "delete": [{"id": "x"}]}}
+    assert [(entry["status"], entry["label"]) for entry in compute_diff(change_set, snapshot)] == [("removed", "A")]
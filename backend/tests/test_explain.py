@@ -0,0 +1,170 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.agent import FormAgent
+from app.db import Database
+from app import explain as explain_module
+from app.explain import ExplanationCache, explanation_digest, render_explanation
+from app.intent_schema import IntentPlan
+from app.placeholders import PlaceholderAllocator
+from app.resolver import build_change_set
+
+
+class _NoLlm:
+    def generate_text(self, *args, **kwargs):
+        raise AssertionError("template explanations must not call the LLM")
+
+
+class _SlowLlm:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate_text(self, system_prompt: str, user_prompt: str, extra_messages=None) -> str:
+        self.calls += 1
+        time.sleep(0.2)
+        return "Paris becomes a destination."
+
+    async def stream_text(self, system_prompt: str, user_prompt: str, extra_messages=None):
+        self.calls += 1
+        yield "streamed"
+
+
+@pytest.mark.asyncio
+async def test_option_and_field_edits_are_named_by_label(db: Database) -> None:
+    agent = FormAgent(db=db, llm=_NoLlm())
+    result = await agent.plan_and_resolve(
+        "update the dropdown options for the destination field in the travel request form: "
+        "1. add a paris option, 2. change tokyo to milan"
+    )
+    explanation = agent.explain_change_set("", result["plan"], result["change_set"], result["before_snapshot"])
+    assert explanation.splitlines() == [
+        '- Add option "Paris" to **Destinations** on Travel Request (Complex).',
+        '- Rename option "Tokyo" to "Milan" in **Destinations** on Travel Request (Complex).',
+    ]
+
+    result = await agent.plan_and_resolve("make the company name field on the travel request form required")
+    explanation = agent.explain_change_set("", result["plan"], result["change_set"], result["before_snapshot"])
+    assert explanation == "- Update field **Company name** on Travel Request (Complex): make it required."
+
+
+@pytest.mark.asyncio
+async def test_new_form_with_placeholders_and_logic(db: Database) -> None:
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "category",
+                    "field_label": "Category",
+                    "field_type": "dropdown",
+                    "properties": {"required": True},
+                },
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "notes",
+                    "field_label": "Notes",
+                    "field_type": "long_text",
+                    "properties": {"visible_by_default": False},
+                },
+            ],
+            "options": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "category",
+                    "add_values": ["Fruit", "Other"],
+                }
+            ],
+            "logic_blocks": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "description": "Show notes for other snacks",
+                    "payload": {
+                        "conditions": [
+                            {
+                                "lhs_ref": '{"type":"field","field_code":"category","property":"value"}',
+                                "operator": "=",
+                                "rhs": '"Other"',
+                            }
+                        ],
+                        "actions": [{"action": "show", "target_ref": '{"type":"field","field_code":"notes"}'}],
+                    },
+                }
+            ],
+        }
+    )
+    change_set = await build_change_set(plan, db)
+
+    assert render_explanation(change_set).splitlines() == [
+        "- Create a new form **Snack Request** (draft).",
+        "- Add a dropdown field **Category** to Snack Request (required).",
+        "- Add a long text field **Notes** to Snack Request (hidden by default).",
+        '- Add options "Fruit" and "Other" to **Category** on Snack Request.',
+        '- Add logic rule "Show notes for other snacks" to Snack Request when **Category** is "Other", show **Notes**.',
+    ]
+
+
+def test_empty_change_set() -> None:
+    assert render_explanation({}) == "No changes are planned."
+
+
+@pytest.mark.asyncio
+async def test_digest_ignores_placeholder_suffixes(db: Database) -> None:
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "insert",
+                    "target_form": {"form_name": "Snack Request"},
+                    "field_code": "category",
+                    "field_type": "short_text",
+                }
+            ]
+        }
+    )
+    first = await build_change_set(plan, db, PlaceholderAllocator(plan, namespace="a"))
+    second = await build_change_set(plan, db, PlaceholderAllocator(plan, namespace="b"))
+    assert first != second
+    assert explanation_digest(first) == explanation_digest(second)
+    second["form_fields"]["insert"][0]["label"] = "Kind"
+    assert explanation_digest(first) != explanation_digest(second)
+
+
+@pytest.mark.asyncio
+async def test_narrative_is_cached_and_does_not_block_the_loop(db: Database, monkeypatch) -> None:
+    monkeypatch.setattr(explain_module, "_cache", ExplanationCache(16))
+    llm = _SlowLlm()
+    agent = FormAgent(db=db, llm=llm)
+    change_set = {"option_items": {"insert": [{"id": "$opt_0123abcd", "option_set_id": "s1", "label": "Paris"}]}}
+
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    text = await agent.explain("add paris", None, change_set, narrative=True)
+    ticking.cancel()
+    assert text == "Paris becomes a destination."
+    assert ticks > 5
+
+    # Same change-set with a different placeholder suffix: served from cache by both endpoints.
+    change_set["option_items"]["insert"][0]["id"] = "$opt_9999ffff"
+    assert await agent.explain("add paris", None, change_set, narrative=True) == text
+    assert [chunk async for chunk in agent.stream_explanation("add paris", None, change_set, narrative=True)] == [text]
+    assert llm.calls == 1
@@ -0,0 +1,112 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+from app.field_references import dangling_references, references_to_fields
+from app.intent_schema import IntentPlan
+from app.resolver import _cascade_field_changes, build_change_set
+
+from conftest import write
+
+
+async def _field(db: Database, slug: str, code: str) -> dict:
+    return await db.fetch_one(
+        "SELECT f.id, f.form_id FROM form_fields f JOIN forms fo ON fo.id = f.form_id WHERE fo.slug = ? AND f.code = ?",
+        [slug, code],
+    )
+
+
+def _field_plan(operation: str, form_id: str, field_code: str, **properties) -> IntentPlan:
+    return IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": operation,
+                    "target_form": {"form_id": form_id},
+                    "field_code": field_code,
+                    "properties": properties,
+                }
+            ]
+        }
+    )
+
+
+def _ids(change_set: dict, table: str, op: str) -> set[str]:
+    return {row["id"] for row in change_set.get(table, {}).get(op, [])}
+
+
+@pytest.mark.asyncio
+async def test_deleting_an_action_target_drops_only_its_actions(db: Database) -> None:
+    company = await _field(db, "travel-complex", "company_name")
+    references = await references_to_fields(db, [company["id"]])
+    assert {row["ref_table"] for row in references} == {"logic_actions"} and len(references) == 2
+
+    change_set = await build_change_set(_field_plan("delete", company["form_id"], "company_name"), db)
+    assert _ids(change_set, "logic_actions", "delete") == {row["ref_id"] for row in references}
+    assert "logic_rules" not in change_set
+    assert await dangling_references(db, change_set, [company["form_id"]]) == []
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_condition_field_drops_its_rules(db: Database) -> None:
+    reason = await _field(db, "travel-complex", "travel_reason")
+    rules = await db.fetch_all("SELECT id FROM logic_rules WHERE form_id = ?", [reason["form_id"]])
+
+    change_set = await build_change_set(_field_plan("delete", reason["form_id"], "travel_reason"), db)
+    rule_ids = {row["id"] for row in rules}
+    assert _ids(change_set, "logic_rules", "delete") == rule_ids
+    conditions = await db.fetch_all(
+        f"SELECT id FROM logic_conditions WHERE rule_id IN ({','.join('?' for _ in rule_ids)})", list(rule_ids)
+    )
+    assert _ids(change_set, "logic_conditions", "delete") == {row["id"] for row in conditions}
+    assert len(change_set["logic_actions"]["delete"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_code_references_follow_renames_and_deletes_are_reported(db: Database) -> None:
+    budget = await _field(db, "travel-complex", "budget")
+    action = await db.fetch_one(
+        "SELECT a.id FROM logic_actions a JOIN field_references r ON r.ref_id = a.id WHERE r.field_id = ? LIMIT 1",
+        [budget["id"]],
+    )
+    await write(
+        db,
+        "UPDATE logic_actions SET target_ref = ? WHERE id = ?",
+        [json.dumps({"type": "field", "field_code": "budget"}), action["id"]],
+    )
+    indexed = await references_to_fields(db, [budget["id"]])
+    assert [row["ref_id"] for row in indexed if row["by_code"]] == [action["id"]]
+
+    change_set = await build_change_set(_field_plan("update", budget["form_id"], "budget", code="trip_budget"), db)
+    (rewritten,) = change_set["logic_actions"]["update"]
+    assert rewritten["id"] == action["id"]
+    assert json.loads(rewritten["target_ref"]) == {"type": "field", "field_id": budget["id"]}
+
+    await write(db, "DELETE FROM form_fields WHERE id = ?", [budget["id"]])
+    warnings = await dangling_references(db, {}, [budget["form_id"]])
+    assert len(warnings) == 2 and all(warning.endswith("that does not exist.") for warning in warnings)
+    assert any("referencing field 'budget'" in warning for warning in warnings)
+
+
+@pytest.mark.asyncio
+async def test_cascade_skips_rows_the_plan_already_deletes(db: Database) -> None:
+    reason = await _field(db, "travel-complex", "travel_reason")
+    action = await db.fetch_one(
+        "SELECT a.id FROM logic_actions a JOIN logic_rules r ON r.id = a.rule_id WHERE r.form_id = ? LIMIT 1",
+        [reason["form_id"]],
+    )
+    change_set = {
+        "form_fields": {"insert": [], "update": [], "delete": [{"id": reason["id"]}]},
+        "logic_actions": {"insert": [], "update": [], "delete": [{"id": action["id"]}]},
+    }
+    await _cascade_field_changes(db, change_set)
+    deleted = [row["id"] for row in change_set["logic_actions"]["delete"]]
+    assert len(deleted) == len(set(deleted)) == 4 and action["id"] in deleted
@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.catalog_retrieval import CatalogCache
+from app.db import Database
+from app.form_cache import FormStructureCache
+
+from conftest import lookup_form_id, write
+
+
+class _CountingDatabase(Database):
+    def __init__(self, path: Path) -> None:
+        super().__init__(path=path)
+        self.built: list[str] = []
+
+    async def get_form_structure(self, form_id: str):
+        self.built.append(form_id)
+        return await super().get_form_structure(form_id)
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_only_the_owning_form(db: Database) -> None:
+    counting = _CountingDatabase(db.path)
+    cache = FormStructureCache(counting, 16)
+    travel = await lookup_form_id(db, "travel-complex")
+    laptop = await lookup_form_id(db, "laptop-request")
+
+    first = await cache.get_many([travel, laptop])
+    first[travel]["fields"].clear()
+    again = await cache.get_many([travel, laptop])
+    assert again[travel]["fields"]
+    assert counting.built == [travel, laptop]
+
+    # An option rename reaches the form through its field binding.
+    field = await db.fetch_one(
+        "SELECT id FROM form_fields WHERE form_id = ? AND code = 'destinations'", [travel]
+    )
+    option_set = await db.get_option_set_for_field(str(field["id"]))
+    await write(
+        db,
+        "UPDATE option_items SET label = 'Lisbon' WHERE option_set_id = ? AND position = "
+        "(SELECT MIN(position) FROM option_items WHERE option_set_id = ?)",
+        [option_set["id"], option_set["id"]],
+    )
+    structure = await cache.get(travel)
+    await cache.get(laptop)
+    assert counting.built == [travel, laptop, travel]
+    assert "Lisbon" in [item["label"] for item in structure["options_by_field"][str(field["id"])]]
+
+
+@pytest.mark.asyncio
+async def test_deleted_forms_drop_out(db: Database) -> None:
+    cache = FormStructureCache(db, 16)
+    laptop = await lookup_form_id(db, "laptop-request")
+    assert await cache.get(laptop) is not None
+    await write(db, "DELETE FROM forms WHERE id = ?", [laptop])
+    assert await cache.get(laptop) is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_inventory_fields_follow_field_edits(db: Database) -> None:
+    catalog = CatalogCache(db)
+    travel = await lookup_form_id(db, "travel-complex")
+    before = (await catalog.fields([travel]))[travel]
+    assert {"code": "company_name", "label": "Company name", "field_type": "short_text"} in before
+
+    await write(db, "UPDATE form_fields SET label = 'Employer' WHERE form_id = ? AND code = 'company_name'", [travel])
+    after = (await catalog.fields([travel]))[travel]
+    assert [row["label"] for row in after if row["code"] == "company_name"] == ["Employer"]
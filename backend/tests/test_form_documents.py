@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app.form_documents import check_documents, rebuild_documents
+
+from conftest import lookup_form_id, write
+
+
+@pytest.fixture
+def db(db: Database, monkeypatch) -> Database:
+    monkeypatch.setattr(get_settings(), "form_documents_enabled", True)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_current_documents_are_one_lookup(db: Database, monkeypatch) -> None:
+    travel = await lookup_form_id(db, "travel-complex")
+    assert await db.get_form_structure(travel) == await db.build_form_structure(travel)
+
+    queries: list[str] = []
+    fetch_one, fetch_all = Database.fetch_one, Database.fetch_all
+
+    async def counting_fetch_one(self, query, params=None):
+        queries.append(query)
+        return await fetch_one(self, query, params)
+
+    async def counting_fetch_all(self, query, params=None):
+        queries.append(query)
+        return await fetch_all(self, query, params)
+
+    monkeypatch.setattr(Database, "fetch_one", counting_fetch_one)
+    monkeypatch.setattr(Database, "fetch_all", counting_fetch_all)
+    await db.get_form_structure(travel)
+    assert len(queries) == 1 and "form_documents" in queries[0]
+
+
+@pytest.mark.asyncio
+async def test_child_writes_rebuild_the_document(db: Database) -> None:
+    travel = await lookup_form_id(db, "travel-complex")
+    await db.get_form_structure(travel)
+    await write(db, "UPDATE option_items SET label = 'Kyoto' WHERE label = 'Tokyo'", [])
+
+    labels = [item["label"] for items in (await db.get_form_structure(travel))["options_by_field"].values() for item in items]
+    assert "Kyoto" in labels and "Tokyo" not in labels
+    assert (await check_documents(db)).stale == []
+
+
+@pytest.mark.asyncio
+async def test_checker_flags_drift_and_rebuild_repairs_it(db: Database) -> None:
+    await rebuild_documents(db)
+    laptop = await lookup_form_id(db, "laptop-request")
+    await write(db, "UPDATE form_documents SET document = replace(document, 'Laptop', 'Tablet') WHERE form_id = ?", [laptop])
+    await write(db, "INSERT INTO form_documents(form_id, version, document) VALUES ('ghost', 0, '{}')", [])
+
+    report = await check_documents(db)
+    assert (report.mismatched, report.orphaned, report.consistent) == ([laptop], ["ghost"], False)
+
+    assert await rebuild_documents(db) == 6
+    assert (await check_documents(db)).consistent
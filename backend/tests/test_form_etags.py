@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import aiosqlite
+import pytest
+from fastapi.testclient import TestClient
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app.main import create_app
+
+
+@pytest.fixture
+def queries(api_db: Database, monkeypatch) -> list[str]:
+    executed: list[str] = []
+    fetch_one, fetch_all = Database.fetch_one, Database.fetch_all
+
+    async def counting_fetch_one(self, query, params=None):
+        executed.append(query)
+        return await fetch_one(self, query, params)
+
+    async def counting_fetch_all(self, query, params=None):
+        executed.append(query)
+        return await fetch_all(self, query, params)
+
+    monkeypatch.setattr(Database, "fetch_one", counting_fetch_one)
+    monkeypatch.setattr(Database, "fetch_all", counting_fetch_all)
+    return executed
+
+
+def test_if_none_match_skips_the_structure(queries: list[str]) -> None:
+    client = TestClient(create_app())
+    forms = client.get("/api/forms")
+    form_id = next(form["id"] for form in forms.json() if form["slug"] == "travel-complex")
+
+    first = client.get(f"/api/forms/{form_id}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    queries.clear()
+    cached = client.get(f"/api/forms/{form_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+    assert len(queries) == 1 and "form_versions" in queries[0]
+
+    listing = client.get("/api/forms", headers={"If-None-Match": forms.headers["ETag"]})
+    assert listing.status_code == 304
+
+
+def test_writes_change_the_etags(queries: list[str]) -> None:
+    client = TestClient(create_app())
+    forms = client.get("/api/forms")
+    form_id = next(form["id"] for form in forms.json() if form["slug"] == "travel-complex")
+    etag = client.get(f"/api/forms/{form_id}").headers["ETag"]
+
+    async def rename() -> None:
+        async with aiosqlite.connect(get_settings().sqlite_path) as conn:
+            await conn.execute("UPDATE form_fields SET label = 'Employer' WHERE form_id = ? AND code = 'company_name'", [form_id])
+            await conn.commit()
+
+    asyncio.run(rename())
+
+    changed = client.get(f"/api/forms/{form_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "Employer" in [field["label"] for field in changed.json()["fields"]]
+    assert client.get("/api/forms", headers={"If-None-Match": forms.headers["ETag"]}).status_code == 200
+    assert client.get("/api/forms/missing", headers={"If-None-Match": "*"}).status_code == 404
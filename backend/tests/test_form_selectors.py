@@ -0,0 +1,170 @@
+import sys
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app.intent_schema import IntentPlan
+from app.resolver import build_change_set
+
+
+async def _form_ids(db: Database, *slugs: str) -> dict[str, str]:
+    rows = await db.fetch_all(f"SELECT id, slug FROM forms WHERE slug IN ({','.join('?' for _ in slugs)})", slugs)
+    return {str(row["id"]): row["slug"] for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_field_and_option_intents_fan_out_over_the_selected_forms(db: Database) -> None:
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "insert",
+                    "target_form": {"selector": {"status": "published", "slug_pattern": "*-request"}},
+                    "field_code": "consent",
+                    "field_label": "I consent to data processing",
+                    "field_type": "checkbox",
+                    "properties": {"required": True},
+                },
+                {
+                    "operation": "insert",
+                    "target_form": {"selector": {"status": "Published"}},
+                    "field_code": "email",
+                    "field_type": "email",
+                },
+            ],
+            "options": [
+                {
+                    "operation": "insert",
+                    "target_form": {"selector": {"slug_pattern": "*-request"}},
+                    "field_code": "consent",
+                    "add_values": ["I agree"],
+                }
+            ],
+        }
+    )
+    change_set = await build_change_set(plan, db)
+
+    fields = change_set["form_fields"]["insert"]
+    requests = await _form_ids(db, "laptop-request", "software-request")
+    consent = [row for row in fields if row["code"] == "consent"]
+    assert {row["form_id"] for row in consent} == set(requests)
+    assert {requests[row["form_id"]]: row["position"] for row in consent} == {"laptop-request": 8, "software-request": 6}
+    assert all(row["required"] == 1 for row in consent)
+
+    # contact-simple and job-application-multi already have an email field.
+    emails = {row["form_id"] for row in fields if row["code"] == "email"}
+    assert set((await _form_ids(db, "employment-demo", "travel-complex", *requests.values()))) == emails
+
+    bindings = change_set["field_option_binding"]["insert"]
+    assert {row["field_id"] for row in bindings} == {row["id"] for row in consent}
+    items = change_set["option_items"]["insert"]
+    assert sorted(row["option_set_id"] for row in items) == sorted(row["option_set_id"] for row in bindings)
+    assert {row["value"] for row in items} == {"I agree"}
+
+
+@pytest.mark.asyncio
+async def test_updates_and_deletes_match_fields_by_code(db: Database) -> None:
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "update",
+                    "target_form": {"selector": {"category": "applications"}},
+                    "field_code": "email",
+                    "properties": {"required": True},
+                },
+                {"operation": "delete", "target_form": {"selector": {"category": "Basic"}}, "field_code": "email"},
+            ]
+        }
+    )
+    change_set = await build_change_set(plan, db)
+    email_ids = await db.fetch_all("SELECT id, form_id FROM form_fields WHERE code = 'email' ORDER BY form_id")
+    forms = await _form_ids(db, "contact-simple", "job-application-multi")
+    by_slug = {forms[str(row["form_id"])]: row["id"] for row in email_ids}
+    assert change_set["form_fields"]["update"] == [{"id": by_slug["job-application-multi"], "required": 1}]
+    assert change_set["form_fields"]["delete"] == [{"id": by_slug["contact-simple"]}]
+
+    for target_form, message in [
+        ({"selector": {}}, "needs at least one"),
+        ({"selector": {"category": "travel"}}, "has a field with code 'email'"),
+        ({"selector": {"org_id": "nobody"}}, "No forms match"),
+    ]:
+        operation = "insert" if "org_id" in target_form["selector"] else "delete"
+        bad = IntentPlan.model_validate(
+            {"fields": [{"operation": operation, "target_form": target_form, "field_code": "email", "field_type": "email"}]}
+        )
+        with pytest.raises(ValueError, match=message):
+            await build_change_set(bad, db)
+
+
+@pytest.mark.asyncio
+async def test_large_fan_outs_resolve_in_bulk_within_the_row_limit(db: Database, monkeypatch) -> None:
+    async with aiosqlite.connect(db.path) as conn:
+        await conn.executemany(
+            "INSERT INTO forms (id, slug, title, status) VALUES (?, ?, ?, 'draft')",
+            [(f"bulk-{index}", f"hr-{index:04d}", f"HR form {index}") for index in range(3_000)],
+        )
+        await conn.executemany(
+            "INSERT INTO form_pages (id, form_id, title, position) VALUES (?, ?, 'Page 1', 1)",
+            [(f"bulk-page-{index}", f"bulk-{index}") for index in range(3_000)],
+        )
+        await conn.commit()
+    plan = IntentPlan.model_validate(
+        {
+            "fields": [
+                {
+                    "operation": "insert",
+                    "target_form": {"selector": {"status": "draft", "slug_pattern": "hr-*"}},
+                    "field_code": "consent",
+                    "field_type": "checkbox",
+                }
+            ]
+        }
+    )
+
+    monkeypatch.setattr(get_settings(), "max_changed_rows", 2_500)
+    with pytest.raises(ValueError, match="Planned 3000 row changes which exceeds limit 2500"):
+        await build_change_set(plan, db)
+
+    monkeypatch.setattr(get_settings(), "max_changed_rows", 5_000)
+    rows = (await build_change_set(plan, db))["form_fields"]["insert"]
+    assert len(rows) == 3_000 and len({row["id"] for row in rows}) == 3_000
+    assert {(row["page_id"], row["position"]) for row in rows[:2]} == {("bulk-page-0", 1), ("bulk-page-1", 1)}
+
+
+@pytest.mark.asyncio
+async def test_option_fan_outs_are_charged_every_row_they_can_produce(db: Database, monkeypatch) -> None:
+    def plan(code: str, values: list[str]) -> IntentPlan:
+        return IntentPlan.model_validate(
+            {
+                "options": [
+                    {
+                        "operation": "insert",
+                        "target_form": {"selector": {"slug_pattern": "*"}},
+                        "field_code": code,
+                        "add_values": values,
+                    }
+                ]
+            }
+        )
+
+    monkeypatch.setattr(get_settings(), "max_changed_rows", 6)
+    # Two unbound email fields: 20 items each plus an option set and a binding.
+    with pytest.raises(ValueError, match="Planned 44 row changes"):
+        await build_change_set(plan("email", [f"v{index}" for index in range(20)]), db)
+
+    # Values that already exist are still charged up front.
+    monkeypatch.setattr(get_settings(), "max_changed_rows", 2)
+    with pytest.raises(ValueError, match="Planned 3 row changes"):
+        await build_change_set(plan("laptop_kind", ["pc", "mac", "linux"]), db)
+    monkeypatch.setattr(get_settings(), "max_changed_rows", 3)
+    items = (await build_change_set(plan("laptop_kind", ["pc", "mac", "linux"]), db))["option_items"]["insert"]
+    assert [(row["value"], row["position"]) for row in items] == [("linux", 3)]
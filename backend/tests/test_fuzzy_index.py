@@ -0,0 +1,102 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app.fuzzy_index import CatalogSuggester, NgramIndex, get_catalog_suggester
+from app.resolver import ResolutionClarificationNeeded, _resolve_form_id
+
+
+def test_ngram_index_ranks_misspellings_and_updates() -> None:
+    index = NgramIndex()
+    index.bulk_load([
+        ("f1", "Travel Request travel-complex", None),
+        ("f2", "Laptop Request laptop-request", None),
+        ("f3", "Employment Details employment-demo", None),
+    ])
+    assert index.top_k("travle reqest", k=1)[0][1] == "f1"
+
+    index.upsert("f4", "Travel Reimbursement", None)
+    index.remove("f1")
+    ranked = [key for _, key in index.top_k("travel", k=3)]
+    assert ranked[0] == "f4"
+    assert "f1" not in ranked
+
+    index.compact()
+    assert len(index) == 3
+    assert index.top_k("laptop", k=1)[0][1] == "f2"
+
+
+@pytest.mark.asyncio
+async def test_catalog_suggester_refreshes_incrementally(db: Database, monkeypatch) -> None:
+    # Hold the background build until the fallback has been checked.
+    release = asyncio.Event()
+    rebuild = CatalogSuggester._rebuild
+
+    async def held_rebuild(self) -> None:
+        await release.wait()
+        await rebuild(self)
+
+    monkeypatch.setattr(CatalogSuggester, "_rebuild", held_rebuild)
+    suggester = CatalogSuggester(db)
+    # Until the index is built, suggestions come from the FTS index.
+    assert (await suggester.suggest_forms("software", 1))[0]["slug"] == "software-request"
+    assert await suggester.suggest_forms("softwre acess", 1) == []
+    assert not suggester.ready
+    release.set()
+    await suggester.wait_ready()
+    assert (await suggester.suggest_forms("softwre acess", 1))[0]["slug"] == "software-request"
+
+    conn = sqlite3.connect(db.path)
+    conn.execute(
+        "INSERT INTO forms (id, slug, title, status) VALUES ('form-new', 'vendor-intake', 'Vendor Intake', 'draft')"
+    )
+    conn.execute("DELETE FROM forms WHERE slug = 'laptop-request'")
+    conn.commit()
+    conn.close()
+
+    assert (await suggester.suggest_forms("vendr intake", 1))[0]["id"] == "form-new"
+    assert all(row["slug"] != "laptop-request" for row in await suggester.suggest_forms("laptop", 5))
+
+
+@pytest.mark.asyncio
+async def test_rebuilds_prune_the_change_log(db: Database) -> None:
+    await db.ensure_migrated()
+    conn = sqlite3.connect(db.path)
+    conn.execute("UPDATE forms SET title = title")
+    conn.commit()
+    stale = CatalogSuggester(db)
+    await stale.wait_ready()
+    await CatalogSuggester(db).wait_ready()
+    # Only the newest entry is kept, so the log's MAX(seq) never goes back.
+    row = await db.fetch_one("SELECT COUNT(*) AS entries, MAX(seq) AS seq FROM catalog_changes")
+    assert (row["entries"], row["seq"]) == (1, stale._last_seq)
+
+    # A suggester whose log position was pruned away rebuilds instead of patching.
+    stale._last_seq = 0
+    conn.execute("UPDATE forms SET title = 'Vendor Intake' WHERE slug = 'laptop-request'")
+    conn.commit()
+    conn.close()
+    await stale.refresh()
+    await stale.start()
+    assert (await stale.suggest_forms("vendr intake", 1))[0]["slug"] == "laptop-request"
+
+
+@pytest.mark.asyncio
+async def test_unknown_form_returns_top_k_candidates(db: Database) -> None:
+    await get_catalog_suggester(db).wait_ready()
+    with pytest.raises(ResolutionClarificationNeeded) as exc_info:
+        await _resolve_form_id(db, {"form_code": "travl-complx"})
+    exc = exc_info.value
+    assert exc.reason == "form_not_found"
+    assert 0 < len(exc.form_candidates) <= get_settings().suggestion_limit
+    assert exc.form_candidates[0]["slug"] == "travel-complex"
@@ -0,0 +1,63 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.exceptions import IdempotencyConflictError
+from app.idempotency import IdempotencyStore, request_fingerprint
+
+
+@pytest.mark.asyncio
+async def test_concurrent_retries_share_one_execution() -> None:
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    calls = 0
+
+    async def compute() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"type": "change_set"}
+
+    fingerprint = request_fingerprint({"query": "add paris", "history": []})
+    results = await asyncio.gather(*(store.run("k", fingerprint, compute) for _ in range(3)))
+    assert calls == 1
+    assert [replayed for _, replayed in results] == [False, True, True]
+    assert all(result == {"type": "change_set"} for result, _ in results)
+
+    # Completed results are replayed too.
+    assert await store.run("k", fingerprint, compute) == ({"type": "change_set"}, True)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_conflicting_payload_is_rejected() -> None:
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+
+    async def compute() -> str:
+        return "ok"
+
+    await store.run("k", request_fingerprint({"query": "a"}), compute)
+    with pytest.raises(IdempotencyConflictError):
+        await store.run("k", request_fingerprint({"query": "b"}), compute)
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_replayed() -> None:
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    outcomes = [RuntimeError("provider timeout"), "ok"]
+
+    async def compute() -> str:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(RuntimeError):
+        await store.run("k", "same", compute)
+    assert await store.run("k", "same", compute) == ("ok", False)
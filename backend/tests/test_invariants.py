@@ -1,4 +1,5 @@
 import sys
+import tempfile
 from pathlib import Path
 from typing import Any
 
@@ -13,9 +14,15 @@ from app.agent import FormAgent
 from app.db import Database, TableInfo
 from app.schema_cache import get_schema_state, required_columns_for_table
 
+from conftest import seed_copy
+
+
+# Opening a database migrates it, so run against a copy of the tracked seed.
+SEED_COPY = seed_copy(tempfile.mkdtemp())
+
 
 def _load_tables_sync() -> list[TableInfo]:
-    db = Database()
+    db = Database(path=SEED_COPY)
 
     async def inner() -> list[TableInfo]:
         state = await get_schema_state(db)
@@ -70,7 +77,7 @@ def _validate_required_fields(change_set: dict[str, Any]) -> None:
     ],
 )
 async def test_end_to_end_invariants_hold(query: str) -> None:
-    db = Database()
+    db = Database(path=SEED_COPY)
     agent = FormAgent(db=db)
 
     result = await agent.plan_and_resolve(query=query, history=[])
@@ -0,0 +1,108 @@
+import json
+import sys
+from pathlib import Path
+
+import aiosqlite
+import pytest
+from fastapi.testclient import TestClient
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+from app.logic_engine import compile_form_logic, get_logic_cache
+from app.main import create_app
+
+from conftest import lookup_form_id
+
+
+def _ref(code: str) -> str:
+    return json.dumps({"type": "field", "field_code": code})
+
+
+def _structure(conditions: list[dict], actions: list[dict]) -> dict:
+    codes = ["kind", "amount", "tags", "email", "notes"]
+    return {
+        "form": {"id": "f"},
+        "fields": [
+            {"id": f"id-{code}", "code": code, "visible_by_default": 0, "required": 0, "read_only": 0, "default_value": None}
+            for code in codes
+        ],
+        "logic_rules": [{"id": "r1", "priority": 10, "enabled": 1, "trigger": "on_change"}],
+        "logic_conditions": [
+            {"id": f"c{index}", "rule_id": "r1", "position": index, "group_id": None, "bool_join": "AND", **condition}
+            for index, condition in enumerate(conditions)
+        ],
+        "logic_actions": [{"id": f"a{index}", "rule_id": "r1", "position": index, **action} for index, action in enumerate(actions)],
+    }
+
+
+def test_bool_join_groups_and_operators() -> None:
+    # kind in (a, b) AND (amount > 100 OR tags contains vip) OR email matches @corp\.
+    logic = compile_form_logic(
+        _structure(
+            [
+                {"lhs_ref": _ref("kind"), "operator": "in", "rhs": '["a", "b"]'},
+                {"lhs_ref": _ref("amount"), "operator": ">", "rhs": "100", "group_id": "g"},
+                {"lhs_ref": _ref("tags"), "operator": "contains", "rhs": '"vip"', "group_id": "g", "bool_join": "OR"},
+                {"lhs_ref": _ref("email"), "operator": "matches", "rhs": '"@corp\\\\."', "bool_join": "OR"},
+            ],
+            [
+                {"action": "show", "target_ref": _ref("notes")},
+                {"action": "set_value", "target_ref": _ref("notes"), "params": '{"value": "flagged"}'},
+            ],
+        )
+    )
+    fired = [
+        state.visible["notes"]
+        for state in logic.evaluate_many(
+            [
+                {"kind": "a", "amount": "150"},
+                {"kind": "b", "amount": 20, "tags": ["vip"]},
+                {"kind": "c", "amount": 500},
+                {"kind": "a", "amount": 20, "tags": ["new"]},
+                {"email": "x@corp.com"},
+            ]
+        )
+    ]
+    assert fired == [True, True, False, False, True]
+    assert logic.evaluate({"kind": "a", "amount": 101}).values["notes"] == "flagged"
+
+
+@pytest.mark.asyncio
+async def test_seed_rules_drive_visibility_and_required(db: Database) -> None:
+    laptop = await get_logic_cache(db).get(await lookup_form_id(db, "laptop-request"))
+    visible = lambda state: {code for code, shown in state.visible.items() if shown}
+    pc, mac, pro = laptop.evaluate_many(
+        [{"laptop_kind": "pc"}, {"laptop_kind": "mac"}, {"laptop_kind": "mac", "mac_model": "macbook pro"}]
+    )
+    assert visible(pc) == {"laptop_kind", "wants_mouse"}
+    assert visible(mac) == {"laptop_kind", "wants_mouse", "mac_model"}
+    assert visible(pro) == {"laptop_kind", "wants_mouse", "mac_model", "pro_ram", "pro_disk"}
+    assert pc.values["mac_model"] is None
+
+    employment = await get_logic_cache(db).get(await lookup_form_id(db, "employment-demo"))
+    state = employment.evaluate({"employment_status": "Self-employed"})
+    assert state.visible["business_name"] and state.required["tax_id"]
+
+
+@pytest.mark.asyncio
+async def test_compiled_logic_follows_rule_edits(api_db: Database) -> None:
+    form_id = await lookup_form_id(api_db, "laptop-request")
+    cache = get_logic_cache(api_db)
+    first = await cache.get(form_id)
+    assert await cache.get(form_id) is first
+
+    async with aiosqlite.connect(api_db.path) as conn:
+        await conn.execute("UPDATE logic_conditions SET rhs = '\"apple\"' WHERE rhs = '\"mac\"'")
+        await conn.commit()
+    second = await cache.get(form_id)
+    assert second is not first
+    assert second.evaluate({"laptop_kind": "apple"}).visible["mac_model"]
+
+    client = TestClient(create_app())
+    response = client.post(f"/api/forms/{form_id}/logic", json={"submissions": [{"laptop_kind": "apple"}, {}]})
+    assert [state["visible"]["mac_model"] for state in response.json()["states"]] == [True, False]
+    assert client.post("/api/forms/missing/logic", json={"submissions": []}).status_code == 404
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.planner_examples import DEFAULT_LIBRARY, classify_request
+
+
+def test_option_request_gets_option_example_first() -> None:
+    query = "add a paris option to the destinations dropdown on the travel request form"
+    assert classify_request(query)["option"] > 0
+    selected = DEFAULT_LIBRARY.select(query, k=2, token_budget=600)
+    assert selected[0].name == "option_edit"
+
+
+def test_selection_respects_limit_and_budget() -> None:
+    query = "create a new form with a category dropdown that shows a notes field when other is selected"
+    assert len(DEFAULT_LIBRARY.select(query, k=1, token_budget=10_000)) == 1
+    selected = DEFAULT_LIBRARY.select(query, k=4, token_budget=400)
+    assert selected
+    assert sum(example.tokens for example in selected) <= 400
+
+
+def test_unclassified_request_gets_clarification_example() -> None:
+    selected = DEFAULT_LIBRARY.select("hello there", k=2, token_budget=600)
+    assert [example.name for example in selected] == ["missing_form_clarification"]
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import sys
 from pathlib import Path
 from typing import Any
@@ -19,12 +20,12 @@ from app.intent_schema import (
     OperationType,
     TargetForm,
 )
+from app.placeholders import PlaceholderAllocator
 from app.resolver import build_change_set
 
 
 @pytest.mark.asyncio
-async def test_update_travel_destination_options_matches_example() -> None:
-    db = Database()
+async def test_update_travel_destination_options_matches_example(db: Database) -> None:
     plan = IntentPlan(
         fields=[],
         options=[
@@ -58,8 +59,7 @@ async def test_update_travel_destination_options_matches_example() -> None:
 
 
 @pytest.mark.asyncio
-async def test_new_snack_form_creates_form_and_fields() -> None:
-    db = Database()
+async def test_new_snack_form_creates_form_and_fields(db: Database) -> None:
     plan = IntentPlan(
         fields=[
             FieldIntent(
@@ -118,10 +118,15 @@ async def test_new_snack_form_creates_form_and_fields() -> None:
     for expected in ["ice cream", "beverage", "fruit", "chips", "gum"]:
         assert expected in option_values
 
+    # Placeholders are derived from the plan, so re-resolving is byte-identical.
+    again = await build_change_set(plan, db)
+    assert json.dumps(again) == json.dumps(change_set)
+    other = await build_change_set(plan, db, PlaceholderAllocator(plan, namespace="batch-2"))
+    assert other["forms"]["insert"][0]["id"] != change_set["forms"]["insert"][0]["id"]
+
 
 @pytest.mark.asyncio
-async def test_employment_university_logic_structure() -> None:
-    db = Database()
+async def test_employment_university_logic_structure(db: Database) -> None:
 
     employment_form = await db.fetch_one(
         "SELECT id FROM forms WHERE slug = ?", ["employment-demo"]
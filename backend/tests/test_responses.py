@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.api_models import ChangeSetResponse, ClarificationResponse
+from app.config import get_settings
+from app.db import Database
+from app.main import create_app
+from app.responses import trusted_payload
+
+
+@pytest.fixture
+def client(api_db: Database) -> TestClient:
+    return TestClient(create_app())
+
+
+def test_trusted_payload_matches_the_model_layout() -> None:
+    values = {"type": "clarification", "question": "Which form?", "plan": {}, "reference": "dropped"}
+    assert trusted_payload(ClarificationResponse, values) == ClarificationResponse(**values).model_dump()
+    values = {"type": "change_set", "plan": {}, "change_set": {"forms": {}}, "planner": "fast_path"}
+    assert trusted_payload(ChangeSetResponse, values) == ChangeSetResponse(**values).model_dump()
+
+
+def test_fast_responses_keep_bodies_and_validators(client: TestClient, monkeypatch) -> None:
+    form_id = next(form["id"] for form in client.get("/api/forms").json() if form["slug"] == "travel-complex")
+    validated = client.get(f"/api/forms/{form_id}")
+
+    monkeypatch.setattr(get_settings(), "fast_responses", True)
+    fast = client.get(f"/api/forms/{form_id}", headers={"Accept-Encoding": "identity"})
+    assert fast.json() == validated.json()
+    assert fast.headers["ETag"] == validated.headers["ETag"]
+    assert fast.headers["content-type"] == "application/json"
+
+    monkeypatch.setattr(get_settings(), "response_gzip_min_bytes", 256)
+    compressed = client.get(f"/api/forms/{form_id}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["ETag"] == "W/" + validated.headers["ETag"]
+    assert compressed.json() == validated.json()
+
+    revalidated = client.get(f"/api/forms/{form_id}", headers={"If-None-Match": compressed.headers["ETag"]})
+    assert revalidated.status_code == 304
@@ -0,0 +1,60 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.db import Database
+
+
+@pytest.mark.asyncio
+async def test_search_forms_ranks_best_match_first(db: Database) -> None:
+    matches = await db.search_forms("travel request")
+    assert matches
+    assert matches[0]["slug"] == "travel-complex"
+
+    by_slug = await db.search_forms("laptop-request")
+    assert [row["slug"] for row in by_slug][:1] == ["laptop-request"]
+
+
+@pytest.mark.asyncio
+async def test_search_fields_is_scoped_to_form(db: Database) -> None:
+    form = await db.fetch_one("SELECT id FROM forms WHERE slug = ?", ["travel-complex"])
+    assert form is not None
+    matches = await db.search_fields(form["id"], "destination")
+    assert matches
+    assert all(row["form_id"] == form["id"] for row in matches)
+    assert matches[0]["code"] == "destinations"
+
+
+@pytest.mark.asyncio
+async def test_search_index_follows_writes(db: Database) -> None:
+    await db.ensure_migrated()
+    conn = sqlite3.connect(db.path)
+    conn.execute(
+        "INSERT INTO forms (id, slug, title, status) VALUES (?, ?, ?, 'draft')",
+        ["form-under-test", "vendor-onboarding", "Vendor Onboarding"],
+    )
+    conn.commit()
+    assert [row["id"] for row in await db.search_forms("vendor")] == ["form-under-test"]
+
+    conn.execute("UPDATE forms SET title = 'Supplier Intake' WHERE id = 'form-under-test'")
+    conn.commit()
+    assert [row["id"] for row in await db.search_forms("supplier intake")] == ["form-under-test"]
+
+    conn.execute("DELETE FROM forms WHERE id = 'form-under-test'")
+    conn.commit()
+    conn.close()
+    assert await db.search_forms("supplier") == []
+
+
+@pytest.mark.asyncio
+async def test_internal_search_tables_hidden_from_schema(db: Database) -> None:
+    tables = {table.name for table in await db.get_tables()}
+    assert "forms" in tables
+    assert not any(name.startswith("fts_") for name in tables)
@@ -0,0 +1,62 @@
+import json
+import sys
+from pathlib import Path
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.intent_schema import IntentPlan
+from app.request_context import get_request_metrics, start_request_metrics
+from app.serialization import prompt_json, prompt_tables
+
+
+CHANGE_SET = {
+    "forms": {"insert": [], "update": [], "delete": []},
+    "option_items": {
+        "insert": [
+            {"id": "$opt_1", "option_set_id": "s1", "value": "Paris", "label": "Paris", "position": 6, "is_active": 1},
+            {"id": "$opt_2", "option_set_id": "s1", "value": "Rome", "label": "Rome", "position": 7, "is_active": 1},
+        ],
+        "update": [{"id": "o3", "is_active": 0}],
+        "delete": [],
+    },
+}
+
+
+def test_prompt_json_drops_empty_sections_and_repeated_keys() -> None:
+    start_request_metrics()
+    text = prompt_json(CHANGE_SET)
+    assert json.loads(text) == {
+        "option_items": {
+            "insert": {
+                "columns": ["id", "is_active", "label", "option_set_id", "position", "value"],
+                "rows": [["$opt_1", 1, "Paris", "s1", 6, "Paris"], ["$opt_2", 1, "Rome", "s1", 7, "Rome"]],
+            },
+            "update": [{"id": "o3", "is_active": 0}],
+        }
+    }
+    assert get_request_metrics()["prompt_serialization_tokens_saved"] > 0
+
+
+def test_plans_stay_echoable() -> None:
+    plan = IntentPlan.model_validate(
+        {"options": [{"operation": "insert", "target_form": {"form_name": "Travel"}, "add_values": ["Paris"]}]}
+    )
+    text = prompt_json(plan, columnar=False)
+    assert " " not in text
+    assert IntentPlan.model_validate_json(text) == plan
+
+
+def test_prompt_tables_renders_tsv_blocks() -> None:
+    assert prompt_tables(CHANGE_SET).splitlines() == [
+        "[option_items.insert]",
+        "id\tis_active\tlabel\toption_set_id\tposition\tvalue",
+        "$opt_1\t1\tParis\ts1\t6\tParis",
+        "$opt_2\t1\tRome\ts1\t7\tRome",
+        "",
+        "[option_items.update]",
+        "id\tis_active",
+        "o3\t0",
+    ]
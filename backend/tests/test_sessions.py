@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.agent import FormAgent
+from app.db import Database
+from app.sessions import SessionStore
+
+
+QUERY = "add paris to the travel destinations and add a gaming option to the laptop kind field on the request form"
+
+
+def _option(form_name: str, field_code: str, value: str) -> dict:
+    return {
+        "operation": "insert",
+        "target_form": {"form_name": form_name},
+        "field_code": field_code,
+        "add_values": [value],
+    }
+
+
+PLAN = {
+    "fields": [],
+    "options": [
+        _option("Travel Request (Complex)", "destinations", "Paris"),
+        _option("request", "laptop_kind", "Gaming"),
+    ],
+    "logic_blocks": [],
+    "needs_clarification": False,
+}
+
+
+class _ScriptedLlm:
+    def __init__(self, responses: list[dict]) -> None:
+        self.responses = responses
+        self.user_prompts: list[str] = []
+
+    def generate_json(self, system_prompt: str, user_prompt: str, extra_messages=None, system_prefix=None) -> dict:
+        self.user_prompts.append(user_prompt)
+        return self.responses.pop(0)
+
+
+async def _first_turn(agent: FormAgent, store: SessionStore):
+    session = store.create(QUERY)
+    result = await agent.plan_and_resolve(QUERY, session=session)
+    assert result["type"] == "clarification"
+    assert result["reason"] == "form_ambiguous"
+    assert session.pending["reference"] == "request"
+    return session, result
+
+
+def _answer(session, result, answer: str) -> list[dict[str, str]]:
+    session.extend_history([{"question": result["question"], "answer": answer}])
+    return list(session.history)
+
+
+@pytest.mark.asyncio
+async def test_candidate_answer_is_merged_without_replanning(db: Database) -> None:
+    # Planner and critique on the first turn only.
+    llm = _ScriptedLlm([dict(PLAN), dict(PLAN)])
+    agent = FormAgent(db=db, llm=llm)
+    session, result = await _first_turn(agent, SessionStore(ttl_seconds=60, max_entries=10))
+
+    result = await agent.plan_and_resolve(QUERY, _answer(session, result, "the laptop request"), session)
+
+    assert result["type"] == "change_set"
+    assert result["planner"] == "session"
+    assert len(llm.user_prompts) == 2
+    inserted = sorted(row["value"] for row in result["change_set"]["option_items"]["insert"])
+    assert inserted == ["Gaming", "Paris"]
+
+
+@pytest.mark.asyncio
+async def test_free_text_answer_replans_only_unresolved_intents(db: Database) -> None:
+    fragment = {
+        "options": [_option("Laptop Request", "laptop_kind", "Gaming")],
+        "needs_clarification": False,
+    }
+    llm = _ScriptedLlm([dict(PLAN), dict(PLAN), fragment])
+    agent = FormAgent(db=db, llm=llm)
+    session, result = await _first_turn(agent, SessionStore(ttl_seconds=60, max_entries=10))
+
+    result = await agent.plan_and_resolve(QUERY, _answer(session, result, "the one for computers"), session)
+
+    assert result["type"] == "change_set"
+    assert result["planner"] == "llm_incremental"
+    # One planner call and no critique on the follow-up turn.
+    assert len(llm.user_prompts) == 3
+    assert "could not be resolved" in llm.user_prompts[-1]
+    assert '"field_code":"laptop_kind"' in llm.user_prompts[-1]
+    inserted = sorted(row["value"] for row in result["change_set"]["option_items"]["insert"])
+    assert inserted == ["Gaming", "Paris"]
+
+
+def test_session_store_expires_and_caps_sessions() -> None:
+    store = SessionStore(ttl_seconds=60, max_entries=2)
+    first = store.create("a")
+    store.create("b")
+    store.create("c")
+    assert len(store) == 2
+    assert store.get(first.session_id) is None
+
+    expired = SessionStore(ttl_seconds=0, max_entries=2)
+    session = expired.create("a")
+    session.updated_at -= 1
+    assert expired.get(session.session_id) is None
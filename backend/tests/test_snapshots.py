@@ -0,0 +1,59 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.agent import FormAgent
+from app.config import get_settings
+from app.db import Database
+from app.explain import render_explanation
+
+
+class _NoLlm:
+    def generate_json(self, *args, **kwargs):
+        raise AssertionError("fast-path requests must not call the LLM")
+
+
+OPTION_QUERY = "add paris and rome to the destinations dropdown on the travel request form"
+FIELD_QUERY = "make the company name field on the travel request form required"
+
+
+@pytest.mark.asyncio
+async def test_option_edit_carries_the_field_and_its_option_list(db: Database) -> None:
+    agent = FormAgent(db=db, llm=_NoLlm())
+    full = await agent.plan_and_resolve(OPTION_QUERY, snapshot_mode="full")
+    delta = await agent.plan_and_resolve(OPTION_QUERY, snapshot_mode="delta")
+    assert delta["change_set"] == full["change_set"]
+
+    (form_id, snapshot), = delta["before_snapshot"].items()
+    complete = full["before_snapshot"][form_id]
+    assert snapshot["partial"] is True
+    assert snapshot["form"] == complete["form"]
+    assert [field["code"] for field in snapshot["fields"]] == ["destinations"]
+    field_id = str(snapshot["fields"][0]["id"])
+    assert snapshot["options_by_field"] == {field_id: complete["options_by_field"][field_id]}
+    assert [page["id"] for page in snapshot["pages"]] == [snapshot["fields"][0]["page_id"]]
+    assert snapshot["logic_rules"] == []
+    assert len(json.dumps(delta["before_snapshot"])) * 3 < len(json.dumps(full["before_snapshot"]))
+
+    assert render_explanation(delta["change_set"], delta["before_snapshot"]) == render_explanation(
+        full["change_set"], full["before_snapshot"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_field_update_names_the_field(db: Database, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "snapshot_mode", "delta")
+    agent = FormAgent(db=db, llm=_NoLlm())
+    result = await agent.plan_and_resolve(FIELD_QUERY)
+    (snapshot,) = result["before_snapshot"].values()
+    assert [field["code"] for field in snapshot["fields"]] == ["company_name"]
+    assert render_explanation(result["change_set"], result["before_snapshot"]) == (
+        "- Update field **Company name** on Travel Request (Complex): make it required."
+    )
@@ -0,0 +1,136 @@
+import sys
+from pathlib import Path
+
+import aiosqlite
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+here = Path(__file__).resolve()
+root = here.parent.parent
+if str(root) not in sys.path:
+  sys.path.insert(0, str(root))
+
+from app.config import get_settings
+from app.db import Database
+from app import main
+from app.main import create_app
+from app.submission_validation import compile_validation_plan, get_validation_cache
+
+from conftest import lookup_form_id
+
+
+FIELD_TYPES = {
+    "short_text": {"has_options": 0, "allows_multiple": 0},
+    "dropdown": {"has_options": 1, "allows_multiple": 0},
+    "checkbox": {"has_options": 1, "allows_multiple": 1},
+    "number": {"has_options": 0, "allows_multiple": 0},
+    "date": {"has_options": 0, "allows_multiple": 0},
+    "email": {"has_options": 0, "allows_multiple": 0},
+}
+
+
+def _field(code: str, key: str, **extra) -> dict:
+    return {"id": code, "code": code, "label": code.title(), "field_type_key": key, "required": 0, **extra}
+
+
+def test_row_and_columnar_batches_report_the_same_errors() -> None:
+    plan = compile_validation_plan(
+        {
+            "form": {"id": "f"},
+            "fields": [
+                _field("name", "short_text", required=1, validation_schema='{"minLength": 2, "maxLength": 5}'),
+                _field("city", "dropdown"),
+                _field("tags", "checkbox"),
+                _field("count", "number", validation_schema='{"minimum": 0, "maximum": 10}'),
+                _field("day", "date"),
+                _field("email", "email", default_value="ops@example.com"),
+            ],
+            "options_by_field": {
+                "city": [{"value": "Paris", "is_active": 1}, {"value": "Rome", "is_active": 0}],
+                "tags": [{"value": "a", "is_active": 1}, {"value": "b", "is_active": 1}],
+            },
+        },
+        FIELD_TYPES,
+    )
+    rows = [
+        {"name": "Al", "city": "Paris", "tags": ["a", "b"], "count": "3", "day": "2024-01-31"},
+        {"name": "", "city": "Rome", "tags": ["c"], "count": "x", "day": "2024-02-30", "email": "nope"},
+        {"name": "Alexander", "city": ["Paris"], "tags": "a", "count": 11, "day": "2024"},
+    ]
+    result = plan.validate(rows)
+    assert result.valid.tolist() == [True, False, False]
+    assert [(error.field, error.code) for error in result.by_row()[1]] == [
+        ("name", "required"),
+        ("city", "invalid_option"),
+        ("tags", "invalid_option"),
+        ("count", "not_a_number"),
+        ("day", "not_a_date"),
+        ("email", "invalid_email"),
+    ]
+    assert [(error.field, error.code) for error in result.by_row()[2]] == [
+        ("name", "too_long"),
+        ("city", "multiple_not_allowed"),
+        ("count", "above_maximum"),
+        ("day", "not_a_date"),
+    ]
+
+    columns = {code: [row.get(code) for row in rows] for code in ("name", "city", "tags", "count", "day", "email")}
+    assert plan.validate(columns).errors == result.errors
+
+
+def test_ndarray_columns_and_invalid_patterns() -> None:
+    plan = compile_validation_plan(
+        {
+            "form": {"id": "f"},
+            "fields": [
+                _field("count", "number", validation_schema='{"maximum": 10}'),
+                _field("code", "short_text", validation_schema='{"pattern": "[", "maxLength": 3}'),
+            ],
+        },
+        FIELD_TYPES,
+    )
+    assert plan.checks[1].pattern is None
+    result = plan.validate({"count": np.array([1, 2, 30]), "code": np.array(["a", "[", "long"])})
+    assert [(error.row, error.field, error.code) for error in result.errors] == [
+        (2, "count", "above_maximum"),
+        (2, "code", "too_long"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_plans_are_recompiled_when_options_change(db: Database) -> None:
+    form_id = await lookup_form_id(db, "travel-complex")
+    cache = get_validation_cache(db)
+    first = await cache.get(form_id)
+    assert await cache.get(form_id) is first
+    assert first.validate([{"travel_reason": "Leisure", "destinations": "Tokyo"}]).errors == []
+
+    async with aiosqlite.connect(db.path) as conn:
+        await conn.execute("UPDATE option_items SET is_active = 0 WHERE value = 'Tokyo'")
+        await conn.commit()
+    (error,) = (await cache.get(form_id)).validate([{"travel_reason": "Leisure", "destinations": "Tokyo"}]).errors
+    assert (error.field, error.code) == ("destinations", "invalid_option")
+
+
+def test_endpoint_follows_the_form_logic(api_db: Database, monkeypatch) -> None:
+    # Run every batch in a worker thread, as large ones are.
+    monkeypatch.setattr(main, "THREADED_BATCH_ROWS", 1)
+    client = TestClient(create_app())
+    form_id = next(form["id"] for form in client.get("/api/forms").json() if form["slug"] == "travel-complex")
+    batch = {"columns": {"travel_reason": ["Business", "Leisure", None], "budget": [None, None, "12"]}}
+
+    body = client.post(f"/api/forms/{form_id}/validate", json=batch).json()
+    assert (body["rows"], body["valid_rows"]) == (3, 1)
+    assert [(error["row"], error["field"], error["code"]) for error in body["errors"]] == [
+        (0, "budget", "required"),
+        (2, "travel_reason", "required"),
+    ]
+
+    body = client.post(f"/api/forms/{form_id}/validate", json={**batch, "apply_logic": False}).json()
+    assert [error["row"] for error in body["errors"]] == [2]
+    assert client.post(f"/api/forms/{form_id}/validate", json={}).status_code == 422
+
+    monkeypatch.setattr(get_settings(), "max_submission_batch", 2)
+    assert client.post(f"/api/forms/{form_id}/validate", json=batch).status_code == 413
+    assert client.post(f"/api/forms/{form_id}/logic", json={"submissions": [{}] * 3}).status_code == 413
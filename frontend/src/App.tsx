@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import ReactMarkdown from "react-markdown";
 
 const API_BASE_URL = ((import.meta as any).env?.VITE_API_BASE_URL ?? "").replace(/\/$/, "");
+const FORMS_PAGE_SIZE = 100;
 
 function buildApiUrl(path: string) {
     if (!path.startsWith("/")) {
@@ -39,6 +40,23 @@ type ClarificationResponse = {
     reason?: string | null;
     form_candidates?: CandidateForm[];
     field_candidates?: CandidateField[];
+    session_id?: string | null;
+};
+
+type EntityDiff = {
+    entity: "form" | "page" | "field" | "option" | "rule" | "condition" | "action";
+    id: string | null;
+    status: "added" | "removed" | "modified";
+    form_id: string | null;
+    parent_id: string | null;
+    label: string | null;
+    changes: Record<string, { before: unknown; after: unknown }>;
+};
+
+const DIFF_STATUS_BADGES: Record<EntityDiff["status"], string> = {
+    added: "stat-new",
+    removed: "stat-removed",
+    modified: "stat-modified",
 };
 
 type ChangeSetResponse = {
@@ -46,6 +64,9 @@ type ChangeSetResponse = {
     plan: unknown;
     change_set: Record<string, unknown>;
     before_snapshot?: Record<string, unknown> | null;
+    diff?: EntityDiff[] | null;
+    warnings?: string[];
+    session_id?: string | null;
 };
 
 type ExplainResponse = {
@@ -80,6 +101,7 @@ function App() {
     const [query, setQuery] = useState("");
     const [rootQuery, setRootQuery] = useState<string | null>(null);
     const [history, setHistory] = useState<HistoryItem[]>([]);
+    const [sessionId, setSessionId] = useState<string | null>(null);
     const [pendingClarification, setPendingClarification] = useState<string | null>(null);
     const [clarificationAnswer, setClarificationAnswer] = useState("");
     const [result, setResult] = useState<ApiResponse | null>(null);
@@ -89,6 +111,7 @@ function App() {
     const [forms, setForms] = useState<FormSummary[]>([]);
     const [formsError, setFormsError] = useState<string | null>(null);
     const [isLoadingForms, setIsLoadingForms] = useState(false);
+    const [formsCursor, setFormsCursor] = useState<string | null>(null);
     const [selectedFormId, setSelectedFormId] = useState<string | null>(null);
     const [formStructure, setFormStructure] = useState<FormStructure | null>(null);
     const [isLoadingFormStructure, setIsLoadingFormStructure] = useState(false);
@@ -119,7 +142,7 @@ function App() {
         return () => window.removeEventListener("keydown", handleEscape);
     }, [fullscreenJson]);
 
-    async function callApi(currentQuery: string, currentHistory: HistoryItem[]) {
+    async function callApi(currentQuery: string, currentHistory: HistoryItem[], currentSessionId: string | null = null) {
         setIsLoading(true);
         setError(null);
         try {
@@ -131,7 +154,9 @@ function App() {
                 body: JSON.stringify({
                     query: currentQuery,
                     provider,
-                    history: currentHistory
+                    // The server keeps earlier turns of a session, so only new answers are sent.
+                    history: currentSessionId ? currentHistory.slice(-1) : currentHistory,
+                    session_id: currentSessionId
                 })
             });
             if (!response.ok) {
@@ -141,6 +166,7 @@ function App() {
             }
             const data: ApiResponse = await response.json();
             setResult(data);
+            setSessionId(data.session_id ?? null);
             setIsEditingJson(false);
             setEditedJson("");
             setJsonEditError(null);
@@ -171,6 +197,7 @@ function App() {
         }
         setRootQuery(query.trim());
         setHistory([]);
+        setSessionId(null);
         setResult(null);
         setPendingClarification(null);
         setClarificationAnswer("");
@@ -189,7 +216,7 @@ function App() {
         ];
         setHistory(updatedHistory);
         setClarificationAnswer("");
-        callApi(rootQuery || query, updatedHistory);
+        callApi(rootQuery || query, updatedHistory, sessionId);
     }
 
     function handleClarificationSubmit(event: React.FormEvent) {
@@ -204,6 +231,7 @@ function App() {
         setQuery("");
         setRootQuery(null);
         setHistory([]);
+        setSessionId(null);
         setResult(null);
         setPendingClarification(null);
         setClarificationAnswer("");
@@ -650,6 +678,155 @@ function App() {
         );
     }
 
+    function renderDiffPreview(snapshot: any, entries: EntityDiff[]) {
+        const form = snapshot && snapshot.form ? snapshot.form : null;
+        const formEntry = entries.find((entry) => entry.entity === "form");
+        const snapshotFields: Record<string, any> = {};
+        for (const field of (snapshot && snapshot.fields) || []) {
+            snapshotFields[field.id] = field;
+        }
+
+        // Options can change on fields the change-set leaves alone, so those
+        // fields are listed too, without a status of their own.
+        const fieldEntries = new Map<string, EntityDiff | null>();
+        const optionsByField: Record<string, EntityDiff[]> = {};
+        for (const entry of entries) {
+            if (entry.entity === "field" && entry.id) {
+                fieldEntries.set(entry.id, entry);
+            }
+        }
+        for (const entry of entries) {
+            if (entry.entity === "option" && entry.parent_id) {
+                (optionsByField[entry.parent_id] ??= []).push(entry);
+                if (!fieldEntries.has(entry.parent_id)) {
+                    fieldEntries.set(entry.parent_id, null);
+                }
+            }
+        }
+        const logicEntries = entries.filter((entry) => ["rule", "condition", "action"].includes(entry.entity));
+        const counts = { added: 0, modified: 0, removed: 0 };
+        for (const entry of entries) {
+            counts[entry.status] += 1;
+        }
+
+        const fieldClass: Record<EntityDiff["status"], string> = {
+            added: "field-new",
+            modified: "field-modified",
+            removed: "field-deleted",
+        };
+        const fieldBadge: Record<EntityDiff["status"], [string, string]> = {
+            added: ["badge-new", "NEW"],
+            modified: ["badge-modified", "MODIFIED"],
+            removed: ["badge-deleted", "DELETED"],
+        };
+        const optionClass: Record<EntityDiff["status"], string> = {
+            added: "option-new",
+            modified: "option-modified",
+            removed: "option-deleted",
+        };
+        const renderChanges = (entry: EntityDiff) =>
+            entry.status === "modified" && (
+                <div className="field-changes-list">
+                    {Object.entries(entry.changes).map(([column, change]) => (
+                        <div key={column} className="field-change-item">
+                            <span className="change-label">{column}:</span>
+                            <span className="change-old">{String(change.before)}</span>
+                            <span className="change-arrow">→</span>
+                            <span className="change-new">{String(change.after)}</span>
+                        </div>
+                    ))}
+                </div>
+            );
+
+        return (
+            <div className="form-preview">
+                <div className="form-preview-header">
+                    <div>
+                        <div className="form-preview-title">{form?.title ?? formEntry?.label ?? "New form"}</div>
+                        {form?.slug && <div className="form-preview-meta">{form.slug}</div>}
+                    </div>
+                    <div className="form-preview-stats">
+                        {(["added", "modified", "removed"] as const).map((status) =>
+                            counts[status] > 0 && (
+                                <span key={status} className={`stat-badge ${DIFF_STATUS_BADGES[status]}`}>
+                                    {counts[status]} {status}
+                                </span>
+                            )
+                        )}
+                    </div>
+                </div>
+                <div className="form-preview-fields">
+                    {Array.from(fieldEntries.entries()).map(([fieldId, entry]) => {
+                        const field = snapshotFields[fieldId];
+                        const options = optionsByField[fieldId] || [];
+                        return (
+                            <div key={fieldId} className={`form-preview-field ${entry ? fieldClass[entry.status] : ""}`}>
+                                <div className="field-preview-header">
+                                    <div className="field-preview-label-group">
+                                        <label className="field-preview-label">
+                                            {entry?.label ?? field?.label ?? fieldId}
+                                        </label>
+                                        {field?.code && (
+                                            <div className="field-preview-meta-group">
+                                                <span className="field-preview-code">{field.code}</span>
+                                            </div>
+                                        )}
+                                    </div>
+                                    {entry && (
+                                        <div className="field-badges">
+                                            <span className={`field-badge ${fieldBadge[entry.status][0]}`}>
+                                                {fieldBadge[entry.status][1]}
+                                            </span>
+                                        </div>
+                                    )}
+                                </div>
+                                {entry && renderChanges(entry)}
+                                {options.length > 0 && (
+                                    <div className="field-options-preview">
+                                        <div className="options-label">Options:</div>
+                                        <div className="options-list">
+                                            {options.map((option, index) => (
+                                                <span key={option.id ?? index} className={`option-pill ${optionClass[option.status]}`}>
+                                                    {option.label ?? option.id}
+                                                    {option.status === "modified" && option.changes.label &&
+                                                        ` (was: ${String(option.changes.label.before)})`}
+                                                </span>
+                                            ))}
+                                        </div>
+                                    </div>
+                                )}
+                            </div>
+                        );
+                    })}
+                </div>
+
+                {logicEntries.length > 0 && (
+                    <div className="form-preview-logic">
+                        <div className="logic-section-header">
+                            <h4 className="logic-section-title">Logic Rules</h4>
+                        </div>
+                        {logicEntries.map((entry, index) => (
+                            <div
+                                key={`${entry.entity}-${entry.id ?? index}`}
+                                className={`logic-rule-card ${entry.status === "added" ? "logic-new" : ""} ${entry.status === "modified" ? "logic-modified" : ""}`}
+                            >
+                                <div className="logic-rule-header">
+                                    <span className="logic-rule-name">
+                                        {entry.entity}: {entry.label ?? entry.id}
+                                    </span>
+                                    <span className={`field-badge ${fieldBadge[entry.status][0]}`}>
+                                        {fieldBadge[entry.status][1]}
+                                    </span>
+                                </div>
+                                {renderChanges(entry)}
+                            </div>
+                        ))}
+                    </div>
+                )}
+            </div>
+        );
+    }
+
     function handleExpandJson(value: unknown, label: string) {
         const text = JSON.stringify(value, null, 2);
         setFullscreenJson(JSON.stringify({ label, content: text }));
@@ -766,16 +943,22 @@ function App() {
         );
     }
 
-    async function loadForms() {
+    async function loadForms(cursor: string | null = null) {
         setIsLoadingForms(true);
         setFormsError(null);
         try {
-            const response = await fetch(buildApiUrl("/api/forms"));
+            const params = new URLSearchParams({ limit: String(FORMS_PAGE_SIZE) });
+            if (cursor) {
+                params.set("cursor", cursor);
+            }
+            const path = `/api/forms?${params.toString()}`;
+            const response = await fetch(buildApiUrl(path));
             if (!response.ok) {
                 throw new Error("Unable to load forms.");
             }
             const data: FormSummary[] = await response.json();
-            setForms(data);
+            setFormsCursor(response.headers.get("X-Next-Cursor"));
+            setForms((previous) => (cursor ? [...previous, ...data] : data));
             if (!selectedFormId && data.length > 0) {
                 setSelectedFormId(data[0].id);
             }
@@ -825,11 +1008,24 @@ function App() {
                 ? changeSetResult.before_snapshot
                 : null;
 
+        const serverDiff = changeSetResult && changeSetResult.diff ? changeSetResult.diff : null;
         const diffFormIds = beforeSnapshot ? Object.keys(beforeSnapshot) : [];
         const activeDiffFormId = selectedDiffFormId && diffFormIds.includes(selectedDiffFormId)
             ? selectedDiffFormId
             : diffFormIds[0] ?? null;
 
+        // The server diff already describes the after state; rebuilding it
+        // from the snapshot is only a fallback, and needs a full snapshot.
+        function renderAfterPreview(snapshot: any, formId: string) {
+            if (serverDiff) {
+                return renderDiffPreview(snapshot, serverDiff.filter((entry) => entry.form_id === formId));
+            }
+            if (!snapshot || snapshot.partial) {
+                return <div className="preview-empty">No after-state preview for a partial snapshot</div>;
+            }
+            return renderFormPreview(snapshot, scopedChangeSet ?? changeSetResult?.change_set, true);
+        }
+
         function buildFormScopedChangeSet(
             changeSet: Record<string, any>,
             formId: string | null
@@ -893,6 +1089,7 @@ function App() {
                         query: rootQuery || query,
                         plan: changeSetResult.plan,
                         change_set: changeSetResult.change_set,
+                        before_snapshot: changeSetResult.before_snapshot ?? null,
                         provider
                     })
                 });
@@ -928,6 +1125,7 @@ function App() {
                         query: rootQuery || query,
                         plan: changeSetResult.plan,
                         change_set: changeSetResult.change_set,
+                        before_snapshot: changeSetResult.before_snapshot ?? null,
                         provider
                     })
                 });
@@ -1205,6 +1403,42 @@ function App() {
                     </section>
                 )}
 
+                {changeSetResult && changeSetResult.warnings && changeSetResult.warnings.length > 0 && (
+                    <section className="result-section">
+                        <h2 className="section-title">Warnings</h2>
+                        <ul className="change-list">
+                            {changeSetResult.warnings.map((warning) => (
+                                <li key={warning} className="change-item warning-text">
+                                    {warning}
+                                </li>
+                            ))}
+                        </ul>
+                    </section>
+                )}
+
+                {changeSetResult && changeSetResult.diff && changeSetResult.diff.length > 0 && (
+                    <section className="result-section">
+                        <h2 className="section-title">Changes</h2>
+                        <ul className="change-list">
+                            {changeSetResult.diff.map((entry, index) => (
+                                <li key={`${entry.entity}-${entry.id ?? index}`} className="change-item">
+                                    <span className={`stat-badge ${DIFF_STATUS_BADGES[entry.status]}`}>
+                                        {entry.status}
+                                    </span>
+                                    <span className="change-entity">{entry.entity}</span>
+                                    <span className="change-label">{entry.label ?? entry.id}</span>
+                                    {entry.status === "modified" &&
+                                        Object.entries(entry.changes).map(([column, change]) => (
+                                            <span key={column} className="change-column">
+                                                {column}: {JSON.stringify(change.before)} → {JSON.stringify(change.after)}
+                                            </span>
+                                        ))}
+                                </li>
+                            ))}
+                        </ul>
+                    </section>
+                )}
+
                 {changeSetResult && beforeSnapshot && diffFormIds.length > 0 && (
                     <section className="result-section">
                         <h2 className="section-title">Visual Preview</h2>
@@ -1237,6 +1471,9 @@ function App() {
                                     <h3 className="preview-column-title">Current State</h3>
                                     <span className="preview-column-badge">Before</span>
                                 </div>
+                                {activeDiffFormId && (beforeSnapshot as any)[activeDiffFormId]?.partial && (
+                                    <div className="preview-note">Only the rows this change touches are included.</div>
+                                )}
                                 {activeDiffFormId && renderFormPreview((beforeSnapshot as any)[activeDiffFormId], null, false)}
                             </div>
                             <div className="preview-divider">
@@ -1247,7 +1484,7 @@ function App() {
                                     <h3 className="preview-column-title">After Changes</h3>
                                     <span className="preview-column-badge badge-after">After</span>
                                 </div>
-                                {activeDiffFormId && renderFormPreview((beforeSnapshot as any)[activeDiffFormId], scopedChangeSet ?? changeSetResult.change_set, true)}
+                                {activeDiffFormId && renderAfterPreview((beforeSnapshot as any)[activeDiffFormId], activeDiffFormId)}
                             </div>
                         </div>
                         <details className="preview-json-details">
@@ -1294,6 +1531,16 @@ function App() {
                             </li>
                         ))}
                     </ul>
+                    {formsCursor && (
+                        <button
+                            type="button"
+                            className="secondary-button"
+                            disabled={isLoadingForms}
+                            onClick={() => loadForms(formsCursor)}
+                        >
+                            Load more forms
+                        </button>
+                    )}
                 </div>
                 <div className="db-content">
                     {!selectedFormId && <div className="db-placeholder">Select a form to inspect its structure.</div>}